@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic dataset with the same tables and columns as data/.
+
+Rows are generated in chunks of restaurants and streamed to CSV files and/or a
+SQLite database, so large datasets (e.g. 50,000 restaurants x 365 days) do not
+need to fit in memory. The same seed and chunk size always produce the same data.
+"""
+import typer
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# Add src to Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.data_generator import DatasetSpec, generate_dataset
+from src.loaders import TABLES
+
+app = typer.Typer()
+
+
+@app.command()
+def generate(
+    restaurants: int = typer.Option(1000, "--restaurants", "-n", help="Number of restaurants"),
+    days: int = typer.Option(30, "--days", "-d", help="Number of days of daily metrics per restaurant"),
+    start_date: str = typer.Option("2024-05-01", "--start-date", help="First day of the metrics, YYYY-MM-DD"),
+    seed: int = typer.Option(0, "--seed", help="Random seed"),
+    csv_dir: Optional[Path] = typer.Option(None, "--csv-dir", help="Directory to write the CSV files to"),
+    db_path: Optional[Path] = typer.Option(None, "--db", help="SQLite database to create"),
+    chunk_size: int = typer.Option(500, "--chunk-size", help="Restaurants generated and written at a time"),
+    ads_share: float = typer.Option(0.6, "--ads-share", help="Share of restaurants running ad campaigns"),
+    discount_share: float = typer.Option(0.3, "--discount-share", help="Share of restaurants running a discount"),
+    force: bool = typer.Option(False, "--force", help="Overwrite existing CSV files or database"),
+):
+    """Generate restaurant_master, restaurant_metrics, ads_data, discount_history and peer_benchmarks."""
+    if csv_dir is None and db_path is None:
+        raise typer.BadParameter("Pass --csv-dir and/or --db")
+    if restaurants < 1 or days < 1 or chunk_size < 1:
+        raise typer.BadParameter("--restaurants, --days and --chunk-size must be positive")
+    if not force:
+        existing = [csv_dir / spec.file_name for spec in TABLES.values()] if csv_dir is not None else []
+        existing.append(db_path)
+        existing = [path for path in existing if path is not None and path.exists()]
+        if existing:
+            raise typer.BadParameter(f"{existing[0]} already exists; pass --force to overwrite")
+
+    spec = DatasetSpec(restaurants=restaurants, days=days, start_date=start_date, seed=seed,
+                       ads_share=ads_share, discount_share=discount_share, chunk_size=chunk_size)
+    start = time.perf_counter()
+    counts = generate_dataset(spec, csv_dir=csv_dir, db_path=db_path)
+    elapsed = time.perf_counter() - start
+
+    for name, count in counts.items():
+        typer.echo(f"  {Path(TABLES[name].file_name).stem:<20} {count:>12,} rows")
+    total = sum(counts.values())
+    # ru_maxrss is in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    typer.echo(f"Wrote {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s, peak RSS {peak_mb:.0f} MB)")
+
+
+if __name__ == "__main__":
+    app()
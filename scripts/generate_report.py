@@ -4,12 +4,20 @@ from dotenv import load_dotenv
 import sys
 from pathlib import Path
 from datetime import datetime
+from typing import List, Optional
+import json
+import time
 import traceback
 
 # Add src to Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.agents.orchestrator import ReportOrchestrator
+from src.agents.batch import BatchReportRunner
+from src.agents.report_formatter import REPORT_MODES
+from src.loaders import DataLoader, SQLiteDataLoader
+from src.utils.chart_renderer import BATCH_DPI, DEFAULT_DPI, FORMATS, ChartRenderer
+from src.utils.chart_cache import get_chart_cache
 
 # Load environment variables
 load_dotenv()
@@ -17,25 +25,211 @@ load_dotenv()
 app = typer.Typer()
 
 
+def _resolve_batch_ids(data_loader: DataLoader, all_restaurants: bool, ids_file: Optional[Path],
+                       city: Optional[str], locality: Optional[str]) -> List[str]:
+    """Collect the restaurant IDs selected by the batch options, de-duplicated in order."""
+    restaurant_ids = []
+    if ids_file is not None:
+        lines = ids_file.read_text(encoding="utf-8").splitlines()
+        restaurant_ids.extend(line.strip() for line in lines if line.strip() and not line.startswith("#"))
+    if all_restaurants or city or locality:
+        restaurant_ids.extend(data_loader.list_restaurants(city=city, locality=locality))
+    return list(dict.fromkeys(restaurant_ids))
+
+
 @app.command()
 def generate_report(
-    restaurant_id: str = typer.Argument(..., help="Restaurant ID to generate report for"),
+    restaurant_id: Optional[str] = typer.Argument(None, help="Restaurant ID to generate report for"),
+    source: str = typer.Option("csv", "--source", help="Data source to load restaurant data from: csv or sqlite"),
+    all_restaurants: bool = typer.Option(False, "--all", help="Generate reports for every restaurant"),
+    ids_file: Optional[Path] = typer.Option(None, "--ids-file", help="File with one restaurant ID per line"),
+    city: Optional[str] = typer.Option(None, "--city", help="Generate reports for all restaurants in a city"),
+    locality: Optional[str] = typer.Option(None, "--locality", help="Generate reports for all restaurants in a locality"),
+    workers: int = typer.Option(4, "--workers", "-w", help="Number of reports to generate concurrently in batch mode"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Always call the LLM instead of reusing cached responses"),
+    exploratory_sql: bool = typer.Option(False, "--exploratory-sql", help="Let the ReAct SQL agent answer the campaign/discount comparisons"),
+    chart_format: str = typer.Option("png", "--chart-format", help="Chart image format: png or svg"),
+    chart_dpi: Optional[int] = typer.Option(None, "--chart-dpi", help=f"Resolution of PNG charts (default: {DEFAULT_DPI}, {BATCH_DPI} in batch mode)"),
+    chart_workers: Optional[int] = typer.Option(None, "--chart-workers", help="Processes rendering charts in batch mode (default: CPU count, 0 renders inside each report)"),
+    no_chart_cache: bool = typer.Option(False, "--no-chart-cache", help="Always redraw charts instead of reusing unchanged ones"),
+    structured_only: bool = typer.Option(False, "--structured-only", help="Print the agents' structured outputs as JSON without calling an LLM"),
+    offline: bool = typer.Option(False, "--offline", help="Use the deterministic offline chat model instead of OpenAI (also DINEOUT_LLM=offline)"),
+    stream: bool = typer.Option(False, "--stream", help="Print the report as it is generated and write it to report.md.partial until complete"),
+    no_incremental: bool = typer.Option(False, "--no-incremental", help="Rerun every agent instead of reusing outputs whose inputs are unchanged"),
+    resume: bool = typer.Option(False, "--resume", help="Continue a failed or interrupted run from its last completed steps"),
+    report_mode: str = typer.Option("template", "--report-mode", help="template: render the tables from the data and have the LLM write only the narrative; llm: have the LLM write the whole report; sections: write each section concurrently"),
 ):
     """
     Generate a comprehensive report for a restaurant using AI analysis and print the results.
+
+    Pass --all, --ids-file, --city and/or --locality instead of a restaurant ID to
+    generate reports for many restaurants concurrently.
     """
+    if source not in ("csv", "sqlite"):
+        raise typer.BadParameter("--source must be 'csv' or 'sqlite'")
+    if structured_only and exploratory_sql:
+        raise typer.BadParameter("--structured-only cannot be combined with --exploratory-sql")
+    if structured_only and stream:
+        raise typer.BadParameter("--structured-only writes no markdown report to stream")
+    if report_mode not in REPORT_MODES:
+        raise typer.BadParameter(f"--report-mode must be one of: {', '.join(REPORT_MODES)}")
+    if chart_format not in FORMATS:
+        raise typer.BadParameter(f"--chart-format must be one of: {', '.join(FORMATS)}")
+    data_loader = SQLiteDataLoader() if source == "sqlite" else DataLoader()
+
+    batch_mode = all_restaurants or ids_file is not None or city is not None or locality is not None
+    if chart_dpi is None:
+        chart_dpi = BATCH_DPI if batch_mode else DEFAULT_DPI
+    chart_renderer = ChartRenderer(dpi=chart_dpi, fmt=chart_format, use_cache=not no_chart_cache)
+    if batch_mode:
+        if restaurant_id is not None:
+            raise typer.BadParameter("Pass either a restaurant ID or batch options, not both")
+        run_batch(data_loader, _resolve_batch_ids(data_loader, all_restaurants, ids_file, city, locality),
+                  workers, use_cache=not no_cache, exploratory_sql=exploratory_sql,
+                  chart_renderer=chart_renderer, chart_workers=chart_workers, structured_only=structured_only,
+                  offline=offline or None, stream=stream, incremental=not no_incremental, resume=resume,
+                  report_mode=report_mode)
+        return
+    if restaurant_id is None:
+        raise typer.BadParameter("Pass a restaurant ID or one of --all, --ids-file, --city, --locality")
+
     try:
         # Initialize orchestrator
-        orchestrator = ReportOrchestrator(restaurant_id)
-        
+        orchestrator = ReportOrchestrator(
+            restaurant_id,
+            data_loader=data_loader,
+            use_cache=not no_cache,
+            exploratory_sql=exploratory_sql,
+            chart_renderer=chart_renderer,
+            structured_only=structured_only,
+            offline=offline or None,
+            stream=stream,
+            on_report_chunk=lambda chunk: typer.echo(chunk, nl=False),
+            incremental=not no_incremental,
+            resume=resume,
+            report_mode=report_mode,
+        )
+
         # Generate report
         report = orchestrator.generate_report()
-        
-            
+        if stream and report['first_content_seconds'] is not None:
+            typer.echo(f"\nFirst report content after {report['first_content_seconds']:.2f}s of formatting")
+        if report['resumed_steps']:
+            typer.echo(f"Resumed from checkpoints: {', '.join(report['resumed_steps'])}", err=structured_only)
+        if report.get('metrics_path'):
+            typer.echo(f"Run metrics: {report['metrics_path']}", err=structured_only)
+        if orchestrator.incremental:
+            typer.echo(_format_agent_cache_stats(), err=structured_only)
+        if structured_only:
+            typer.echo(json.dumps(report['structured'], indent=2, default=str))
+            return
+        if not no_cache:
+            typer.echo(_format_cache_stats())
+        typer.echo(_format_scheduler_stats())
+        if not no_chart_cache:
+            typer.echo(_format_chart_cache_stats())
+        if exploratory_sql:
+            typer.echo(_format_analyst_stats())
+        typer.echo(_format_prompt_stats())
+
     except Exception as e:
         traceback.print_exc()
         typer.echo(f"Error generating report: {str(e)}", err=True)
         raise typer.Exit(1)
 
+
+def _format_cache_stats() -> str:
+    from src.utils.llm_cache import get_llm_cache
+
+    stats = get_llm_cache().stats()
+    return f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries stored)"
+
+
+def _format_scheduler_stats() -> str:
+    from src.utils.llm_scheduler import get_llm_scheduler
+
+    stats = get_llm_scheduler().stats()
+    return (f"LLM scheduler: {stats['calls']} calls, {stats['retries']} retries, {stats['failures']} failed; "
+            f"queue wait avg {stats['avg_wait_seconds']:.2f}s, max {stats['max_wait_seconds']:.2f}s "
+            f"(max queue depth {stats['max_queue_depth']})")
+
+
+def _format_agent_cache_stats() -> str:
+    from src.utils.agent_cache import get_agent_cache
+
+    stats = get_agent_cache().stats()
+    return (f"Agent cache: {stats['hits']} agents reused, {stats['misses']} rerun "
+            f"({stats['entries']} outputs stored)")
+
+
+def _format_chart_cache_stats() -> str:
+    stats = get_chart_cache().stats()
+    return f"Chart cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} charts stored)"
+
+
+def _format_analyst_stats() -> str:
+    from src.agents.analyst import DISCOVERY_TOOLS, get_analyst_stats
+
+    stats = get_analyst_stats()
+    return (f"SQL agent: {stats['runs']} runs, {stats['llm_round_trips']} LLM round trips, "
+            f"~{stats['estimated_round_trips_saved']} round trips saved by the schema digest "
+            f"(estimated as {len(DISCOVERY_TOOLS)} discovery calls per run without it, minus those made)")
+
+
+def _format_prompt_stats() -> str:
+    from src.utils.prompt_builder import get_prompt_stats
+
+    stats = get_prompt_stats()
+    baseline = stats["tokens_sent"] + stats["tokens_saved"]
+    saved_pct = stats["tokens_saved"] / baseline * 100 if baseline else 0.0
+    return (f"Prompts: {stats['prompts']} built, {stats['tokens_sent']} tokens sent, "
+            f"{stats['tokens_saved']} saved by compact serialization ({saved_pct:.0f}%)")
+
+
+def run_batch(data_loader: DataLoader, restaurant_ids: List[str], workers: int, use_cache: bool = True,
+              exploratory_sql: bool = False, chart_renderer: Optional[ChartRenderer] = None,
+              chart_workers: Optional[int] = None, structured_only: bool = False,
+              offline: Optional[bool] = None, stream: bool = False, incremental: bool = True,
+              resume: bool = False, report_mode: str = "template"):
+    """Generate reports for many restaurants and print a summary table."""
+    if not restaurant_ids:
+        typer.echo("No restaurants matched the batch selection", err=True)
+        raise typer.Exit(1)
+
+    typer.echo(f"Generating {len(restaurant_ids)} reports with {workers} workers...")
+    runner = BatchReportRunner(workers=workers, data_loader=data_loader, use_cache=use_cache,
+                               exploratory_sql=exploratory_sql, chart_renderer=chart_renderer,
+                               chart_workers=chart_workers, structured_only=structured_only,
+                               offline=offline, stream=stream, incremental=incremental, resume=resume,
+                               report_mode=report_mode)
+
+    start = time.perf_counter()
+    results = runner.run(
+        restaurant_ids,
+        on_result=lambda r: typer.echo(f"  {r.restaurant_id}: {r.status} ({r.latency_seconds:.1f}s)"),
+    )
+    typer.echo("\n" + runner.format_summary(results, wall_seconds=time.perf_counter() - start))
+    aggregated = runner.aggregate_metrics(results)
+    if aggregated["reports"]:
+        metrics_path = Path("outputs") / "batch_metrics.json"
+        metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        metrics_path.write_text(json.dumps(aggregated, indent=2), encoding="utf-8")
+        typer.echo("\n" + runner.format_metrics(aggregated) + f" (saved to {metrics_path})")
+    if use_cache and incremental:
+        typer.echo(_format_agent_cache_stats())
+    if use_cache and not structured_only:
+        typer.echo(_format_cache_stats())
+    if not structured_only:
+        typer.echo(_format_scheduler_stats())
+    if chart_renderer is not None and chart_renderer.use_cache:
+        typer.echo(_format_chart_cache_stats())
+    if exploratory_sql:
+        typer.echo(_format_analyst_stats())
+    if not structured_only:
+        typer.echo(_format_prompt_stats())
+
+    if any(r.status != "ok" for r in results):
+        raise typer.Exit(1)
+
 if __name__ == "__main__":
-    app() 
\ No newline at end of file
+    app()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Create the per-restaurant lookup indexes SQLiteDataLoader relies on.
+
+Databases built by scripts/generate_dataset.py are indexed already; run this once
+for a database created some other way (e.g. the bundled db/dineout.db). The report
+path only ever opens the database read-only, so it never does this itself.
+"""
+import typer
+import sqlite3
+import sys
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+# Add src to Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.loaders import SQLiteDataLoader, create_indexes, resolve_db_path
+
+app = typer.Typer()
+
+
+@app.command()
+def index(
+    db_path: Optional[Path] = typer.Option(None, "--db", help="SQLite database to index (defaults to db/dineout.db)"),
+):
+    """Create any missing lookup indexes and refresh the query planner statistics."""
+    path = resolve_db_path(db_path)
+    if not path.exists():
+        raise typer.BadParameter(f"{path} does not exist")
+    with closing(sqlite3.connect(path)) as conn:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        create_indexes(conn)
+    created = [name for name in SQLiteDataLoader.INDEXES if name not in existing]
+    typer.echo(f"Created {len(created)} index(es) on {path}" + (f": {', '.join(created)}" if created else ""))
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Measure how long the report CLI takes to start and which imports dominate.
+
+Runs `scripts/generate_report.py --help` in fresh interpreters and reports the
+median wall time, the slowest modules from `python -X importtime`, and which
+heavy optional modules (LLM clients, plotting, SQL agent) were loaded.
+"""
+import typer
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CLI = PROJECT_ROOT / "scripts" / "generate_report.py"
+
+# Modules that should only load on code paths that need them
+HEAVY_MODULES = [
+    "langchain_openai",
+    "openai",
+    "langgraph",
+    "langchain_community",
+    "sqlalchemy",
+    "matplotlib",
+    "seaborn",
+    "markdown_pdf",
+]
+
+app = typer.Typer()
+
+
+def _wall_time(args: List[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=PROJECT_ROOT, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def _import_profile(args: List[str]) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every module imported by a command."""
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True)
+    profile = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, module = (part.strip() for part in line[len("import time:"):].split("|"))
+        profile.append((module, int(self_us), int(cumulative_us)))
+    return profile
+
+
+@app.command()
+def measure(
+    runs: int = typer.Option(5, "--runs", "-n", help="Number of cold starts to time"),
+    top: int = typer.Option(10, "--top", help="Number of slowest top-level imports to list"),
+):
+    """Time cold starts of the report CLI and list the heaviest imports."""
+    args = [str(CLI), "--help"]
+    timings = [_wall_time(args) for _ in range(runs)]
+    typer.echo(f"generate_report.py --help: median {statistics.median(timings):.2f}s "
+               f"(min {min(timings):.2f}s, max {max(timings):.2f}s, {runs} runs)")
+
+    profile = _import_profile(args)
+    loaded = {module.split(".")[0] for module, _, _ in profile}
+    top_level = sorted(
+        ((module, cumulative) for module, _, cumulative in profile if "." not in module),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    typer.echo("\nSlowest top-level imports:")
+    for module, cumulative in top_level[:top]:
+        typer.echo(f"  {module:<30} {cumulative / 1000:8.1f} ms")
+
+    typer.echo("\nHeavy modules loaded at startup:")
+    for module in HEAVY_MODULES:
+        typer.echo(f"  {module:<30} {'yes' if module in loaded else 'no'}")
+
+
+if __name__ == "__main__":
+    app()
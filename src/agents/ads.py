@@ -1,15 +1,20 @@
 import pandas as pd
 import logging
+from typing import TYPE_CHECKING, Optional
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from src.agents.analyst import AnalystAgent
+from src.analytics.lift import ADS_METRICS, compute_lift
 from src.prompts import ADS_PERFORMANCE_PROMPT, ANALYST_OUTPUT_INSTRUCTIONS
 import traceback
 
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
 logger = logging.getLogger(__name__)
 
 
 RELEVANT_TABLES = "restaurant_metrics, ads_data"
+NO_CAMPAIGN_DATA = "No campaign data available"
+ADS_ANALYSIS_ERROR = "Error analyzing ad performance"  # Placeholder returned when the analysis fails
 
 class AdsOutput(BaseModel):
     """Schema for ads analysis output"""
@@ -22,12 +27,20 @@ class AdsOutput(BaseModel):
     total_revenue_generated: float = Field(description="Total revenue from ad campaigns")
     roi: float = Field(description="ROI from ad campaigns")
     campaign_analysis: str = Field(description="Campaign analysis of ad performance")
+    error: bool = Field(default=False, exclude=True, description="Set on the placeholder returned when the agent failed")
     # llm_summary: str = Field(description="LLM generated insights on ad performance")
 
 class AdsAnalyzerAgent:
     """Agent to analyze ad performance and generate insights"""
-    def __init__(self, llm: ChatOpenAI):
+    def __init__(self, llm: Optional["ChatOpenAI"], exploratory: bool = False):
+        """
+        Args:
+            llm: Language model used by the SQL analyst in exploratory mode
+            exploratory: Let the ReAct SQL agent answer the campaign comparison instead of the
+                deterministic lift engine
+        """
         self.llm = llm
+        self.exploratory = exploratory
 
     def analyze(self, master_df: pd.DataFrame, metrics_df: pd.DataFrame, ads_df: pd.DataFrame) -> AdsOutput:
         """Analyze ad performance and generate insights"""
@@ -37,12 +50,20 @@ class AdsAnalyzerAgent:
 
             restaurant_id = master_df['restaurant_id'].iloc[0]
 
-            analyst_agent = AnalystAgent(self.llm)
-            campaign_analysis = analyst_agent.run_analysis(ADS_PERFORMANCE_PROMPT.format(
-                restaurant_id=restaurant_id, 
-                tables=RELEVANT_TABLES, 
-                output_format=ANALYST_OUTPUT_INSTRUCTIONS
-            ))
+            if self.exploratory:
+                # The SQL agent pulls in langgraph and the SQL toolkits; only load them when used
+                from src.agents.analyst import AnalystAgent
+
+                analyst_agent = AnalystAgent(self.llm)
+                campaign_analysis = analyst_agent.run_analysis(ADS_PERFORMANCE_PROMPT.format(
+                    restaurant_id=restaurant_id, 
+                    tables=RELEVANT_TABLES, 
+                    output_format=ANALYST_OUTPUT_INSTRUCTIONS
+                ))
+            else:
+                campaign_analysis = compute_lift(
+                    metrics_df, ads_df, 'campaign_start', 'campaign_end', ADS_METRICS, label_col='campaign_id'
+                ).to_markdown("Campaign")
 
             # Add 1 to include both start and end dates
             total_ad_days = (ads_df['campaign_end'] - ads_df['campaign_start']).dt.days.sum() + len(ads_df)
@@ -65,10 +86,10 @@ class AdsAnalyzerAgent:
         except Exception as e:
             logger.error(f"Error analyzing ad performance: {str(e)}")
             traceback.print_exc()
-            return self._get_empty_analysis()
+            return self._get_empty_analysis(ADS_ANALYSIS_ERROR, error=True)
 
-    def _get_empty_analysis(self) -> AdsOutput:
-        """Return empty analysis when no data is available"""
+    def _get_empty_analysis(self, campaign_analysis: str = NO_CAMPAIGN_DATA, error: bool = False) -> AdsOutput:
+        """Return empty analysis when no data is available (or, flagged as an error, when the analysis failed)"""
         return AdsOutput(
             total_ad_days=0,
             total_spend=0,
@@ -78,7 +99,8 @@ class AdsAnalyzerAgent:
             conversion_rate=0,
             total_revenue_generated=0,
             roi=0,
-            campaign_analysis="No campaign data available",
+            campaign_analysis=campaign_analysis,
+            error=error,
             # llm_summary="No campaign data available"
         )
 
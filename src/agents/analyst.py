@@ -1,19 +1,137 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+
 from langchain_community.utilities.sql_database import SQLDatabase
 from langchain_community.agent_toolkits import SQLDatabaseToolkit
-from src.prompts import SQL_AGENT_SYSTEM_PROMPT
+from langchain_core.messages import AIMessage
 from langgraph.prebuilt import create_react_agent
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+from src.loaders import resolve_db_path
+from src.prompts import SQL_AGENT_SYSTEM_PROMPT
+from src.utils.schema_digest import get_schema_digest
+
+logger = logging.getLogger(__name__)
+
+# Memory-map up to 256MB of the database file for reads
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Tool calls the agent made to rediscover the schema before the digest was in its prompt
+DISCOVERY_TOOLS = ("sql_db_list_tables", "sql_db_schema")
+
+_databases: Dict[Tuple[Path, bool], SQLDatabase] = {}
+_databases_lock = threading.Lock()
+
+_run_totals = {"runs": 0, "llm_round_trips": 0, "tool_calls": 0, "discovery_calls": 0,
+               "estimated_round_trips_saved": 0}
+_run_totals_lock = threading.Lock()
+
+
+def _create_engine(db_path: Path, immutable: bool, pool_size: int):
+    """Create a pooled, read-only SQLAlchemy engine for a SQLite file."""
+    uri = f"sqlite:///file:{db_path}?mode=ro&uri=true"
+    if immutable:
+        # Skips all locking and change detection; only safe while nothing writes to the file
+        uri += "&immutable=1"
+    engine = create_engine(
+        uri,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=pool_size,
+        # Pooled connections are handed to whichever thread checks them out
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    return engine
+
+
+def get_database(db_path: Optional[Path] = None, immutable: Optional[bool] = None) -> SQLDatabase:
+    """
+    Return the process-wide read-only database handle, creating it on first use.
+
+    The schema is reflected once per process and the handle (with its connection
+    pool) is shared by every AnalystAgent, including concurrent ones in batch runs.
+
+    Args:
+        db_path: SQLite file to open (defaults to db/dineout.db under the project root)
+        immutable: Open with SQLite's `immutable` flag; defaults to the DINEOUT_DB_IMMUTABLE
+            environment variable. Leave off if anything may write to the file while running.
+
+    Returns:
+        Shared SQLDatabase
+    """
+    path = resolve_db_path(db_path)
+    if immutable is None:
+        immutable = os.getenv("DINEOUT_DB_IMMUTABLE", "").lower() in ("1", "true", "yes")
+
+    key = (path, immutable)
+    with _databases_lock:
+        database = _databases.get(key)
+        if database is None:
+            if not path.exists():
+                raise FileNotFoundError(f"Database not found at {path}")
+            pool_size = int(os.getenv("DINEOUT_DB_POOL_SIZE", "8"))
+            database = SQLDatabase(_create_engine(path, immutable, pool_size))
+            _databases[key] = database
+            logger.info(f"Opened read-only database {path}")
+        return database
+
+
+def get_analyst_stats() -> Dict[str, int]:
+    """Round trip totals across all analyst runs in this process."""
+    with _run_totals_lock:
+        return dict(_run_totals)
+
+
+def _run_stats(messages: List[Any]) -> Dict[str, int]:
+    """Count LLM round trips and tool calls in a finished agent conversation."""
+    tool_names = [
+        call["name"]
+        for message in messages if isinstance(message, AIMessage)
+        for call in message.tool_calls
+    ]
+    discovery_calls = sum(1 for name in tool_names if name in DISCOVERY_TOOLS)
+    return {
+        "llm_round_trips": sum(1 for message in messages if isinstance(message, AIMessage)),
+        "tool_calls": len(tool_names),
+        "discovery_calls": discovery_calls,
+        # An estimate, not a measurement: without the digest the prompt had the agent list the tables and
+        # then fetch their schemas, assumed here to take one round trip per discovery tool
+        "estimated_round_trips_saved": max(0, len(DISCOVERY_TOOLS) - discovery_calls),
+    }
 
-# Initialize database connection
-DB = SQLDatabase.from_uri("sqlite:///db/dineout.db")
 
 class AnalystAgent:
-    def __init__(self, llm):
+    def __init__(self, llm, db_path: Optional[Path] = None):
         self.llm = llm
-        self.tools = SQLDatabaseToolkit(db=DB, llm=self.llm).get_tools()
+        self.db = get_database(db_path)
+        self.tools = SQLDatabaseToolkit(db=self.db, llm=self.llm).get_tools()
+        self.system_prompt = SQL_AGENT_SYSTEM_PROMPT.format(
+            schema_digest=get_schema_digest(resolve_db_path(db_path))
+        )
+        self.last_run_stats: Dict[str, int] = {}
 
     def run_analysis(self, query):
-        agent_executor = create_react_agent(self.llm, self.tools, prompt=SQL_AGENT_SYSTEM_PROMPT)
+        agent_executor = create_react_agent(self.llm, self.tools, prompt=self.system_prompt)
 
         response_messages = agent_executor.invoke({"messages": [{"role": "user", "content": query}]})['messages']
-        return response_messages[-1].content
 
+        self.last_run_stats = _run_stats(response_messages)
+        with _run_totals_lock:
+            _run_totals["runs"] += 1
+            for name, value in self.last_run_stats.items():
+                _run_totals[name] += value
+        logger.info(f"SQL analysis stats: {self.last_run_stats}")
+
+        return response_messages[-1].content
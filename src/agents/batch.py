@@ -0,0 +1,217 @@
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from tabulate import tabulate
+
+from src.llm import BATCH
+from src.loaders import DataLoader
+from src.agents.orchestrator import ReportOrchestrator, fingerprint_data
+from src.utils.chart_renderer import BATCH_DPI, ChartRenderer, configure_style
+from src.utils.checkpoints import BatchManifest
+from src.utils.instrumentation import PERCENTILES, aggregate
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of generating one restaurant's report in a batch run"""
+    restaurant_id: str
+    status: str  # "ok" or "failed"
+    latency_seconds: float
+    markdown_path: Optional[str] = None
+    error: Optional[str] = None
+    run_metrics: Optional[Dict[str, Any]] = None  # Summary written to the report's run_metrics.json
+    resumed: bool = False  # Generated by the batch run being resumed, not by this one
+    data_fingerprint: Optional[str] = None  # Of the data the report was generated from
+
+
+class BatchReportRunner:
+    """Generates reports for many restaurants concurrently.
+
+    Report generation is dominated by LLM round trips, so orchestrations run on a
+    thread pool. Charts are CPU-bound, so each report's trends step queues its chart
+    on a separate process pool and the report waits for it only at the end. Each restaurant is isolated: a
+    failure is recorded in its BatchResult and does not stop the rest of the batch.
+    """
+
+    def __init__(self, workers: int = 4, data_loader: Optional[DataLoader] = None, use_cache: bool = True,
+                 exploratory_sql: bool = False, chart_renderer: Optional[ChartRenderer] = None,
+                 chart_workers: Optional[int] = None, structured_only: bool = False,
+                 offline: Optional[bool] = None, stream: bool = False, incremental: bool = True,
+                 resume: bool = False, report_mode: str = "template"):
+        """Initialize the batch runner.
+
+        Args:
+            workers: Maximum number of reports generated at the same time
+            data_loader: Loader shared by all orchestrations (defaults to the CSV-backed DataLoader)
+            use_cache: Serve repeated LLM calls from the persistent response cache
+            exploratory_sql: Use the ReAct SQL agent for campaign/discount comparisons
+            chart_renderer: Renderer for the report charts (defaults to PNG at the default DPI)
+            chart_workers: Processes rendering charts (defaults to the CPU count; 0 renders
+                each chart inside its report instead)
+            structured_only: Save the agents' structured outputs as JSON without any LLM calls
+            offline: Use the deterministic offline chat model (defaults to DINEOUT_LLM=offline)
+            stream: Write each report to its report.md.partial as it is generated
+            incremental: Reuse stored agent outputs whose inputs are unchanged
+            resume: Skip the reports an interrupted batch with the same settings already
+                generated and continue failed reports from their checkpoints
+            report_mode: "template" (tables rendered from the agent outputs, LLM narrative only),
+                "llm" (the LLM writes the whole report) or "sections" (each section written concurrently)
+        """
+        self.workers = max(1, workers)
+        self.data_loader = data_loader or DataLoader()
+        self.use_cache = use_cache
+        self.exploratory_sql = exploratory_sql
+        self.chart_renderer = chart_renderer or ChartRenderer(dpi=BATCH_DPI)
+        self.chart_workers = chart_workers
+        self.structured_only = structured_only
+        self.offline = offline
+        self.stream = stream
+        self.incremental = incremental
+        self.resume = resume
+        self.report_mode = report_mode
+
+    def _unchanged(self, restaurant_id: str, data_fingerprint: Optional[str]) -> bool:
+        """Whether a restaurant's data still has the fingerprint recorded with its report."""
+        try:
+            return fingerprint_data(self.data_loader.load_data(restaurant_id)) == data_fingerprint
+        except Exception:
+            return False
+
+    def _run_one(self, restaurant_id: str, chart_pool: Optional[ProcessPoolExecutor] = None) -> BatchResult:
+        """Generate a single report, capturing latency and any error."""
+        start = time.perf_counter()
+        orchestrator = None
+        try:
+            orchestrator = ReportOrchestrator(
+                restaurant_id,
+                data_loader=self.data_loader,
+                use_cache=self.use_cache,
+                exploratory_sql=self.exploratory_sql,
+                chart_renderer=self.chart_renderer,
+                chart_pool=chart_pool,
+                structured_only=self.structured_only,
+                offline=self.offline,
+                stream=self.stream,
+                incremental=self.incremental,
+                resume=self.resume,
+                report_mode=self.report_mode,
+                priority=BATCH,
+            )
+            report = orchestrator.generate_report()
+            return BatchResult(
+                restaurant_id=restaurant_id,
+                status="ok",
+                latency_seconds=time.perf_counter() - start,
+                markdown_path=report.get('markdown_path') or report.get('json_path'),
+                run_metrics=orchestrator.run_metrics,
+                data_fingerprint=orchestrator.data_fingerprint,
+            )
+        except Exception as e:
+            logger.error(f"Report for {restaurant_id} failed: {str(e)}")
+            return BatchResult(
+                restaurant_id=restaurant_id,
+                status="failed",
+                latency_seconds=time.perf_counter() - start,
+                error=str(e),
+                run_metrics=orchestrator.run_metrics if orchestrator is not None else None,
+            )
+
+    def run(self, restaurant_ids: List[str],
+            on_result: Optional[Callable[[BatchResult], None]] = None) -> List[BatchResult]:
+        """Generate reports for all restaurants.
+
+        Args:
+            restaurant_ids: Restaurants to generate reports for
+            on_result: Optional callback invoked as each report finishes
+
+        Returns:
+            Results in the same order as `restaurant_ids`
+
+        Every batch records the reports it generated, with the fingerprint of each report's
+        data, in a batch manifest that is removed once every report succeeded, so any
+        interrupted or partly failed batch can be resumed. A resumed batch skips the
+        recorded reports whose data is unchanged and regenerates the rest.
+        """
+        results = {}
+        manifest = BatchManifest()
+        settings = {'structured_only': self.structured_only, 'exploratory_sql': self.exploratory_sql,
+                    'offline': self.offline, 'report_mode': self.report_mode,
+                    'charts': [self.chart_renderer.fmt, self.chart_renderer.dpi]}
+        for restaurant_id, entry in manifest.start(restaurant_ids, settings, self.resume).items():
+            if not self._unchanged(restaurant_id, entry.get("data")):
+                logger.info(f"Regenerating the report for {restaurant_id}: its data changed since the batch ran")
+                manifest.forget(restaurant_id)
+                continue
+            results[restaurant_id] = BatchResult(restaurant_id=restaurant_id, status="ok", latency_seconds=0.0,
+                                                 markdown_path=entry.get("report"), resumed=True,
+                                                 data_fingerprint=entry.get("data"))
+            if on_result:
+                on_result(results[restaurant_id])
+        pending = [rid for rid in restaurant_ids if rid not in results]
+
+        render_pool = None
+        if self.chart_workers != 0 and len(pending) > 1:
+            render_pool = ProcessPoolExecutor(max_workers=self.chart_workers, initializer=configure_style)
+            # The first task forks every worker, so they are forked before the report threads start
+            render_pool.submit(configure_style)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(self._run_one, rid, render_pool): rid for rid in pending}
+                for future in as_completed(futures):
+                    result = future.result()
+                    results[result.restaurant_id] = result
+                    if result.status == "ok":
+                        manifest.record(result.restaurant_id, result.markdown_path, result.data_fingerprint)
+                    if on_result:
+                        on_result(result)
+        finally:
+            if render_pool is not None:
+                render_pool.shutdown(cancel_futures=True)
+        if all(result.status == "ok" for result in results.values()):
+            manifest.clear()
+        return [results[rid] for rid in restaurant_ids]
+
+    @staticmethod
+    def format_summary(results: List[BatchResult], wall_seconds: Optional[float] = None) -> str:
+        """Render a summary table of batch results."""
+        rows = [
+            [r.restaurant_id, f"{r.status} (resumed)" if r.resumed else r.status, f"{r.latency_seconds:.1f}",
+             r.markdown_path or (r.error or "")[:100]]
+            for r in results
+        ]
+        table = tabulate(rows, headers=["Restaurant", "Status", "Latency (s)", "Report / Error"], tablefmt="github")
+
+        succeeded = sum(1 for r in results if r.status == "ok")
+        summary = f"{succeeded}/{len(results)} reports generated"
+        if wall_seconds is not None:
+            summary += f" in {wall_seconds:.1f}s wall time"
+        return f"{table}\n\n{summary}"
+
+    @staticmethod
+    def aggregate_metrics(results: List[BatchResult]) -> Dict[str, Any]:
+        """Percentiles of latency, per-step time, LLM round trips and tokens across the batch."""
+        return aggregate([r.run_metrics for r in results if r.run_metrics is not None])
+
+    @staticmethod
+    def format_metrics(aggregated: Dict[str, Any]) -> str:
+        """Render aggregated run metrics as a percentile table."""
+        columns = [f"p{p}" for p in PERCENTILES] + ["max"]
+        rows = [
+            ["report wall (s)"] + [aggregated["wall_seconds"].get(c) for c in columns],
+            ["report cpu (s)"] + [aggregated["cpu_seconds"].get(c) for c in columns],
+        ]
+        rows += [[f"  {name} (s)"] + [stats.get(c) for c in columns] for name, stats in aggregated["steps"].items()]
+        rows += [
+            ["llm round trips"] + [aggregated["llm_round_trips"].get(c) for c in columns],
+            ["prompt tokens"] + [aggregated["prompt_tokens"].get(c) for c in columns],
+            ["completion tokens"] + [aggregated["completion_tokens"].get(c) for c in columns],
+            ["llm queue wait (s)"] + [aggregated["llm_queue_seconds"].get(c) for c in columns],
+        ]
+        table = tabulate(rows, headers=["Metric"] + columns, tablefmt="github", floatfmt=".2f")
+        return f"{table}\n\nPeak RSS: {aggregated['peak_rss_mb']:.0f} MB over {aggregated['reports']} reports"
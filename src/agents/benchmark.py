@@ -1,16 +1,22 @@
 import pandas as pd
 import logging
+from typing import TYPE_CHECKING, Optional
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 import traceback
 from src.agents.trends import TrendsOutput
 from src.agents.ads import AdsOutput
 from src.agents.discount import DiscountOutput
 from src.prompts import BENCHMARK_SYSTEM_PROMPT, BENCHMARK_USER_PROMPT
-import json
+from src.utils.prompt_builder import PromptBuilder
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 logger = logging.getLogger(__name__)
 
+NO_BENCHMARK_DATA = "No benchmark data available"
+BENCHMARK_ERROR = "Error analyzing benchmark performance"  # Placeholder returned when the analysis fails
+
 
 
 class BookingsComparison(BaseModel):
@@ -61,10 +67,15 @@ class BenchmarkOutput(BaseModel):
     ads_comparison: AdsComparison = Field(description="Comparison of ads stats against peers")
     discount_comparison: DiscountComparison = Field(description="Comparison of discount stats against peers")
     llm_summary: str = Field(description="LLM generated insights on competitive position")
+    error: bool = Field(default=False, exclude=True, description="Set on the placeholder returned when the agent failed")
 
 class BenchmarkAnalyzerAgent:
     """Agent to analyze restaurant performance against peer benchmarks"""
-    def __init__(self, llm: ChatOpenAI):
+    def __init__(self, llm: Optional["ChatOpenAI"]):
+        """
+        Args:
+            llm: Language model for the competitive position summary; None skips the summary
+        """
         self.llm = llm
 
     def analyze(self, benchmarks_df: pd.DataFrame, trends_output: TrendsOutput, 
@@ -141,6 +152,16 @@ class BenchmarkAnalyzerAgent:
                 gap_discount_percentage=round(discount_percentage_gap, 2)
             )
 
+            if self.llm is None:
+                return BenchmarkOutput(
+                    bookings_comparison=bookings_comparison,
+                    revenue_comparison=revenue_comparison,
+                    rating_comparison=rating_comparison,
+                    ads_comparison=ads_comparison,
+                    discount_comparison=discount_comparison,
+                    llm_summary=""
+                )
+
             # Generate LLM summary
             core_metrics = {
                 "bookings_comparison": bookings_comparison.model_dump(),
@@ -156,14 +177,14 @@ class BenchmarkAnalyzerAgent:
                 "discount_comparison": discount_comparison.model_dump()
             }
 
-            messages = [
-                {"role": "system", "content": BENCHMARK_SYSTEM_PROMPT},
-                {"role": "user", "content": BENCHMARK_USER_PROMPT.format(
-                    core_metrics_json=json.dumps(core_metrics, indent=4),
-                    ads_json=json.dumps(ads_data, indent=4),
-                    discount_json=json.dumps(discount_data, indent=4)
-                )}
-            ]
+            # Zeros stay: the summary calls out zero-activity areas as untapped opportunities
+            messages = (
+                PromptBuilder("benchmark")
+                .add_json("core_metrics_json", core_metrics)
+                .add_json("ads_json", ads_data)
+                .add_json("discount_json", discount_data)
+                .build(BENCHMARK_SYSTEM_PROMPT, BENCHMARK_USER_PROMPT)
+            )
             
             llm_summary = self.llm.invoke(messages).content
             
@@ -179,16 +200,17 @@ class BenchmarkAnalyzerAgent:
         except Exception as e:
             logger.error(f"Error analyzing benchmark performance: {str(e)}")
             traceback.print_exc()
-            return self._get_empty_analysis()
+            return self._get_empty_analysis(BENCHMARK_ERROR, error=True)
 
-    def _get_empty_analysis(self) -> BenchmarkOutput:
-        """Return empty analysis when no data is available"""
+    def _get_empty_analysis(self, llm_summary: str = NO_BENCHMARK_DATA, error: bool = False) -> BenchmarkOutput:
+        """Return empty analysis when no data is available (or, flagged as an error, when the analysis failed)"""
         return BenchmarkOutput(
             bookings_comparison=BookingsComparison(total_bookings=0, total_peer_bookings=0, gap=0),
             revenue_comparison=RevenueComparison(total_revenue=0, total_peer_revenue=0, gap=0),
             rating_comparison=RatingComparison(rating=0, peer_rating=0, gap=0),
             ads_comparison=AdsComparison(avg_ad_spend=0, ads_roi=0, avg_ad_spend_peer=0, ads_roi_peer=0, gap_ads_roi=0, gap_ad_spend=0),
             discount_comparison=DiscountComparison(avg_discount_percentage=0, discount_roi=0, avg_discount_percentage_peer=0, discount_roi_peer=0, gap_discount_roi=0, gap_discount_percentage=0),
-            llm_summary="No benchmark data available"
+            llm_summary=llm_summary,
+            error=error,
         )
     
\ No newline at end of file
@@ -1,14 +1,19 @@
 import pandas as pd
 import logging
+from typing import TYPE_CHECKING, Optional
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from src.agents.analyst import AnalystAgent
+from src.analytics.lift import DISCOUNT_METRICS, compute_lift
 from src.prompts import DISCOUNT_PERFORMANCE_PROMPT, ANALYST_OUTPUT_INSTRUCTIONS
 import traceback
 
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
 logger = logging.getLogger(__name__)
 
 RELEVANT_TABLES = "restaurant_metrics, discount_history"
+NO_DISCOUNT_DATA = "No discount data available"
+DISCOUNT_ANALYSIS_ERROR = "Error analyzing discount performance"  # Placeholder returned when the analysis fails
 
 class DiscountOutput(BaseModel):
     """Schema for discount analysis output"""
@@ -16,11 +21,19 @@ class DiscountOutput(BaseModel):
     avg_discount_percent: float = Field(description="Average discount percentage")
     roi: float = Field(description="ROI from discount campaigns")
     discount_analysis: str = Field(description="Analysis of discount performance")
+    error: bool = Field(default=False, exclude=True, description="Set on the placeholder returned when the agent failed")
 
 class DiscountAnalyzerAgent:
     """Agent to analyze discount performance and generate insights"""
-    def __init__(self, llm: ChatOpenAI):
+    def __init__(self, llm: Optional["ChatOpenAI"], exploratory: bool = False):
+        """
+        Args:
+            llm: Language model used by the SQL analyst in exploratory mode
+            exploratory: Let the ReAct SQL agent answer the discount comparison instead of the
+                deterministic lift engine
+        """
         self.llm = llm
+        self.exploratory = exploratory
 
     def analyze(self, master_df: pd.DataFrame, metrics_df: pd.DataFrame, discounts_df: pd.DataFrame) -> DiscountOutput:
         """Analyze discount performance and generate insights"""
@@ -30,12 +43,20 @@ class DiscountAnalyzerAgent:
 
             restaurant_id = master_df['restaurant_id'].iloc[0]
             
-            analyst_agent = AnalystAgent(self.llm)
-            discount_analysis = analyst_agent.run_analysis(DISCOUNT_PERFORMANCE_PROMPT.format(
-                restaurant_id=restaurant_id, 
-                tables=RELEVANT_TABLES,
-                output_format=ANALYST_OUTPUT_INSTRUCTIONS
-            ))
+            if self.exploratory:
+                # The SQL agent pulls in langgraph and the SQL toolkits; only load them when used
+                from src.agents.analyst import AnalystAgent
+
+                analyst_agent = AnalystAgent(self.llm)
+                discount_analysis = analyst_agent.run_analysis(DISCOUNT_PERFORMANCE_PROMPT.format(
+                    restaurant_id=restaurant_id, 
+                    tables=RELEVANT_TABLES,
+                    output_format=ANALYST_OUTPUT_INSTRUCTIONS
+                ))
+            else:
+                discount_analysis = compute_lift(
+                    metrics_df, discounts_df, 'start_date', 'end_date', DISCOUNT_METRICS, label_col='discount_type'
+                ).to_markdown("Discount")
 
             total_discount_days = (discounts_df['end_date'] - discounts_df['start_date']).dt.days.sum() + len(discounts_df)
 
@@ -49,13 +70,14 @@ class DiscountAnalyzerAgent:
         except Exception as e:
             logger.error(f"Error analyzing discount performance: {str(e)}")
             traceback.print_exc()
-            return self._get_empty_analysis()
+            return self._get_empty_analysis(DISCOUNT_ANALYSIS_ERROR, error=True)
 
-    def _get_empty_analysis(self) -> DiscountOutput:
-        """Return empty analysis when no data is available"""
+    def _get_empty_analysis(self, discount_analysis: str = NO_DISCOUNT_DATA, error: bool = False) -> DiscountOutput:
+        """Return empty analysis when no data is available (or, flagged as an error, when the analysis failed)"""
         return DiscountOutput(
             total_discount_days=0,
             avg_discount_percent=0,
             roi=0,
-            discount_analysis="No discount data available",
+            discount_analysis=discount_analysis,
+            error=error,
         ) 
\ No newline at end of file
@@ -1,98 +1,431 @@
-from typing import Dict, Any
+from typing import Dict, Any, Callable, List, Optional
 import logging
+import threading
+from concurrent.futures import Executor, Future
 from datetime import datetime
-from langchain_openai import ChatOpenAI
 
+from src.llm import DEFAULT_MODEL, create_llm, offline_requested
 from src.loaders import DataLoader
-from src.agents.benchmark import BenchmarkAnalyzerAgent
-from src.agents.ads import AdsAnalyzerAgent
-from src.agents.discount import DiscountAnalyzerAgent
-from src.agents.recommendations import RecommendationAgent
-from src.agents.trends import TrendsAgent
-from src.agents.report_formatter import ReportFormatterAgent
+from src.agents.benchmark import BenchmarkAnalyzerAgent, BenchmarkOutput
+from src.agents.ads import AdsAnalyzerAgent, AdsOutput
+from src.agents.discount import DiscountAnalyzerAgent, DiscountOutput
+from src.agents.recommendations import RawRecommendation, RecommendationAgent, RecommendationOutput
+from src.agents.trends import TrendsAgent, TrendsOutput
+from src.agents.report_formatter import REPORT_MODES, ReportFormatterAgent, ReportOutput
+from src.analytics.lift import ADS_METRICS, DISCOUNT_METRICS, metric_columns
+from src.utils.agent_cache import fingerprint, get_agent_cache, source_hash
+from src.utils.chart_renderer import ChartRenderer
+from src.utils.checkpoints import CheckpointStore
+from src.utils.dag import Step, run_steps
+from src.utils.instrumentation import RunMetrics
 from src.utils.report_saver import ReportSaver
 
 logger = logging.getLogger(__name__)
 
+# Modules whose source (code and prompts) each reusable step's output depends on
+STEP_SOURCES = {
+    'trends': ('src.agents.trends', 'src.analytics.anomalies', 'src.analytics.portfolio', 'src.utils.chart_renderer'),
+    'ads': ('src.agents.ads', 'src.analytics.lift', 'src.agents.analyst', 'src.prompts'),
+    'discounts': ('src.agents.discount', 'src.analytics.lift', 'src.agents.analyst', 'src.prompts'),
+    'benchmarks': ('src.agents.benchmark', 'src.prompts', 'src.utils.prompt_builder'),
+    'recommendations': ('src.agents.recommendations', 'src.prompts', 'src.utils.prompt_builder'),
+    'format_report': ('src.agents.report_formatter', 'src.agents.report_template', 'src.prompts',
+                      'src.utils.prompt_builder'),
+}
+
+
+def fingerprint_data(data: Dict[str, Any]) -> str:
+    """Fingerprint of a restaurant's loaded data, recorded with checkpoints and batch manifests."""
+    return fingerprint(*(data[key] for key in sorted(data)))
+
+
 class ReportOrchestrator:
-    def __init__(self, restaurant_id: str):
-        """Initialize the report orchestrator."""
+    def __init__(self, restaurant_id: str, data_loader: Optional[DataLoader] = None, max_workers: int = 3,
+                 use_cache: bool = True, exploratory_sql: bool = False,
+                 chart_renderer: Optional[ChartRenderer] = None, render_charts: bool = True,
+                 structured_only: bool = False, offline: Optional[bool] = None, stream: bool = False,
+                 on_report_chunk: Optional[Callable[[str], None]] = None, incremental: bool = True,
+                 resume: bool = False, report_mode: str = "template", priority: Optional[int] = None,
+                 chart_pool: Optional[Executor] = None):
+        """Initialize the report orchestrator.
+
+        Args:
+            restaurant_id: The ID of the restaurant to generate the report for
+            data_loader: Loader to read restaurant data with (defaults to the CSV-backed DataLoader)
+            max_workers: Maximum number of independent steps run at once (1 runs the pipeline sequentially)
+            use_cache: Serve repeated LLM calls from the persistent response cache
+            exploratory_sql: Answer the campaign/discount comparisons with the ReAct SQL agent
+                instead of the deterministic lift engine
+            chart_renderer: Renderer for the report charts (defaults to PNG at the default DPI)
+            render_charts: Draw the charts; pass False when they were already rendered for this data
+            structured_only: Return the agents' structured outputs as JSON without calling (or
+                constructing) an LLM; the LLM-written summaries and the markdown report are skipped
+            offline: Use the deterministic offline chat model (defaults to DINEOUT_LLM=offline)
+            stream: Write the report to report.md.partial as the model generates it and rename it
+                to report.md once complete
+            on_report_chunk: With `stream`, also called with each chunk of the report (e.g. to echo it)
+            incremental: Reuse each agent's stored output when the fingerprint of its inputs is
+                unchanged (off when `use_cache` is off)
+            resume: Continue the last failed or interrupted run from its checkpointed steps
+                (ignored if the data or settings changed since)
+            report_mode: "template" renders the report's tables from the agent outputs and has the
+                LLM write only the narrative; "llm" has the LLM write the whole report; "sections" has
+                the LLM write each section concurrently
+            priority: Scheduling priority of the report's LLM calls when the scheduler queues them
+                (defaults to interactive, ahead of batch reports)
+            chart_pool: Executor (e.g. a batch run's process pool) to render the charts on while the
+                other steps run; the report waits for them before it is returned
+        """
+        if structured_only and exploratory_sql:
+            raise ValueError("structured_only cannot be combined with exploratory_sql, which needs an LLM")
+        if report_mode not in REPORT_MODES:
+            raise ValueError(f"Unknown report mode {report_mode!r}; expected one of {', '.join(REPORT_MODES)}")
         self.restaurant_id = restaurant_id
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0)
-        self.data_loader = DataLoader()
-        
-    def generate_report(self) -> Dict[str, Any]:
-        """Generate a comprehensive report for a restaurant."""
+        self.use_cache = use_cache
+        self.structured_only = structured_only
+        self.offline = offline
+        self.priority = priority
+        self._llm = None
+        self._llm_lock = threading.Lock()
+        self.data_loader = data_loader or DataLoader()
+        self.max_workers = max_workers
+        self.exploratory_sql = exploratory_sql
+        self.chart_renderer = chart_renderer or ChartRenderer()
+        self.render_charts = render_charts
+        self.chart_pool = chart_pool
+        self.pending_charts: List[Future] = []
+        self.stream = stream
+        self.on_report_chunk = on_report_chunk
+        self.incremental = incremental and use_cache
+        self.resume = resume
+        self.report_mode = report_mode
+        self.reused_steps: List[str] = []
+        self.resumed_steps: List[str] = []
+        self.fallback_steps: List[str] = []
+        self.first_content_seconds: Optional[float] = None
+        self.data_fingerprint: Optional[str] = None
+        self.run_metrics: Optional[Dict[str, Any]] = None
+
+    @property
+    def llm(self):
+        """Chat model shared by the agents, created on first use so LLM-free paths never build a client."""
+        with self._llm_lock:
+            if self._llm is None:
+                self._llm = create_llm(use_cache=self.use_cache, offline=self.offline, priority=self.priority)
+            return self._llm
+
+    def _load_data(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info("Step 1: Loading data...")
+        return self.data_loader.load_data(self.restaurant_id)
+
+    def _analyze_trends(self, results: Dict[str, Any]) -> TrendsOutput:
+        logger.info("Step 2: Analyzing trends...")
+        data = results['load_data']
+        trends_agent = TrendsAgent(
+            portfolio=self.data_loader.portfolio_metrics(),
+            renderer=self.chart_renderer,
+            render_charts=self.render_charts,
+            chart_pool=self.chart_pool,
+        )
+        output = trends_agent.analyze(data['master'], data['metrics'], data['ads'])
+        self.pending_charts.extend(trends_agent.pending_charts)
+        return output
+
+    def _analyze_ads(self, results: Dict[str, Any]) -> AdsOutput:
+        logger.info("Step 3: Analyzing ad performance...")
+        data = results['load_data']
+        ads_agent = AdsAnalyzerAgent(self.llm if self.exploratory_sql else None, exploratory=self.exploratory_sql)
+        return ads_agent.analyze(data['master'], data['metrics'], data['ads'])
+
+    def _analyze_discounts(self, results: Dict[str, Any]) -> DiscountOutput:
+        logger.info("Step 4: Analyzing discount impact...")
+        data = results['load_data']
+        discount_agent = DiscountAnalyzerAgent(self.llm if self.exploratory_sql else None,
+                                               exploratory=self.exploratory_sql)
+        return discount_agent.analyze(data['master'], data['metrics'], data['discounts'])
+
+    def _analyze_benchmarks(self, results: Dict[str, Any]) -> BenchmarkOutput:
+        logger.info("Step 5: Analyzing benchmark data...")
+        benchmark_agent = BenchmarkAnalyzerAgent(None if self.structured_only else self.llm)
+        return benchmark_agent.analyze(
+            results['load_data']['benchmarks'],
+            results['trends'],
+            results['ads'],
+            results['discounts']
+        )
+
+    def _generate_recommendations(self, results: Dict[str, Any]) -> RecommendationOutput:
+        logger.info("Step 6: Generating recommendations...")
+        recommendation_agent = RecommendationAgent(self.llm)
+        return recommendation_agent.generate_recommendations(
+            results['trends'],
+            results['ads'],
+            results['discounts'],
+            results['benchmarks']
+        )
+
+    def _collect_recommendations(self, results: Dict[str, Any]) -> List[RawRecommendation]:
+        logger.info("Step 6: Collecting recommendations...")
+        recommendation_agent = RecommendationAgent(None)
+        return recommendation_agent.build_recommendations(
+            results['trends'],
+            results['ads'],
+            results['discounts'],
+            results['benchmarks']
+        )
+
+    def _format_report(self, results: Dict[str, Any]) -> ReportOutput:
+        logger.info("Step 7: Formatting final report...")
+        formatter = ReportFormatterAgent(self.llm, mode=self.report_mode)
+        stream = ReportSaver(self.restaurant_id).start_stream(self.on_report_chunk) if self.stream else None
         try:
-            # Step 1: Load all required data
-            logger.info("Step 1: Loading data...")
-            data = self.data_loader.load_data(self.restaurant_id)
-            
-            # Extract all dataframes
-            master_df = data['master']
-            metrics_df = data['metrics']
-            ads_df = data['ads']
-            discounts_df = data['discounts']
-            benchmarks_df = data['benchmarks']
-
-            # Step 2: Generate trends analysis
-            logger.info("Step 2: Analyzing trends...")
-            trends_agent = TrendsAgent(self.llm)
-            trends_output = trends_agent.analyze(master_df, metrics_df, ads_df)
-
-            # Step 3: Analyze ad performance
-            logger.info("Step 3: Analyzing ad performance...")
-            ads_agent = AdsAnalyzerAgent(self.llm)
-            ads_output = ads_agent.analyze(master_df, metrics_df, ads_df)
-
-            # Step 4: Analyze discount impact
-            logger.info("Step 4: Analyzing discount impact...")
-            discount_agent = DiscountAnalyzerAgent(self.llm)
-            discount_output = discount_agent.analyze(master_df, metrics_df, discounts_df)
-
-            # Step 5: Generate benchmark analysis
-            logger.info("Step 5: Analyzing benchmark data...")
-            benchmark_agent = BenchmarkAnalyzerAgent(self.llm)
-            benchmark_output = benchmark_agent.analyze(benchmarks_df, trends_output, ads_output, discount_output)
-
-            # Step 6: Generate recommendations
-            logger.info("Step 6: Generating recommendations...")
-            recommendation_agent = RecommendationAgent(self.llm)
-            recommendation_output = recommendation_agent.generate_recommendations(
-                trends_output, 
-                ads_output, 
-                discount_output, 
-                benchmark_output
+            return formatter.format_report(
+                restaurant_info=results['load_data']['master'].iloc[0],
+                trends_output=results['trends'],
+                ads_output=results['ads'],
+                discount_output=results['discounts'],
+                benchmark_output=results['benchmarks'],
+                recommendation_output=results['recommendations'],
+                on_token=stream.write if stream else None
             )
+        finally:
+            if stream:
+                stream.close()
+                self.first_content_seconds = stream.first_chunk_seconds
+                logger.info(f"First report content after {self.first_content_seconds}s")
 
-            # Step 7: Format final report
-            logger.info("Step 7: Formatting final report...")
-            formatter = ReportFormatterAgent(self.llm)
-            report_output = formatter.format_report(
-                restaurant_info=master_df.iloc[0],
-                trends_output=trends_output,
-                ads_output=ads_output,
-                discount_output=discount_output,
-                benchmark_output=benchmark_output,
-                recommendation_output=recommendation_output
-            )
-            
-            # Step 8: Save report to disk
-            logger.info("Step 8: Saving report to disk...")
-            saver = ReportSaver(self.restaurant_id)
-            file_paths = saver.save_report(report_output.markdown_report)
-            
-            # Compile final report
-            report = {
-                'restaurant_id': self.restaurant_id,
-                'markdown_report': report_output.markdown_report,
-                'generated_at': datetime.now().isoformat(),
-                'markdown_path': file_paths['markdown_path'],
-            }
-            
-            logger.info("Report generation completed successfully")
-            return report
-            
+    def _save_report(self, results: Dict[str, Any]) -> Dict[str, str]:
+        logger.info("Step 8: Saving report to disk...")
+        saver = ReportSaver(self.restaurant_id)
+        if self.stream:
+            if self.on_report_chunk and 'format_report' in self.reused_steps + self.resumed_steps:
+                # Nothing was streamed for a reused or resumed report
+                self.on_report_chunk(results['format_report'].markdown_report)
+            return saver.finish_stream(results['format_report'].markdown_report)
+        return saver.save_report(results['format_report'].markdown_report)
+
+    def _structured_output(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'restaurant_id': self.restaurant_id,
+            'generated_at': datetime.now().isoformat(),
+            'trends': results['trends'].model_dump(),
+            'ads': results['ads'].model_dump(),
+            'discounts': results['discounts'].model_dump(),
+            'benchmarks': results['benchmarks'].model_dump(exclude={'llm_summary'}),
+            'recommendations': [r.model_dump() for r in results['recommendations']],
+        }
+
+    def _save_structured(self, results: Dict[str, Any]) -> Dict[str, str]:
+        logger.info("Step 7: Saving structured report to disk...")
+        saver = ReportSaver(self.restaurant_id)
+        return saver.save_json(results['structured'])
+
+    def _steps(self) -> List[Step]:
+        """The report pipeline as a dependency graph.
+
+        Trends, ads and discount analysis only need the loaded data, so they run
+        concurrently; benchmarking waits for all three.
+        """
+        if self.structured_only:
+            return [
+                Step('load_data', self._load_data),
+                Step('trends', self._analyze_trends, ('load_data',)),
+                Step('ads', self._analyze_ads, ('load_data',)),
+                Step('discounts', self._analyze_discounts, ('load_data',)),
+                Step('benchmarks', self._analyze_benchmarks, ('load_data', 'trends', 'ads', 'discounts')),
+                Step('recommendations', self._collect_recommendations, ('trends', 'ads', 'discounts', 'benchmarks')),
+                Step('structured', self._structured_output,
+                     ('trends', 'ads', 'discounts', 'benchmarks', 'recommendations')),
+                Step('save_structured', self._save_structured, ('structured',)),
+            ]
+        return [
+            Step('load_data', self._load_data),
+            Step('trends', self._analyze_trends, ('load_data',)),
+            Step('ads', self._analyze_ads, ('load_data',)),
+            Step('discounts', self._analyze_discounts, ('load_data',)),
+            Step('benchmarks', self._analyze_benchmarks, ('load_data', 'trends', 'ads', 'discounts')),
+            Step('recommendations', self._generate_recommendations, ('trends', 'ads', 'discounts', 'benchmarks')),
+            Step('format_report', self._format_report,
+                 ('load_data', 'trends', 'ads', 'discounts', 'benchmarks', 'recommendations')),
+            Step('save_report', self._save_report, ('format_report',)),
+        ]
+
+    def _model_id(self) -> str:
+        """Identity of the chat model the LLM-written outputs come from."""
+        offline = self.offline if self.offline is not None else offline_requested()
+        return f"offline:{source_hash('src.offline_llm')}" if offline else DEFAULT_MODEL
+
+    def _output_type(self, name: str) -> Any:
+        """Type of the output of a reusable step."""
+        if name == 'recommendations' and self.structured_only:
+            return List[RawRecommendation]
+        return {
+            'trends': TrendsOutput,
+            'ads': AdsOutput,
+            'discounts': DiscountOutput,
+            'benchmarks': BenchmarkOutput,
+            'recommendations': RecommendationOutput,
+            'format_report': ReportOutput,
+        }[name]
+
+    def _step_inputs(self, name: str, results: Dict[str, Any]) -> Optional[List[Any]]:
+        """Everything the output of a reusable step depends on; None for steps that always run."""
+        if name not in STEP_SOURCES:
+            return None
+        data = results['load_data']
+        model = [] if self.structured_only else [self._model_id()]
+        analyst = [self._model_id()] if self.exploratory_sql else []
+        outputs = [results[dep] for dep in ('trends', 'ads', 'discounts', 'benchmarks') if dep in results]
+        inputs = {
+            'trends': lambda: [data['metrics'], data['ads'], self.chart_renderer.fmt, self.chart_renderer.dpi],
+            'ads': lambda: [data['master']['restaurant_id'].iloc[0],
+                            data['metrics'][['date', *metric_columns(ADS_METRICS)]], data['ads'],
+                            self.exploratory_sql, *analyst],
+            'discounts': lambda: [data['master']['restaurant_id'].iloc[0],
+                                  data['metrics'][['date', *metric_columns(DISCOUNT_METRICS)]],
+                                  data['discounts'], self.exploratory_sql, *analyst],
+            'benchmarks': lambda: [data['benchmarks'], *outputs, self.structured_only, *model],
+            'recommendations': lambda: [*outputs, self.structured_only, *model],
+            'format_report': lambda: [data['master'].iloc[0], *outputs, results['recommendations'], self.report_mode,
+                                      *model],
+        }
+        return [source_hash(*STEP_SOURCES[name]), *inputs[name]()]
+
+    def _reusable(self, name: str, output: Any) -> bool:
+        """Whether a stored output can stand in for running the step."""
+        if name == 'trends' and self.render_charts:
+            # The chart is drawn as a side effect of the step
+            return (ReportSaver(self.restaurant_id).output_dir / output.charts.bookings_rolling_7day_path).exists()
+        return True
+
+    def _incremental(self, step: Step) -> Step:
+        """Wrap a step so it reuses its stored output while the fingerprint of its inputs is unchanged."""
+        def run(results: Dict[str, Any]) -> Any:
+            inputs = self._step_inputs(step.name, results)
+            if inputs is None:
+                return step.func(results)
+            output_type = self._output_type(step.name)
+            cache = get_agent_cache()
+            digest = fingerprint(*inputs)
+            stored = cache.load(self.restaurant_id, step.name, digest, output_type)
+            if stored is not None and self._reusable(step.name, stored):
+                logger.info(f"Reusing stored {step.name} output (inputs unchanged)")
+                self.reused_steps.append(step.name)
+                return stored
+            output = step.func(results)
+            # Placeholders of failed agents are never stored for reuse
+            if not getattr(output, 'error', False):
+                cache.store(self.restaurant_id, step.name, digest, output, output_type)
+            return output
+        return step._replace(func=run)
+
+    def _run_settings(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """What a checkpointed run's outputs depend on; a run is only resumed when these are unchanged."""
+        return {
+            'structured_only': self.structured_only,
+            'exploratory_sql': self.exploratory_sql,
+            'model': None if self.structured_only else self._model_id(),
+            'report_mode': None if self.structured_only else self.report_mode,
+            'charts': [self.chart_renderer.fmt, self.chart_renderer.dpi],
+            'data': self.data_fingerprint,
+        }
+
+    def _checkpointed(self, step: Step, checkpoints: CheckpointStore) -> Step:
+        """Wrap a step so its output is checkpointed, and loaded from the checkpoint when resuming."""
+        def run(results: Dict[str, Any]) -> Any:
+            if step.name == 'load_data':
+                data = step.func(results)
+                self.data_fingerprint = fingerprint_data(data)
+                checkpoints.start(self._run_settings(data), self.resume)
+                return data
+            if step.name not in STEP_SOURCES:
+                return step.func(results)
+            output_type = self._output_type(step.name)
+            if self.resume:
+                stored = checkpoints.load(step.name, output_type)
+                if stored is not None and self._reusable(step.name, stored):
+                    logger.info(f"Resuming from the {step.name} checkpoint")
+                    self.resumed_steps.append(step.name)
+                    return stored
+            output = step.func(results)
+            if getattr(output, 'error', False):
+                # Left for the resumed run to retry
+                self.fallback_steps.append(step.name)
+            else:
+                checkpoints.save(step.name, output, output_type)
+            return output
+        return step._replace(func=run)
+
+    def _save_metrics(self, metrics: RunMetrics) -> Optional[str]:
+        """Keep the run's metrics summary and write it to run_metrics.json; never fails the report."""
+        self.run_metrics = metrics.summary()
+        try:
+            return ReportSaver(self.restaurant_id).save_metrics(self.run_metrics)['metrics_path']
+        except OSError:
+            return None
+
+    def generate_report(self) -> Dict[str, Any]:
+        """Generate a comprehensive report for a restaurant.
+
+        In structured-only mode the result has the agents' outputs under 'structured'
+        and the saved JSON file under 'json_path' instead of the markdown report.
+        Each agent's output is checkpointed as it completes, so a failed or interrupted
+        run can be continued with `resume`; the checkpoints are removed once the run
+        completes without agent errors.
+        Timing, memory and LLM usage of every step and LLM/tool call are written to
+        run_metrics.json (also when a step fails) and kept in `run_metrics`.
+        """
+        metrics = RunMetrics(self.restaurant_id)
+        checkpoints = CheckpointStore(self.restaurant_id, ReportSaver(self.restaurant_id).output_dir)
+        status = 'interrupted'
+        try:
+            # Structured-only runs never load LangChain, so only the steps are recorded
+            with metrics.activate(langchain=not self.structured_only):
+                steps = [self._incremental(step) if self.incremental else step for step in self._steps()]
+                steps = [self._checkpointed(step, checkpoints) for step in steps]
+                steps = [step._replace(func=metrics.wrap(step.name, step.func)) for step in steps]
+                results = run_steps(steps, max_workers=self.max_workers)
+                for chart in self.pending_charts:
+                    chart.result()
+            # Only agent errors leave a run incomplete; empty ads, discount or peer data does not
+            status = 'incomplete' if self.fallback_steps else 'complete'
+            if self.fallback_steps:
+                logger.warning(f"Steps {', '.join(self.fallback_steps)} failed for {self.restaurant_id}; "
+                               f"rerun with --resume to retry them")
         except Exception as e:
+            status = 'failed'
             logger.error(f"Error generating report: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+        finally:
+            checkpoints.finish(status, self.fallback_steps)
+            metrics_path = self._save_metrics(metrics)
+
+        if self.structured_only:
+            logger.info("Structured report generation completed successfully")
+            return {
+                'restaurant_id': self.restaurant_id,
+                'structured': results['structured'],
+                'generated_at': results['structured']['generated_at'],
+                'json_path': results['save_structured']['json_path'],
+                'metrics_path': metrics_path,
+                'reused_steps': self.reused_steps,
+                'resumed_steps': self.resumed_steps,
+            }
+
+        report_output = results['format_report']
+        file_paths = results['save_report']
+
+        # Compile final report
+        report = {
+            'restaurant_id': self.restaurant_id,
+            'markdown_report': report_output.markdown_report,
+            'generated_at': datetime.now().isoformat(),
+            'markdown_path': file_paths['markdown_path'],
+            'metrics_path': metrics_path,
+            'first_content_seconds': self.first_content_seconds,
+            'reused_steps': self.reused_steps,
+            'resumed_steps': self.resumed_steps,
+        }
+
+        logger.info("Report generation completed successfully")
+        return report
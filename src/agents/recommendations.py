@@ -1,18 +1,20 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, TYPE_CHECKING, Optional
 import logging
-import json
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
 from src.agents.trends import TrendsOutput
 from src.agents.ads import AdsOutput
 from src.agents.discount import DiscountOutput
 from src.agents.benchmark import BenchmarkOutput
-from src.prompts import RECOMMENDATION_SYSTEM_PROMPT, RECOMMENDATION_USER_PROMPT
+from src.prompts import RECOMMENDATION_CONTEXT_PROMPT, RECOMMENDATION_SYSTEM_PROMPT, RECOMMENDATION_USER_PROMPT
+from src.utils.prompt_builder import PromptBuilder
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 logger = logging.getLogger(__name__)
 
+RECOMMENDATION_ERROR = "Error generating recommendations"
+
 class RawRecommendation(BaseModel):
     """Raw recommendation data before LLM formatting."""
     action: str = Field(description="The specific action to take")
@@ -24,15 +26,16 @@ class RawRecommendation(BaseModel):
 class RecommendationOutput(BaseModel):
     """Output model for recommendations."""
     llm_summary: str = Field(description="LLM generated recommendations based on all analyses")
+    error: bool = Field(default=False, exclude=True, description="Set on the placeholder returned when the agent failed")
 
 class RecommendationAgent:
     """Agent responsible for generating recommendations based on restaurant performance analysis."""
     
-    def __init__(self, llm: ChatOpenAI):
+    def __init__(self, llm: Optional["ChatOpenAI"]):
         """Initialize the recommendation agent.
         
         Args:
-            llm: Language model for generating recommendations
+            llm: Language model for generating recommendations (not needed for build_recommendations)
         """
         self.llm = llm
     
@@ -205,6 +208,24 @@ class RecommendationAgent:
 
         return recommendations
 
+    def build_recommendations(
+        self,
+        trends_output: TrendsOutput,
+        ads_output: AdsOutput,
+        discount_output: DiscountOutput,
+        benchmark_output: BenchmarkOutput
+    ) -> List[RawRecommendation]:
+        """Collect the rule-based recommendations from each area, highest priority first.
+        """
+        raw_recommendations = []
+        raw_recommendations.extend(self._get_ads_recommendations(ads_output, benchmark_output))
+        raw_recommendations.extend(self._get_discount_recommendations(discount_output, benchmark_output))
+        raw_recommendations.extend(self._get_operational_recommendations(trends_output, benchmark_output))
+
+        # Sort by priority
+        raw_recommendations.sort(key=lambda x: x.priority)
+        return raw_recommendations
+
     def generate_recommendations(
         self,
         trends_output: TrendsOutput,
@@ -215,33 +236,22 @@ class RecommendationAgent:
         """Generate prioritized recommendations based on all available analyses.
         """
         try:
-            # Collect raw recommendations from each area
-            raw_recommendations = []
-            raw_recommendations.extend(self._get_ads_recommendations(ads_output, benchmark_output))
-            raw_recommendations.extend(self._get_discount_recommendations(discount_output, benchmark_output))
-            raw_recommendations.extend(self._get_operational_recommendations(trends_output, benchmark_output))
-
-            # Sort by priority
-            raw_recommendations.sort(key=lambda x: x.priority)
-
-            # Convert to JSON for LLM
-            recommendations_json = [r.model_dump() for r in raw_recommendations]
-
-            # Build user prompt with additional context from campaign / discount analysis
-            user_content = RECOMMENDATION_USER_PROMPT.format(
-                recommendations_json=json.dumps(recommendations_json, indent=2)
+            raw_recommendations = self.build_recommendations(
+                trends_output, ads_output, discount_output, benchmark_output
             )
-            user_content += "\n\nAdditional Context:\n\n### Ads Campaign Analysis\n" + ads_output.campaign_analysis + "\n\n### Discount Strategy Analysis\n" + discount_output.discount_analysis
 
-            # Format recommendations using LLM
-            messages = [
-                {"role": "system", "content": RECOMMENDATION_SYSTEM_PROMPT},
-                {"role": "user", "content": user_content}
-            ]
+            # The campaign / discount analyses are context only: dropped or cut first when over budget
+            messages = (
+                PromptBuilder("recommendations")
+                .add_json("recommendations_json", [r.model_dump() for r in raw_recommendations], baseline_indent=2)
+                .add_text("campaign_analysis", ads_output.campaign_analysis, optional=True, truncatable=True)
+                .add_text("discount_analysis", discount_output.discount_analysis, optional=True, truncatable=True)
+                .build(RECOMMENDATION_SYSTEM_PROMPT, RECOMMENDATION_USER_PROMPT + RECOMMENDATION_CONTEXT_PROMPT)
+            )
             
             formatted_recommendations = self.llm.invoke(messages).content.strip()
             return RecommendationOutput(llm_summary=formatted_recommendations)
 
         except Exception as e:
             logger.error(f"Error generating recommendations: {str(e)}")
-            return RecommendationOutput(llm_summary="Error generating recommendations") 
\ No newline at end of file
+            return RecommendationOutput(llm_summary=RECOMMENDATION_ERROR, error=True) 
\ No newline at end of file
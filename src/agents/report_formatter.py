@@ -1,33 +1,207 @@
-from typing import Dict, Any, Union
-import logging
+from typing import Dict, Any, Union, TYPE_CHECKING, Callable, List, Optional
 import json
+import logging
+import re
 import pandas as pd
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 
 from src.agents.trends import TrendsOutput
 from src.agents.ads import AdsOutput
 from src.agents.discount import DiscountOutput
 from src.agents.benchmark import BenchmarkOutput
 from src.agents.recommendations import RecommendationOutput
-from src.prompts import REPORT_FORMATTER_SYSTEM_PROMPT, REPORT_FORMATTER_USER_PROMPT
+from src.agents.report_template import (BodySection, ReportNarrative, body_sections, render_body, render_header,
+                                        section_text)
+from src.llm import stream_invoke
+from src.prompts import (REPORT_FORMATTER_SYSTEM_PROMPT, REPORT_FORMATTER_USER_PROMPT, REPORT_NARRATIVE_SYSTEM_PROMPT,
+                         REPORT_NARRATIVE_USER_PROMPT, REPORT_SECTION_SYSTEM_PROMPTS, REPORT_SECTION_USER_PROMPT,
+                         REPORT_SECTIONS)
+from src.utils.prompt_builder import PromptBuilder
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 logger = logging.getLogger(__name__)
 
+ERROR_REPORT = "# Error Generating Report\n\nThere was an error while generating the report. Please try again."
+
+# "template" renders the tables from the agent outputs and asks the LLM for the narrative only;
+# "llm" has the LLM write the whole report; "sections" has it write each section in a concurrent call
+REPORT_MODES = ("template", "llm", "sections")
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_HEADING = re.compile(r"^#{1,6} .*\n+")
+
 class ReportOutput(BaseModel):
     """Output model for the formatted report."""
     markdown_report: str = Field(description="Final markdown formatted report")
+    error: bool = Field(default=False, exclude=True, description="Set on the placeholder returned when the agent failed")
 
 class ReportFormatterAgent:
     """Agent responsible for formatting all analyses into a final markdown report."""
     
-    def __init__(self, llm: ChatOpenAI):
+    def __init__(self, llm: "ChatOpenAI", mode: str = "template"):
         """Initialize the report formatter agent.
         
         Args:
             llm: Language model for generating the formatted report
+            mode: "template" to render the tables, figures and chart reference from the agent
+                outputs and have the LLM write only the executive summary and narrative;
+                "llm" to have the LLM write the whole report; "sections" to have it write each
+                section in its own call, all issued concurrently
         """
+        if mode not in REPORT_MODES:
+            raise ValueError(f"Unknown report mode {mode!r}; expected one of {', '.join(REPORT_MODES)}")
         self.llm = llm
+        self.mode = mode
+
+    @staticmethod
+    def _payloads(
+        restaurant_info: Dict[str, Any],
+        trends_output: TrendsOutput,
+        ads_output: AdsOutput,
+        discount_output: DiscountOutput,
+        benchmark_output: BenchmarkOutput,
+        recommendation_output: RecommendationOutput,
+    ) -> Dict[str, Any]:
+        """JSON of every analysis by prompt placeholder."""
+        restaurant_info_json = {
+            "name": restaurant_info.get("restaurant_name", ""),
+            "city": restaurant_info.get("city", ""),
+            "locality": restaurant_info.get("locality", ""),
+            "cuisine": restaurant_info.get("cuisine", "")
+        }
+        
+        recent_performance_metrics_json = trends_output.model_dump()
+        
+        # Handle no ad campaigns case
+        if ads_output.total_ad_days == 0:
+            advertising_campaign_analysis_json = {
+                "summary": "No recent advertising campaigns",
+                # "peer_comparison": benchmark_output.ads_comparison.model_dump()
+            }
+        else:
+            advertising_campaign_analysis_json = ads_output.model_dump()
+        
+        # Handle no discounts case
+        if discount_output.total_discount_days == 0:
+            discount_strategy_analysis_json = {
+                "summary": "No recent discount campaigns",
+                # "peer_comparison": benchmark_output.discount_comparison.model_dump()
+            }
+        else:
+            discount_strategy_analysis_json = discount_output.model_dump()
+        
+        peer_benchmarking_summary_json = benchmark_output.model_dump()
+        recommended_next_steps_json = {
+            "bullets": recommendation_output.llm_summary.split("\n")
+        }
+        
+        return {
+            "restaurant_info_json": restaurant_info_json,
+            "recent_performance_metrics_json": recent_performance_metrics_json,
+            "advertising_campaign_analysis_json": advertising_campaign_analysis_json,
+            "discount_strategy_analysis_json": discount_strategy_analysis_json,
+            "peer_benchmarking_summary_json": peer_benchmarking_summary_json,
+            "recommended_next_steps_json": recommended_next_steps_json,
+        }
+
+    @staticmethod
+    def _prompt(payloads: Dict[str, Any]) -> PromptBuilder:
+        """Prompt sections with the JSON of every analysis."""
+        prompt = PromptBuilder("report_formatter")
+        for name, payload in payloads.items():
+            prompt.add_json(name, payload)
+        return prompt
+
+    @staticmethod
+    def _section_inputs(payloads: Dict[str, Any]) -> Dict[str, Any]:
+        """The slice of the data each report section is written from."""
+        trends = payloads["recent_performance_metrics_json"]
+        ads = payloads["advertising_campaign_analysis_json"]
+        discounts = payloads["discount_strategy_analysis_json"]
+        benchmarks = payloads["peer_benchmarking_summary_json"]
+        return {
+            "executive_summary": {
+                "peer_benchmarks": {key: value for key, value in benchmarks.items() if key != "llm_summary"},
+                "averages": trends["averages"],
+                "anomalies": trends["anomalies"],
+                "ads": {key: ads[key] for key in ("summary", "total_ad_days", "roi") if key in ads},
+                "discounts": {key: discounts[key] for key in ("summary", "total_discount_days", "roi")
+                              if key in discounts},
+                "recommendations": payloads["recommended_next_steps_json"]["bullets"],
+            },
+            "performance": trends,
+            "ads": ads,
+            "discounts": discounts,
+            "benchmarks": benchmarks,
+            "recommendations": payloads["recommended_next_steps_json"],
+        }
+
+    def _sections(self, payloads: Dict[str, Any], on_section: Optional[Callable[[str], None]] = None) -> List[str]:
+        """Write every section in a concurrent call; each is passed to `on_section` as soon as it and
+        the sections before it are written."""
+        names = list(REPORT_SECTIONS)
+        inputs = self._section_inputs(payloads)
+        messages = [
+            PromptBuilder(f"report_{name}")
+            .add_json("section_json", inputs[name])
+            .build(REPORT_SECTION_SYSTEM_PROMPTS[name], REPORT_SECTION_USER_PROMPT)
+            for name in names
+        ]
+        done: Dict[int, str] = {}
+        sections: List[str] = []
+        for index, message in self.llm.batch_as_completed(messages, config={"max_concurrency": len(messages)}):
+            heading, _ = REPORT_SECTIONS[names[index]]
+            body = _HEADING.sub("", message.content.strip(), count=1).strip()
+            done[index] = ("\n" if index else "") + f"{heading}\n{body}\n"
+            while len(sections) in done:
+                sections.append(done[len(sections)])
+                if on_section is not None:
+                    on_section(sections[-1])
+        return sections
+
+    def _narrative(self, prompt: PromptBuilder,
+                   on_fields: Optional[Callable[[Dict[str, Any]], None]] = None) -> ReportNarrative:
+        """Ask the LLM for the executive summary and narrative paragraphs as a JSON object.
+
+        Args:
+            prompt: Prompt with the report payloads
+            on_fields: Stream the call, calling this with the fields whose values are complete
+                so far (every key the JSON has moved past) as they arrive
+        """
+        messages = prompt.build(REPORT_NARRATIVE_SYSTEM_PROMPT, REPORT_NARRATIVE_USER_PROMPT)
+        response_format = {"type": "json_object"}
+        if on_fields is None:
+            content = self.llm.invoke(messages, response_format=response_format).content
+        else:
+            from langchain_core.utils.json import parse_partial_json
+
+            received: List[str] = []
+
+            def on_token(token: str) -> None:
+                received.append(token)
+                fields = parse_partial_json(_CODE_FENCE.sub("", "".join(received).strip()))
+                if isinstance(fields, dict) and len(fields) > 1:
+                    on_fields(dict(list(fields.items())[:-1]))
+
+            content = stream_invoke(self.llm, messages, on_token, response_format=response_format)
+        return ReportNarrative.model_validate(json.loads(_CODE_FENCE.sub("", content.strip())))
+
+    def _stream_body(self, prompt: PromptBuilder, sections: List[BodySection],
+                     on_token: Callable[[str], None]) -> str:
+        """Render the template body, passing each block to `on_token` as soon as its narrative fields arrive."""
+        chunks: List[str] = []
+
+        def emit(fields: Dict[str, Any]) -> None:
+            while len(chunks) < len(sections) and all(name in fields for name in sections[len(chunks)].fields):
+                section = sections[len(chunks)]
+                chunks.append(section_text(section.render(ReportNarrative.model_construct(**fields)),
+                                           len(chunks) == len(sections) - 1))
+                on_token(chunks[-1])
+
+        emit(self._narrative(prompt, emit).model_dump())
+        return "".join(chunks)
     
     def format_report(
         self,
@@ -36,7 +210,8 @@ class ReportFormatterAgent:
         ads_output: AdsOutput,
         discount_output: DiscountOutput,
         benchmark_output: BenchmarkOutput,
-        recommendation_output: RecommendationOutput
+        recommendation_output: RecommendationOutput,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> ReportOutput:
         """Format all analyses into a final markdown report.
         
@@ -47,66 +222,46 @@ class ReportFormatterAgent:
             discount_output: Output from discount analysis
             benchmark_output: Output from benchmark analysis
             recommendation_output: Output from recommendation analysis
+            on_token: Stream the report, calling this with each chunk as it is generated (in
+                template mode, the header before the LLM call, then each section as soon as the
+                narrative fields it needs have streamed in; in sections mode, each section once it
+                and the sections before it are written)
             
         Returns:
             ReportOutput containing the final markdown formatted report
         """
         try:
             restaurant_info = restaurant_info.to_dict()
-            
-            # Prepare JSON sections for the prompt
-            restaurant_info_json = {
-                "name": restaurant_info.get("restaurant_name", ""),
-                "city": restaurant_info.get("city", ""),
-                "locality": restaurant_info.get("locality", ""),
-                "cuisine": restaurant_info.get("cuisine", "")
-            }
-            
-            recent_performance_metrics_json = trends_output.model_dump()
-            
-            # Handle no ad campaigns case
-            if ads_output.total_ad_days == 0:
-                advertising_campaign_analysis_json = {
-                    "summary": "No recent advertising campaigns",
-                    # "peer_comparison": benchmark_output.ads_comparison.model_dump()
-                }
-            else:
-                advertising_campaign_analysis_json = ads_output.model_dump()
-            
-            # Handle no discounts case
-            if discount_output.total_discount_days == 0:
-                discount_strategy_analysis_json = {
-                    "summary": "No recent discount campaigns",
-                    # "peer_comparison": benchmark_output.discount_comparison.model_dump()
-                }
-            else:
-                discount_strategy_analysis_json = discount_output.model_dump()
-            
-            peer_benchmarking_summary_json = benchmark_output.model_dump()
-            recommended_next_steps_json = {
-                "bullets": recommendation_output.llm_summary.split("\n")
-            }
-            
-            # Build messages for the LLM
-            messages = [
-                {"role": "system", "content": REPORT_FORMATTER_SYSTEM_PROMPT},
-                {"role": "user", "content": REPORT_FORMATTER_USER_PROMPT.format(
-                    restaurant_info_json=json.dumps(restaurant_info_json, indent=4),
-                    recent_performance_metrics_json=json.dumps(recent_performance_metrics_json, indent=4),
-                    advertising_campaign_analysis_json=json.dumps(advertising_campaign_analysis_json, indent=4),
-                    discount_strategy_analysis_json=json.dumps(discount_strategy_analysis_json, indent=4),
-                    peer_benchmarking_summary_json=json.dumps(peer_benchmarking_summary_json, indent=4),
-                    recommended_next_steps_json=json.dumps(recommended_next_steps_json, indent=4)
-                )}
-            ]
-            
+            payloads = self._payloads(restaurant_info, trends_output, ads_output, discount_output,
+                                      benchmark_output, recommendation_output)
+
+            if self.mode == "sections":
+                header = render_header(restaurant_info)
+                if on_token is not None:
+                    on_token(header)
+                return ReportOutput(markdown_report=header + "".join(self._sections(payloads, on_token)))
+
+            prompt = self._prompt(payloads)
+            if self.mode == "template":
+                header = render_header(restaurant_info)
+                if on_token is not None:
+                    on_token(header)
+                    sections = body_sections(trends_output, ads_output, discount_output, benchmark_output,
+                                             recommendation_output)
+                    return ReportOutput(markdown_report=header + self._stream_body(prompt, sections, on_token))
+                body = render_body(trends_output, ads_output, discount_output, benchmark_output,
+                                   recommendation_output, self._narrative(prompt))
+                return ReportOutput(markdown_report=header + body)
+
             # Generate the markdown report
-            markdown_report = self.llm.invoke(messages).content
+            messages = prompt.build(REPORT_FORMATTER_SYSTEM_PROMPT, REPORT_FORMATTER_USER_PROMPT)
+            if on_token is None:
+                markdown_report = self.llm.invoke(messages).content
+            else:
+                markdown_report = stream_invoke(self.llm, messages, on_token)
             
             return ReportOutput(markdown_report=markdown_report)
             
         except Exception as e:
             logger.error(f"Error formatting report: {str(e)}")
-            return ReportOutput(
-                markdown_report="# Error Generating Report\n\nThere was an error while generating the report. Please try again."
-            ) 
\ No newline at end of file
+            return ReportOutput(markdown_report=ERROR_REPORT, error=True) 
@@ -0,0 +1,243 @@
+"""
+Deterministic markdown rendering of the report's structural parts.
+
+Title, metric tables, campaign and discount analyses, peer benchmarks, the chart
+reference and the recommendation bullets are rendered straight from the agents'
+pydantic outputs, so every figure in them is exact. Only the executive summary
+and the short narrative paragraphs (`ReportNarrative`) come from the LLM.
+"""
+
+from typing import Any, Callable, Dict, List, Literal, NamedTuple, Sequence, Tuple
+import re
+
+from pydantic import BaseModel, Field
+
+from src.agents.trends import TrendsOutput
+from src.agents.ads import AdsOutput
+from src.agents.discount import DiscountOutput
+from src.agents.benchmark import BenchmarkOutput
+from src.agents.recommendations import RecommendationOutput
+
+NO_CAMPAIGNS = "No recent advertising campaigns."
+NO_DISCOUNTS = "No recent discount campaigns."
+
+
+class ReportNarrative(BaseModel):
+    """LLM-written parts of the report"""
+    status: Literal["HEALTHY", "ATTENTION", "URGENT"] = Field(description="Overall status vs peers")
+    key_alert: str = Field(description="Most critical issue requiring immediate attention")
+    top_priority: str = Field(description="Single most important action item")
+    performance_summary: str = Field(description="What the recent performance metrics and anomalies show")
+    ads_summary: str = Field(description="How the advertising campaigns performed")
+    discount_summary: str = Field(description="How the discounts performed")
+
+
+def money(value: float) -> str:
+    """Rupee amount without decimals, as the report shows it."""
+    return f"₹{value:,.0f}"
+
+
+def markdown_table(header: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    """Markdown table in the layout StructuralEvaluator expects."""
+    lines = ["| " + " | ".join(header) + " |", "|" + "|".join("--------" for _ in header) + "|"]
+    lines.extend("| " + " | ".join(str(cell) for cell in row) + " |" for row in rows)
+    return "\n".join(lines)
+
+
+def _without_tables(markdown: str) -> str:
+    """Markdown with its tables removed, e.g. the benchmark agent's, which the template renders itself."""
+    lines = [line for line in markdown.strip().splitlines() if not line.lstrip().startswith("|")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _bullet(text: str) -> str:
+    text = text.strip()
+    return text if text.startswith(("- ", "* ")) else f"- {text}"
+
+
+def render_header(restaurant_info: Dict[str, Any]) -> str:
+    """Title and cuisine/locality lines, which need nothing from the LLM."""
+    return "\n".join([
+        f"# {restaurant_info.get('restaurant_name', '')} - Performance Summary (Last 30 Days)",
+        "",
+        "### Cuisine and Locality",
+        f"{restaurant_info.get('cuisine', '')} | {restaurant_info.get('locality', '')}, "
+        f"{restaurant_info.get('city', '')}",
+        "",
+    ]) + "\n"
+
+
+def performance_lines(trends: TrendsOutput) -> List[str]:
+    """Metric tables, chart reference and anomaly list of the performance section."""
+    totals, averages = trends.totals, trends.averages
+    lines = [
+        markdown_table(["Metric", "Value"], [
+            ("Total Bookings", f"{totals.total_bookings:,}"),
+            ("Total Cancellations", f"{totals.total_cancellations:,}"),
+            ("Total Covers", f"{totals.total_covers:,}"),
+            ("Total Revenue", money(totals.total_revenue)),
+        ]),
+        "",
+        "**KEY SALES METRICS**",
+        "",
+        markdown_table(["Metric", "Value"], [
+            ("**OPD (Orders Per Day)**", f"{averages.avg_daily_bookings:.1f}"),
+            ("**Spend Per Cover**", money(averages.avg_spend_per_cover)),
+            ("**Revenue per Booking**", money(averages.avg_revenue_per_booking)),
+            ("**Cancellation Rate**", f"{averages.overall_cancellation_rate:.1f}%"),
+            ("**Average Rating**", f"{averages.avg_rating:.1f}"),
+        ]),
+        "",
+        f"![Bookings Rolling 7-Day]({trends.charts.bookings_rolling_7day_path})",
+        "",
+    ]
+    for anomaly in trends.anomalies:
+        window = f"{anomaly.date} to {anomaly.end_date}" if anomaly.end_date else anomaly.date
+        lines.append(f"- {anomaly.kind.replace('_', ' ').capitalize()} in {anomaly.metric} on {window} "
+                     f"({anomaly.change_pct:+.1f}%)")
+    if trends.anomalies:
+        lines.append("")
+    return lines
+
+
+def ads_lines(ads: AdsOutput) -> List[str]:
+    """Campaign table and per-campaign analysis of the advertising section."""
+    if ads.total_ad_days == 0:
+        return [NO_CAMPAIGNS]
+    return [
+        markdown_table(["Metric", "Value"], [
+            ("Ad Campaign Duration", f"{ads.total_ad_days} days"),
+            ("Total Ad Spend", money(ads.total_spend)),
+            ("Impressions", f"{ads.total_impressions:,}"),
+            ("Clicks", f"{ads.total_clicks:,}"),
+            ("Conversions", f"{ads.total_conversions:,}"),
+            ("**Conversion Rate (%)**", f"{ads.conversion_rate:.1f}%"),
+            ("Revenue Generated", money(ads.total_revenue_generated)),
+            ("ROI", f"{ads.roi:.2f}x"),
+        ]),
+        "",
+        ads.campaign_analysis.strip(),
+    ]
+
+
+def discount_lines(discounts: DiscountOutput) -> List[str]:
+    """Discount table and per-discount analysis of the discount section."""
+    if discounts.total_discount_days == 0:
+        return [NO_DISCOUNTS]
+    return [
+        markdown_table(["Metric", "Value"], [
+            ("Discount Campaign Duration", f"{discounts.total_discount_days} days"),
+            ("Average Discount", f"{discounts.avg_discount_percent:.1f}%"),
+            ("ROI", f"{discounts.roi:.2f}x"),
+        ]),
+        "",
+        discounts.discount_analysis.strip(),
+    ]
+
+
+def benchmark_rows(benchmark: BenchmarkOutput) -> Dict[str, List[Tuple[str, str, str, float]]]:
+    """(metric, restaurant, peers, gap %) rows of the peer comparison, by area."""
+    b, r, ra = benchmark.bookings_comparison, benchmark.revenue_comparison, benchmark.rating_comparison
+    a, d = benchmark.ads_comparison, benchmark.discount_comparison
+    return {
+        "Core Metrics": [
+            ("Bookings", f"{b.total_bookings:,}", f"{b.total_peer_bookings:,}", b.gap),
+            ("Revenue", money(r.total_revenue), money(r.total_peer_revenue), r.gap),
+            ("Rating", f"{ra.rating:.1f}", f"{ra.peer_rating:.1f}", ra.gap),
+        ],
+        "Advertising Performance": [
+            ("Daily Ad Spend", money(a.avg_ad_spend), money(a.avg_ad_spend_peer), a.gap_ad_spend),
+            ("Ads ROI", f"{a.ads_roi:.2f}x", f"{a.ads_roi_peer:.2f}x", a.gap_ads_roi),
+        ],
+        "Discount Performance": [
+            ("Discount %", f"{d.avg_discount_percentage:.1f}%", f"{d.avg_discount_percentage_peer:.1f}%",
+             d.gap_discount_percentage),
+            ("Discount ROI", f"{d.discount_roi:.2f}x", f"{d.discount_roi_peer:.2f}x", d.gap_discount_roi),
+        ],
+    }
+
+
+def benchmark_table(rows: Sequence[Tuple[str, str, str, float]]) -> str:
+    """Markdown table of `benchmark_rows` rows."""
+    return markdown_table(["Metric", "Restaurant", "Peers", "Gap"],
+                          [(name, own, peer, f"{gap:+.1f}%") for name, own, peer, gap in rows])
+
+
+def _performance(trends: TrendsOutput, narrative: ReportNarrative) -> List[str]:
+    return ["## 1. Recent Performance Metrics", *performance_lines(trends), narrative.performance_summary.strip(), ""]
+
+
+def _ads(ads: AdsOutput, narrative: ReportNarrative) -> List[str]:
+    summary = narrative.ads_summary.strip() if ads.total_ad_days == 0 else _bullet(narrative.ads_summary)
+    return ["## 2. Advertising Campaign Effectiveness", *ads_lines(ads), "", summary, ""]
+
+
+def _discounts(discounts: DiscountOutput, narrative: ReportNarrative) -> List[str]:
+    if discounts.total_discount_days == 0:
+        summary = narrative.discount_summary.strip()
+    else:
+        summary = _bullet(narrative.discount_summary)
+    return ["## 3. Discount Strategy Performance", *discount_lines(discounts), "", summary, ""]
+
+
+def _benchmarks(benchmark: BenchmarkOutput) -> List[str]:
+    rows = [row for area in benchmark_rows(benchmark).values() for row in area]
+    return [
+        "## 4. Peer Benchmarking Summary",
+        benchmark_table(rows),
+        "",
+        _without_tables(benchmark.llm_summary),
+        "",
+    ]
+
+
+def _executive_summary(narrative: ReportNarrative) -> List[str]:
+    return [
+        "## 🚨 Executive Summary",
+        f"- **Status**: {narrative.status}",
+        f"- **Key Alert**: {narrative.key_alert.strip()}",
+        f"- **Top Priority**: {narrative.top_priority.strip()}",
+        "",
+    ]
+
+
+class BodySection(NamedTuple):
+    """One block of the report body and the narrative fields it is rendered from"""
+    fields: Tuple[str, ...]
+    render: Callable[[ReportNarrative], List[str]]
+
+
+def body_sections(trends: TrendsOutput, ads: AdsOutput, discounts: DiscountOutput, benchmark: BenchmarkOutput,
+                  recommendations: RecommendationOutput) -> List[BodySection]:
+    """The blocks below the header in report order, so a streamed report can show each once its fields arrive."""
+    bullets = [line for line in recommendations.llm_summary.splitlines() if line.strip()]
+    return [
+        BodySection(("status", "key_alert", "top_priority"), _executive_summary),
+        BodySection(("performance_summary",), lambda narrative: _performance(trends, narrative)),
+        BodySection(("ads_summary",), lambda narrative: _ads(ads, narrative)),
+        BodySection(("discount_summary",), lambda narrative: _discounts(discounts, narrative)),
+        BodySection((), lambda narrative: _benchmarks(benchmark)),
+        BodySection((), lambda narrative: ["## 5. Recommendations", *bullets]),
+    ]
+
+
+def section_text(lines: List[str], last: bool) -> str:
+    """Markdown of one body block; the blocks concatenated in order make up `render_body`."""
+    text = "\n".join(lines)
+    return text.strip() + "\n" if last else text + "\n"
+
+
+def render_body(trends: TrendsOutput, ads: AdsOutput, discounts: DiscountOutput, benchmark: BenchmarkOutput,
+                recommendations: RecommendationOutput, narrative: ReportNarrative) -> str:
+    """Everything below the header: executive summary, the numbered sections and recommendations."""
+    sections = body_sections(trends, ads, discounts, benchmark, recommendations)
+    return "".join(section_text(section.render(narrative), i == len(sections) - 1)
+                   for i, section in enumerate(sections))
+
+
+def render_report(restaurant_info: Dict[str, Any], trends: TrendsOutput, ads: AdsOutput,
+                  discounts: DiscountOutput, benchmark: BenchmarkOutput, recommendations: RecommendationOutput,
+                  narrative: ReportNarrative) -> str:
+    """The full markdown report; passes StructuralEvaluator's section, table and chart checks."""
+    return render_header(restaurant_info) + render_body(trends, ads, discounts, benchmark, recommendations,
+                                                         narrative)
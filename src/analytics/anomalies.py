@@ -0,0 +1,92 @@
+"""
+Anomaly detection over 7-day rolling averages of daily metrics.
+
+Flags sharp day-over-day drops and spikes and sustained declines in the rolling
+series, vectorized over the whole series.
+"""
+
+from dataclasses import dataclass
+from typing import List, Literal, Optional
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field
+
+
+ROLLING_WINDOW = 7
+
+
+@dataclass(frozen=True)
+class AnomalyThresholds:
+    """Detection thresholds, as fractions of the previous rolling value"""
+    drop_pct: float = 0.2  # Day-over-day fall larger than this is a drop
+    spike_pct: float = 0.2  # Day-over-day rise larger than this is a spike
+    decline_days: int = 5  # Consecutive daily decreases that make a sustained decline...
+    decline_pct: float = 0.1  # ...when the rolling value falls by more than this over the run
+
+
+class Anomaly(BaseModel):
+    """Schema for an anomaly in a metric's 7-day rolling average"""
+    kind: Literal["drop", "spike", "sustained_decline"] = Field(description="Type of anomaly")
+    metric: str = Field(description="Daily metric the anomaly was found in")
+    date: str = Field(description="Date of the anomaly (start date for sustained declines), YYYY-MM-DD")
+    end_date: Optional[str] = Field(default=None, description="Last day of a sustained decline, YYYY-MM-DD")
+    value: float = Field(description="7-day rolling average on `date` (on `end_date` for sustained declines)")
+    change_pct: float = Field(description="% change vs the previous day (vs the start of the run for sustained declines)")
+
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """(start, end) index pairs of the runs of True in a boolean array, end inclusive"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.column_stack([np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1])
+
+
+def _detect(dates: np.ndarray, rolling: np.ndarray, metric: str, thresholds: AnomalyThresholds) -> List[Anomaly]:
+    """Detect anomalies in one rolling series"""
+    previous = np.empty_like(rolling)
+    previous[:1] = np.nan
+    previous[1:] = rolling[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(previous > 0, rolling / previous - 1, np.nan)
+
+    day = np.datetime_as_string(dates, unit="D")
+    found = []
+    for kind, indices in (
+        ("drop", np.flatnonzero(change < -thresholds.drop_pct)),
+        ("spike", np.flatnonzero(change > thresholds.spike_pct)),
+    ):
+        found.extend(
+            (i, Anomaly(kind=kind, metric=metric, date=day[i], value=float(rolling[i]),
+                        change_pct=float(change[i] * 100)))
+            for i in indices
+        )
+
+    # Runs of consecutive decreases; a run starts at the day before its first decrease
+    decreasing = rolling < previous
+    for first, last in _runs(decreasing):
+        start = first - 1
+        total = rolling[last] / rolling[start] - 1 if rolling[start] > 0 else np.nan
+        if last - first + 1 >= thresholds.decline_days and total < -thresholds.decline_pct:
+            found.append((start, Anomaly(
+                kind="sustained_decline", metric=metric, date=day[start], end_date=day[last],
+                value=float(rolling[last]), change_pct=float(total * 100),
+            )))
+
+    return [anomaly for _, anomaly in sorted(found, key=lambda item: item[0])]
+
+
+def detect_anomalies(metrics_df: pd.DataFrame, column: str = 'bookings',
+                     thresholds: Optional[AnomalyThresholds] = None) -> List[Anomaly]:
+    """
+    Detect anomalies in one restaurant's rolling average of a daily metric.
+
+    Args:
+        metrics_df: Daily metrics of one restaurant, in date order
+        column: Metric to scan
+        thresholds: Detection thresholds (defaults to AnomalyThresholds())
+
+    Returns:
+        Anomalies in date order
+    """
+    rolling = metrics_df[column].rolling(window=ROLLING_WINDOW, min_periods=1).mean().to_numpy(dtype=np.float64)
+    dates = pd.to_datetime(metrics_df['date']).to_numpy(dtype='datetime64[ns]')
+    return _detect(dates, rolling, column, thresholds or AnomalyThresholds())
@@ -0,0 +1,200 @@
+"""
+In-window vs out-of-window comparisons of daily restaurant metrics.
+
+Answers the fixed "how do metrics compare during campaign/discount periods vs
+the rest of the time" question directly from the metrics and interval tables,
+instead of having an LLM agent discover the schema and write SQL for it. All
+windows are evaluated at once with a (days x windows) membership matrix.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+
+
+class Metric(NamedTuple):
+    """A compared metric: per-day mean of `numerator`, or ratio of sums when `denominator` is set"""
+    label: str
+    numerator: str
+    denominator: Optional[str] = None
+    currency: bool = False
+
+
+ADS_METRICS = [
+    Metric("Average Daily Bookings", "bookings"),
+    Metric("Average Daily Revenue", "revenue", currency=True),
+]
+
+DISCOUNT_METRICS = [
+    Metric("Average Daily Covers", "covers"),
+    Metric("Average Spend per Cover", "revenue", "covers", currency=True),
+    Metric("Average Daily Bookings", "bookings"),
+    Metric("Average Daily Revenue", "revenue", currency=True),
+]
+
+
+def metric_columns(metrics: List[Metric]) -> List[str]:
+    """Metrics table columns read when comparing `metrics`"""
+    return sorted({m.numerator for m in metrics} | {m.denominator for m in metrics if m.denominator})
+
+
+@dataclass
+class WindowStats:
+    """Metric values over the days covered by one window"""
+    label: str
+    start: pd.Timestamp
+    end: pd.Timestamp
+    days: int
+    values: Dict[str, float]
+
+
+@dataclass
+class LiftResult:
+    """Metric values inside any window vs outside all windows, plus each window on its own"""
+    metrics: List[Metric]
+    in_days: int
+    out_days: int
+    in_window: Dict[str, float]
+    out_window: Dict[str, float]
+    windows: List[WindowStats] = field(default_factory=list)
+
+    def change_pct(self, label: str, values: Optional[Dict[str, float]] = None) -> float:
+        """% change of a metric vs the out-of-window baseline (NaN when undefined)"""
+        current = (values or self.in_window)[label]
+        baseline = self.out_window[label]
+        if np.isnan(current) or np.isnan(baseline) or baseline == 0:
+            return float("nan")
+        return (current - baseline) / baseline * 100
+
+    def to_markdown(self, period: str = "Campaign") -> str:
+        """Render the comparison as markdown tables followed by a summary sentence"""
+        lines = [
+            f"| Metric | {period} Period | Non-{period} Period | Change |",
+            "|--------|--------|--------|--------|",
+        ]
+        for metric in self.metrics:
+            lines.append(
+                f"| {metric.label} | {_format_value(self.in_window[metric.label], metric)} "
+                f"| {_format_value(self.out_window[metric.label], metric)} "
+                f"| {_format_change(self.change_pct(metric.label))} |"
+            )
+        lines.append("")
+        lines.append(
+            f"Based on {_plural(self.in_days, period.lower() + ' day')} "
+            f"and {_plural(self.out_days, 'non-' + period.lower() + ' day')}."
+        )
+
+        if len(self.windows) > 1:
+            headline = self.metrics[0]
+            lines += [
+                "",
+                f"**Per {period.lower()}**",
+                "",
+                f"| {period} | Window | Days | "
+                + " | ".join(metric.label for metric in self.metrics)
+                + f" | {headline.label} vs Non-{period} |",
+                "|" + "--------|" * (len(self.metrics) + 4),
+            ]
+            for window in self.windows:
+                values = " | ".join(_format_value(window.values[metric.label], metric) for metric in self.metrics)
+                lines.append(
+                    f"| {window.label} | {window.start:%Y-%m-%d} to {window.end:%Y-%m-%d} | {window.days} "
+                    f"| {values} | {_format_change(self.change_pct(headline.label, window.values))} |"
+                )
+
+        lines += ["", self._summary(period)]
+        return "\n".join(lines)
+
+    def _summary(self, period: str) -> str:
+        changes = []
+        for metric in self.metrics:
+            change = self.change_pct(metric.label)
+            if np.isnan(change):
+                continue
+            direction = "increased" if change >= 0 else "decreased"
+            changes.append(f"{metric.label.lower()} {direction} by {abs(change):.1f}%")
+        if not changes:
+            return f"- Not enough {period.lower()} and non-{period.lower()} days to compare the two periods."
+        joined = ", ".join(changes[:-1]) + (" and " if len(changes) > 1 else "") + changes[-1]
+        return f"- During {period.lower()} periods, {joined} compared to non-{period.lower()} periods."
+
+
+def _plural(count: int, noun: str) -> str:
+    return f"{count} {noun}" + ("" if count == 1 else "s")
+
+
+def _format_value(value: float, metric: Metric) -> str:
+    if np.isnan(value):
+        return "n/a"
+    return f"₹{value:,.2f}" if metric.currency else f"{value:,.1f}"
+
+
+def _format_change(change: float) -> str:
+    return "n/a" if np.isnan(change) else f"{change:+.1f}%"
+
+
+def _aggregate(sums: np.ndarray, days: np.ndarray, metrics: List[Metric], columns: List[str]) -> List[Dict[str, float]]:
+    """Turn per-group column sums and day counts into metric values, one dict per group"""
+    index = {column: i for i, column in enumerate(columns)}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_metric = {}
+        for metric in metrics:
+            numerator = sums[:, index[metric.numerator]]
+            denominator = sums[:, index[metric.denominator]] if metric.denominator else days
+            per_metric[metric.label] = np.where(denominator > 0, numerator / denominator, np.nan)
+    return [{label: float(values[g]) for label, values in per_metric.items()} for g in range(len(days))]
+
+
+def compute_lift(metrics_df: pd.DataFrame, windows_df: pd.DataFrame, start_col: str, end_col: str,
+                 metrics: List[Metric], label_col: Optional[str] = None) -> LiftResult:
+    """
+    Compare daily metrics inside vs outside a set of date windows.
+
+    Args:
+        metrics_df: Daily metrics of one restaurant (needs `date` and the metric columns)
+        windows_df: One row per window (campaign or discount config)
+        start_col: Column with the inclusive window start date
+        end_col: Column with the inclusive window end date
+        metrics: Metrics to compare
+        label_col: Optional column used to label windows (defaults to the window's position)
+
+    Returns:
+        LiftResult with the union-of-windows comparison and per-window values
+    """
+    columns = metric_columns(metrics)
+    values = metrics_df[columns].to_numpy(dtype=np.float64)
+    dates = pd.to_datetime(metrics_df['date']).to_numpy(dtype='datetime64[ns]')
+    starts = pd.to_datetime(windows_df[start_col]).to_numpy(dtype='datetime64[ns]')
+    ends = pd.to_datetime(windows_df[end_col]).to_numpy(dtype='datetime64[ns]')
+
+    # membership[d, w] is True when day d falls inside window w (both ends inclusive)
+    membership = (dates[:, None] >= starts[None, :]) & (dates[:, None] <= ends[None, :])
+    in_any = membership.any(axis=1)
+
+    # Rows: in any window, outside all windows, then each window on its own
+    groups = np.column_stack([in_any, ~in_any, membership]).astype(np.float64)
+    sums = groups.T @ values
+    days = groups.sum(axis=0)
+    aggregated = _aggregate(sums, days, metrics, columns)
+
+    labels = windows_df[label_col].astype(str).tolist() if label_col else [f"#{i + 1}" for i in range(len(windows_df))]
+    windows = [
+        WindowStats(
+            label=labels[i],
+            start=pd.Timestamp(starts[i]),
+            end=pd.Timestamp(ends[i]),
+            days=int(days[i + 2]),
+            values=aggregated[i + 2],
+        )
+        for i in range(len(windows_df))
+    ]
+
+    return LiftResult(
+        metrics=metrics,
+        in_days=int(days[0]),
+        out_days=int(days[1]),
+        in_window=aggregated[0],
+        out_window=aggregated[1],
+        windows=windows,
+    )
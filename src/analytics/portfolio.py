@@ -0,0 +1,92 @@
+"""
+Portfolio-wide Totals and Averages for every restaurant in one pass.
+
+A single groupby over `restaurant_metrics` produces the same numbers TrendsAgent
+reports for one restaurant (bookings, revenue, cancellations, covers, OPD,
+revenue per booking, spend per cover, cancellation rate, rating) for all
+restaurants at once, so portfolio runs and dashboards look them up instead of
+recomputing per restaurant.
+"""
+
+from typing import Any, Callable, Dict, List
+import numpy as np
+import pandas as pd
+
+
+TOTAL_COLUMNS = ['total_bookings', 'total_revenue', 'total_cancellations', 'total_covers']
+AVERAGE_COLUMNS = [
+    'avg_daily_bookings',
+    'avg_revenue_per_booking',
+    'avg_spend_per_cover',
+    'overall_cancellation_rate',
+    'avg_rating',
+]
+
+
+def _safe_ratio(numerator: pd.Series, denominator: pd.Series, scale: float = 1.0) -> pd.Series:
+    """numerator / denominator * scale, with 0 wherever the denominator is not positive"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = numerator.astype(np.float64) / denominator.astype(np.float64) * scale
+    return ratio.where(denominator > 0, 0.0)
+
+
+def compute_portfolio_metrics(metrics_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute Totals and Averages for every restaurant in a metrics frame.
+
+    Args:
+        metrics_df: Daily metrics for any number of restaurants
+
+    Returns:
+        Frame indexed by restaurant_id with TOTAL_COLUMNS, AVERAGE_COLUMNS and `days`
+    """
+    grouped = metrics_df.groupby('restaurant_id', observed=True, sort=True)
+    frame = grouped.agg(
+        total_bookings=('bookings', 'sum'),
+        total_revenue=('revenue', 'sum'),
+        total_cancellations=('cancellations', 'sum'),
+        total_covers=('covers', 'sum'),
+        avg_daily_bookings=('bookings', 'mean'),
+        avg_rating=('avg_rating', 'mean'),
+        days=('date', 'count'),
+    )
+    frame['total_revenue'] = frame['total_revenue'].astype(np.float64)
+    frame['avg_revenue_per_booking'] = _safe_ratio(frame['total_revenue'], frame['total_bookings'])
+    frame['avg_spend_per_cover'] = _safe_ratio(frame['total_revenue'], frame['total_covers'])
+    frame['overall_cancellation_rate'] = _safe_ratio(frame['total_cancellations'], frame['total_bookings'], 100)
+    frame.index = frame.index.astype(str)
+    return frame[TOTAL_COLUMNS + AVERAGE_COLUMNS + ['days']]
+
+
+class PortfolioMetrics:
+    """Lookup of per-restaurant Totals/Averages computed once for a whole metrics table"""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+
+    @classmethod
+    def from_metrics(cls, metrics_df: pd.DataFrame) -> "PortfolioMetrics":
+        """Compute the metrics for every restaurant in `metrics_df`"""
+        return cls(compute_portfolio_metrics(metrics_df))
+
+    @classmethod
+    def for_store(cls, store: Any) -> "PortfolioMetrics":
+        """Shared instance for a DataStore, recomputed only when its metrics table reloads"""
+        return store.derived('portfolio_metrics', 'metrics', cls.from_metrics)
+
+    def __contains__(self, restaurant_id: str) -> bool:
+        return restaurant_id in self.frame.index
+
+    def _row(self, restaurant_id: str, columns: List[str], casts: Dict[str, Callable]) -> Dict[str, Any]:
+        row = self.frame.loc[restaurant_id, columns]
+        return {column: casts.get(column, float)(row[column]) for column in columns}
+
+    def totals(self, restaurant_id: str) -> Dict[str, Any]:
+        """Totals fields for one restaurant"""
+        return self._row(restaurant_id, TOTAL_COLUMNS, {
+            'total_bookings': int, 'total_cancellations': int, 'total_covers': int,
+        })
+
+    def averages(self, restaurant_id: str) -> Dict[str, float]:
+        """Averages fields for one restaurant"""
+        return self._row(restaurant_id, AVERAGE_COLUMNS, {})
@@ -0,0 +1,11 @@
+"""
+Performance benchmarks for the Dineout GenAI Co-Pilot.
+
+This module runs the report pipeline and each agent against generated datasets
+with the offline chat model and checks the results against stored baselines.
+"""
+
+from .baseline import compare, load_baseline, save_baseline
+from .cases import BenchmarkConfig, run_isolated, run_size
+
+__all__ = ['BenchmarkConfig', 'compare', 'load_baseline', 'run_isolated', 'run_size', 'save_baseline']
@@ -0,0 +1,104 @@
+"""
+Baseline storage and regression checks for benchmark results.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import json
+
+DEFAULT_BASELINE_PATH = Path("benchmarks") / "baseline.json"
+
+
+@dataclass(frozen=True)
+class MetricRule:
+    """How to compare one metric of a size's results against the baseline"""
+    path: str  # Dotted path into a size's results; "agents.*.p50" expands to every agent
+    higher_is_better: bool = False
+    noise_floor: float = 0.0  # Absolute changes smaller than this are never regressions
+
+
+RULES: List[MetricRule] = [
+    MetricRule("cold_load_seconds", noise_floor=0.05),
+    MetricRule("agents.*.p50", noise_floor=0.01),
+    MetricRule("agents.*.llm_round_trips"),
+    MetricRule("pipeline.latency_seconds.p50", noise_floor=0.02),
+    MetricRule("pipeline.latency_seconds.p95", noise_floor=0.05),
+    MetricRule("pipeline.reports_per_minute", higher_is_better=True),
+    MetricRule("pipeline.llm_round_trips_per_report"),
+    MetricRule("pipeline.tokens_per_report"),
+    MetricRule("batch.reports_per_minute", higher_is_better=True),
+    MetricRule("peak_rss_mb", noise_floor=10.0),
+]
+
+
+@dataclass
+class Comparison:
+    """One metric of one dataset size compared with the baseline"""
+    size: str
+    metric: str
+    baseline: float
+    current: float
+    change_pct: float
+    regressed: bool
+
+
+def load_baseline(path: Path = DEFAULT_BASELINE_PATH) -> Optional[Dict[str, Any]]:
+    """Read a stored baseline, or None if there is none yet."""
+    if not Path(path).exists():
+        return None
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def save_baseline(results: Dict[str, Any], path: Path = DEFAULT_BASELINE_PATH) -> None:
+    """Store benchmark results as the new baseline."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+def _lookup(results: Dict[str, Any], path: str) -> Dict[str, float]:
+    """Values at a dotted path, expanding '*' over dict keys; keyed by the concrete path."""
+    found = {"": results}
+    for part in path.split("."):
+        expanded = {}
+        for prefix, value in found.items():
+            if not isinstance(value, dict):
+                continue
+            keys = value.keys() if part == "*" else [part] if part in value else []
+            for key in keys:
+                expanded[f"{prefix}.{key}" if prefix else key] = value[key]
+        found = expanded
+    return {key: value for key, value in found.items() if isinstance(value, (int, float))}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2,
+            rules: Optional[List[MetricRule]] = None) -> List[Comparison]:
+    """
+    Compare benchmark results with a baseline, size by size.
+
+    Args:
+        current: Results of this run ({"sizes": {name: results}})
+        baseline: Stored baseline in the same format
+        threshold: Relative change (0.2 = 20%) in the worse direction that counts as a regression
+        rules: Metrics to compare (defaults to RULES)
+
+    Returns:
+        One comparison per metric present in both runs
+    """
+    comparisons = []
+    for size, results in current["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size)
+        if previous is None:
+            continue
+        for rule in rules or RULES:
+            before = _lookup(previous, rule.path)
+            for metric, value in _lookup(results, rule.path).items():
+                if metric not in before:
+                    continue
+                old = before[metric]
+                delta = old - value if rule.higher_is_better else value - old
+                change_pct = (value - old) / old * 100 if old else 0.0
+                regressed = delta > rule.noise_floor and (old == 0 or delta / old > threshold)
+                comparisons.append(Comparison(size, metric, old, value, round(change_pct, 1), regressed))
+    return comparisons
@@ -0,0 +1,133 @@
+"""
+Benchmark runner for the report pipeline.
+
+Runs the benchmark cases against generated datasets of increasing size with the
+offline chat model, saves the results, and compares them with a stored baseline
+so it can gate a continuous integration pipeline.
+"""
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+import argparse
+import json
+from datetime import datetime
+
+from tabulate import tabulate
+
+# Add src to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.benchmarks.baseline import DEFAULT_BASELINE_PATH, Comparison, compare, load_baseline, save_baseline
+from src.benchmarks.cases import DEFAULT_WORK_DIR, BenchmarkConfig, run_isolated
+
+
+class BenchmarkRunner:
+    """Runs benchmark cases for several dataset sizes and checks them against a baseline"""
+
+    def __init__(self, configs: List[BenchmarkConfig]):
+        self.configs = configs
+
+    def run(self) -> Dict[str, Any]:
+        """Benchmark every configured size, smallest first."""
+        sizes = {}
+        for config in sorted(self.configs, key=lambda c: (c.restaurants, c.days)):
+            print(f"⏱️  Benchmarking {config.restaurants} restaurants x {config.days} days...")
+            sizes[config.name] = run_isolated(config)
+            pipeline = sizes[config.name]["pipeline"]
+            print(f"   {pipeline['reports_per_minute']:.1f} reports/min, "
+                  f"p50 {pipeline['latency_seconds']['p50']:.2f}s, "
+                  f"peak RSS {sizes[config.name]['peak_rss_mb']:.0f} MB")
+        return {"generated_at": datetime.now().isoformat(), "sizes": sizes}
+
+    @staticmethod
+    def save_results(results: Dict[str, Any], work_dir: Path = DEFAULT_WORK_DIR) -> Path:
+        """Save a run's results next to the generated datasets."""
+        work_dir.mkdir(parents=True, exist_ok=True)
+        path = work_dir / f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        return path
+
+    @staticmethod
+    def print_results(results: Dict[str, Any]):
+        """Print per-size latency, throughput and memory."""
+        rows = []
+        for size, result in results["sizes"].items():
+            pipeline = result["pipeline"]
+            rows.append([
+                size, result["cold_load_seconds"], pipeline["latency_seconds"]["p50"],
+                pipeline["latency_seconds"]["p95"], pipeline["reports_per_minute"],
+                result["batch"]["reports_per_minute"], pipeline["llm_round_trips_per_report"],
+                result["peak_rss_mb"],
+            ])
+        print("\n" + tabulate(rows, headers=["Size", "Cold load (s)", "p50 (s)", "p95 (s)", "Reports/min",
+                                            "Batch reports/min", "LLM round trips", "Peak RSS (MB)"],
+                              tablefmt="github", floatfmt=".2f"))
+
+        for size, result in results["sizes"].items():
+            rows = [[name, stats["p50"], stats["p95"], stats["max"], stats["llm_round_trips"]]
+                    for name, stats in result["agents"].items()]
+            print(f"\nAgents in isolation ({size}):")
+            print(tabulate(rows, headers=["Step", "p50 (s)", "p95 (s)", "max (s)", "LLM round trips"],
+                           tablefmt="github", floatfmt=".3f"))
+
+    @staticmethod
+    def print_comparison(comparisons: List[Comparison], threshold: float) -> None:
+        """Print the baseline comparison, regressions first."""
+        rows = [
+            [c.size, c.metric, c.baseline, c.current, f"{c.change_pct:+.1f}%", "❌ REGRESSED" if c.regressed else "✅"]
+            for c in sorted(comparisons, key=lambda c: not c.regressed)
+        ]
+        print(f"\nBaseline comparison (regression threshold {threshold:.0%}):")
+        print(tabulate(rows, headers=["Size", "Metric", "Baseline", "Current", "Change", "Status"],
+                       tablefmt="github"))
+
+
+def main():
+    """Main entry point for benchmark runner"""
+    parser = argparse.ArgumentParser(description="Benchmark the report pipeline against generated datasets")
+    parser.add_argument("--sizes", default="50,500,2000", help="Comma-separated restaurant counts to benchmark")
+    parser.add_argument("--days", type=int, default=30, help="Days of metrics per restaurant")
+    parser.add_argument("--reports", type=int, default=10, help="Reports generated per size")
+    parser.add_argument("--batch-workers", type=int, default=4, help="Workers for the batch case")
+    parser.add_argument("--source", choices=["csv", "sqlite"], default="csv", help="Data source to load from")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated LLM latency per call")
+    parser.add_argument("--seed", type=int, default=0, help="Dataset seed")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE_PATH), help="Baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative regression that fails the run (0.2 = 20%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+
+    args = parser.parse_args()
+
+    configs = [
+        BenchmarkConfig(restaurants=int(size), days=args.days, seed=args.seed, reports=args.reports,
+                        batch_workers=args.batch_workers, source=args.source, llm_latency_ms=args.llm_latency_ms)
+        for size in args.sizes.split(",") if size.strip()
+    ]
+    runner = BenchmarkRunner(configs)
+    results = runner.run()
+    runner.print_results(results)
+    print(f"\n💾 Results saved to {runner.save_results(results)}")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        save_baseline(results, baseline_path)
+        print(f"📌 Baseline updated: {baseline_path}")
+        return
+
+    baseline = load_baseline(baseline_path)
+    if baseline is None:
+        print(f"No baseline at {baseline_path}; run with --update-baseline to store one")
+        return
+
+    comparisons = compare(results, baseline, args.threshold)
+    runner.print_comparison(comparisons, args.threshold)
+    regressions = [c for c in comparisons if c.regressed]
+    if regressions:
+        print(f"\n❌ {len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\n✅ No regressions against {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark cases for the report pipeline.
+
+Each dataset size runs in a fresh process (so peak RSS belongs to that size
+alone) against a generated dataset and the offline chat model:
+
+- agents: every pipeline step called on its own, in dependency order, one
+  restaurant at a time
+- pipeline: `ReportOrchestrator.generate_report` for each sampled restaurant
+- batch: `BatchReportRunner` over the same restaurants
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List
+import os
+import time
+
+from src.utils.instrumentation import peak_rss_mb, percentiles
+
+DEFAULT_WORK_DIR = Path("outputs") / "benchmarks"
+
+
+@dataclass(frozen=True)
+class BenchmarkConfig:
+    """One dataset size to benchmark"""
+    restaurants: int
+    days: int = 30
+    seed: int = 0
+    reports: int = 10  # Restaurants sampled for the agent, pipeline and batch cases
+    batch_workers: int = 4
+    source: str = "csv"  # "csv" or "sqlite"
+    llm_latency_ms: float = 0.0  # Simulated LLM latency; 0 measures the pipeline's own overhead
+    work_dir: str = str(DEFAULT_WORK_DIR)
+
+    @property
+    def name(self) -> str:
+        return f"{self.restaurants}x{self.days}"
+
+    @property
+    def dataset_dir(self) -> Path:
+        return Path(self.work_dir).resolve() / "data" / f"{self.name}-seed{self.seed}"
+
+
+def prepare_dataset(config: BenchmarkConfig) -> Path:
+    """Generate the config's dataset (CSV and SQLite) unless it already exists."""
+    from src.data_generator import DatasetSpec, generate_dataset
+
+    dataset_dir = config.dataset_dir
+    if not (dataset_dir / "complete").exists():
+        spec = DatasetSpec(restaurants=config.restaurants, days=config.days, seed=config.seed)
+        generate_dataset(spec, csv_dir=dataset_dir, db_path=dataset_dir / "dineout.db")
+        (dataset_dir / "complete").touch()
+    return dataset_dir
+
+
+def _per_minute(count: int, seconds: float) -> float:
+    return round(count / seconds * 60, 2) if seconds > 0 else 0.0
+
+
+def run_size(config: BenchmarkConfig) -> Dict[str, Any]:
+    """Run every case for one dataset size in the current process."""
+    # Offline model settings are read from the environment when each orchestrator creates its model
+    os.environ["DINEOUT_OFFLINE_LATENCY_MS"] = str(config.llm_latency_ms)
+    os.environ["DINEOUT_OFFLINE_MS_PER_TOKEN"] = "0"
+
+    from src.agents.batch import BatchReportRunner
+    from src.agents.orchestrator import ReportOrchestrator
+    from src.loaders import DataLoader, SQLiteDataLoader
+    from src.utils.chart_renderer import BATCH_DPI, ChartRenderer
+    from src.utils.instrumentation import RunMetrics
+
+    dataset_dir = prepare_dataset(config)
+    # Reports, charts and metrics are written relative to the working directory
+    run_dir = Path(config.work_dir).resolve() / "runs" / config.name
+    run_dir.mkdir(parents=True, exist_ok=True)
+    os.chdir(run_dir)
+
+    start = time.perf_counter()
+    loader = (SQLiteDataLoader(dataset_dir / "dineout.db") if config.source == "sqlite"
+              else DataLoader(dataset_dir))
+    restaurant_ids = loader.list_restaurants()[:config.reports]
+    loader.load_data(restaurant_ids[0])
+    cold_load_seconds = time.perf_counter() - start
+
+    renderer = ChartRenderer(dpi=BATCH_DPI, use_cache=False)
+
+    def orchestrator(restaurant_id: str) -> ReportOrchestrator:
+        return ReportOrchestrator(restaurant_id, data_loader=loader, use_cache=False,
+                                  chart_renderer=renderer, offline=True)
+
+    # Agents in isolation: each step on its own, upstream results passed in by hand
+    agent_seconds: Dict[str, List[float]] = {}
+    agent_round_trips: Dict[str, List[int]] = {}
+    for restaurant_id in restaurant_ids:
+        metrics = RunMetrics(restaurant_id)
+        results: Dict[str, Any] = {}
+        with metrics.activate():
+            for step in orchestrator(restaurant_id)._steps():
+                with metrics.span(step.name):
+                    results[step.name] = step.func(results)
+        for span in metrics.summary()["spans"]:
+            if span["kind"] == "step":
+                agent_seconds.setdefault(span["name"], []).append(span["wall_seconds"])
+                agent_round_trips.setdefault(span["name"], [])
+            elif span["kind"] == "llm" and not span.get("cached") and span["parent"] in agent_round_trips:
+                agent_round_trips[span["parent"]].append(1)
+
+    # Full pipeline, one report at a time
+    runs = []
+    start = time.perf_counter()
+    for restaurant_id in restaurant_ids:
+        report = orchestrator(restaurant_id)
+        report.generate_report()
+        runs.append(report.run_metrics)
+    pipeline_seconds = time.perf_counter() - start
+
+    # Batch runner over the same restaurants
+    runner = BatchReportRunner(workers=config.batch_workers, data_loader=loader, use_cache=False,
+                               chart_renderer=renderer, offline=True)
+    start = time.perf_counter()
+    batch_results = runner.run(restaurant_ids)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "config": asdict(config),
+        "cold_load_seconds": round(cold_load_seconds, 4),
+        "agents": {
+            name: {**percentiles(seconds),
+                   "llm_round_trips": round(len(agent_round_trips[name]) / len(restaurant_ids), 2)}
+            for name, seconds in agent_seconds.items()
+        },
+        "pipeline": {
+            "latency_seconds": percentiles([run["wall_seconds"] for run in runs]),
+            "reports_per_minute": _per_minute(len(runs), pipeline_seconds),
+            "llm_round_trips_per_report": round(sum(run["llm"]["round_trips"] for run in runs) / len(runs), 2),
+            "tokens_per_report": round(sum(run["llm"]["prompt_tokens"] + run["llm"]["completion_tokens"]
+                                           for run in runs) / len(runs)),
+        },
+        "batch": {
+            "workers": config.batch_workers,
+            "wall_seconds": round(batch_seconds, 4),
+            "reports_per_minute": _per_minute(len(batch_results), batch_seconds),
+            "failed": sum(1 for result in batch_results if result.status != "ok"),
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(config: BenchmarkConfig) -> Dict[str, Any]:
+    """Run one dataset size in a fresh interpreter so its peak RSS and caches start clean."""
+    config = replace(config, work_dir=str(Path(config.work_dir).resolve()))
+    prepare_dataset(config)
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(run_size, config).result()
@@ -0,0 +1,372 @@
+"""
+Synthetic dataset generator matching the schema of the files in data/.
+
+Restaurants belong to a (locality, cuisine) segment whose parameters drive both
+the peer benchmarks and the restaurants sampled around them, so bookings,
+spend, ratings, ad returns and discount effects stay correlated the way the
+hand-built dataset is: campaigns and discounts lift daily bookings, discounts
+lower spend per cover, weekends are busier, and revenue = covers x spend.
+
+Restaurants are generated in chunks and streamed to CSV and/or SQLite, so
+memory use depends on the chunk size rather than the dataset size. Output is
+deterministic for a given seed and chunk size.
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.loaders import TABLES, create_indexes
+
+logger = logging.getLogger(__name__)
+
+CITIES: Dict[str, List[str]] = {
+    "Bangalore": ["Koramangala", "Indiranagar", "Whitefield", "Jayanagar", "HSR Layout", "JP Nagar", "Malleshwaram"],
+    "Mumbai": ["Bandra", "Andheri", "Powai", "Lower Parel", "Colaba"],
+    "Delhi": ["Connaught Place", "Hauz Khas", "Saket", "Rajouri Garden", "Vasant Kunj"],
+}
+
+# Cuisine -> typical spend per cover
+CUISINES: Dict[str, int] = {
+    "Italian": 1200,
+    "South Indian": 450,
+    "North Indian": 700,
+    "Mediterranean": 1000,
+    "Bengali": 600,
+    "Chinese": 650,
+    "Japanese": 1500,
+    "Continental": 1100,
+    "Cafe": 450,
+    "Mughlai": 800,
+}
+
+NAME_PREFIXES = [
+    "The Royal", "Golden", "Spice", "Urban", "Coastal", "Little", "Grand", "Olive", "Saffron", "Blue",
+    "Old Town", "Green", "Silver", "Rustic", "Twisted", "Copper", "Velvet", "Smoky", "Sunny", "Midnight",
+]
+NAME_SUFFIXES = [
+    "Table", "Kitchen", "Bistro", "Dhaba", "Grill", "House", "Garden", "Cafe", "Diner", "Tavern",
+    "Eatery", "Courtyard", "Canteen", "Pantry", "Terrace", "Oven", "Villa", "Junction", "Corner", "Lounge",
+]
+
+DISCOUNT_TYPES = ["Flat", "Tiered"]
+DISCOUNT_PERCENTS = np.array([5, 10, 15, 20, 25])
+
+# Random streams, so segments, chunks and names draw from independent sequences
+_SEGMENT_STREAM = 0
+_CHUNK_STREAM = 1
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Size and shape of a generated dataset"""
+    restaurants: int = 1000
+    days: int = 30
+    start_date: str = "2024-05-01"
+    seed: int = 0
+    ads_share: float = 0.6  # Share of restaurants running ad campaigns
+    discount_share: float = 0.3  # Share of restaurants running a discount
+    max_campaigns: int = 2  # Campaigns per advertising restaurant (1 to max_campaigns)
+    chunk_size: int = 500  # Restaurants generated and written at a time
+
+
+def _rng(spec: DatasetSpec, stream: int, index: int = 0) -> np.random.Generator:
+    return np.random.default_rng(np.random.SeedSequence(spec.seed, spawn_key=(stream, index)))
+
+
+def generate_segments(spec: DatasetSpec) -> pd.DataFrame:
+    """Parameters of every (city, locality, cuisine) segment; the source of the peer benchmarks."""
+    rng = _rng(spec, _SEGMENT_STREAM)
+    rows = [
+        (city, locality, cuisine, spend)
+        for city, localities in CITIES.items()
+        for locality in localities
+        for cuisine, spend in CUISINES.items()
+    ]
+    segments = pd.DataFrame(rows, columns=['city', 'locality', 'cuisine', 'base_spend'])
+    n = len(segments)
+    locality_premium = rng.uniform(0.85, 1.2, n)
+    segments['spend_per_cover'] = segments['base_spend'] * locality_premium
+    segments['daily_bookings'] = rng.lognormal(np.log(22), 0.35, n)
+    segments['party_size'] = rng.uniform(2.2, 3.0, n)
+    segments['rating'] = rng.uniform(3.8, 4.7, n)
+    segments['conversion_rate'] = rng.uniform(6.0, 12.0, n)
+    segments['monthly_ads_spend'] = rng.uniform(20000, 75000, n)
+    segments['ads_roi'] = rng.uniform(3.2, 4.2, n)
+    segments['discount_percent'] = rng.choice([10, 12, 15, 18, 20], n)
+    segments['discount_roi'] = rng.uniform(2.7, 3.5, n)
+    return segments
+
+
+def benchmarks_from_segments(segments: pd.DataFrame) -> pd.DataFrame:
+    """Peer benchmark rows (30-day totals/averages) for every segment."""
+    monthly_bookings = segments['daily_bookings'] * 30
+    return pd.DataFrame({
+        'locality': segments['locality'],
+        'cuisine': segments['cuisine'],
+        'avg_bookings': monthly_bookings.round().astype(int),
+        'avg_conversion_rate': segments['conversion_rate'].round(1),
+        'avg_ads_spend': (segments['monthly_ads_spend'] / 1000).round().astype(int) * 1000,
+        'avg_roi': segments['ads_roi'].round(1),
+        'avg_revenue': (monthly_bookings * segments['party_size'] * segments['spend_per_cover'] / 1e5).round().astype(int) * 100000,
+        'avg_rating': segments['rating'].round(1),
+        'avg_discount_percentage': segments['discount_percent'].astype(int),
+        'avg_discount_roi': segments['discount_roi'].round(1),
+    })
+
+
+def _windows(rng: np.random.Generator, counts: np.ndarray, days: int, slots: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Non-overlapping (start, end) day offsets, one window per slot of the period, -1 where unused"""
+    n = len(counts)
+    slot_len = max(1, days // slots)
+    duration = np.minimum(rng.integers(7, 16, (n, slots)), slot_len)
+    offset = (rng.random((n, slots)) * (slot_len - duration + 1)).astype(int)
+    starts = np.arange(slots)[None, :] * slot_len + offset
+    ends = starts + duration - 1
+    used = np.arange(slots)[None, :] < counts[:, None]
+    return np.where(used, starts, -1), np.where(used, ends, -1)
+
+
+def _active(starts: np.ndarray, ends: np.ndarray, days: int) -> np.ndarray:
+    """(restaurants, days, windows) mask of the days each window covers"""
+    day = np.arange(days)[None, :, None]
+    return (starts[:, None, :] >= 0) & (day >= starts[:, None, :]) & (day <= ends[:, None, :])
+
+
+def _chunk(spec: DatasetSpec, segments: pd.DataFrame, index: int, first: int, count: int,
+           campaign_offset: int) -> Dict[str, pd.DataFrame]:
+    """Generate master, metrics, ads and discount rows for restaurants [first, first + count)."""
+    rng = _rng(spec, _CHUNK_STREAM, index)
+    days = spec.days
+    start = date.fromisoformat(spec.start_date)
+    width = max(3, len(str(spec.restaurants)))
+
+    # Restaurants, sampled around their segment
+    seg = segments.iloc[rng.integers(0, len(segments), count)].reset_index(drop=True)
+    ids = np.array([f"R{i:0{width}d}" for i in range(first + 1, first + count + 1)])
+    names = np.array(NAME_PREFIXES)[rng.integers(0, len(NAME_PREFIXES), count)].astype(object) + " " + \
+        np.array(NAME_SUFFIXES)[rng.integers(0, len(NAME_SUFFIXES), count)].astype(object)
+    onboarded = [(start - timedelta(days=int(d))).isoformat() for d in rng.integers(30, 730, count)]
+    base_bookings = seg['daily_bookings'].to_numpy() * rng.lognormal(0, 0.3, count)
+    spend = seg['spend_per_cover'].to_numpy() * rng.normal(1, 0.1, count)
+    party = seg['party_size'].to_numpy() * rng.normal(1, 0.05, count)
+    rating = np.clip(seg['rating'].to_numpy() + rng.normal(0, 0.2, count), 3.0, 4.9)
+    cancel_rate = rng.uniform(0.04, 0.12, count)
+    trend = rng.normal(0, 0.3, count)  # Relative change in demand across the whole period
+
+    # Ad campaigns, each lifting bookings while it runs
+    campaign_counts = np.where(rng.random(count) < spec.ads_share, rng.integers(1, spec.max_campaigns + 1, count), 0)
+    camp_starts, camp_ends = _windows(rng, campaign_counts, days, spec.max_campaigns)
+    camp_lift = rng.uniform(1.15, 1.6, camp_starts.shape)
+    camp_active = _active(camp_starts, camp_ends, days)
+
+    # One discount config per discounting restaurant: more bookings, lower spend per cover
+    has_discount = rng.random(count) < spec.discount_share
+    disc_starts, disc_ends = _windows(rng, has_discount.astype(int), days, 1)
+    disc_percent = DISCOUNT_PERCENTS[rng.integers(0, len(DISCOUNT_PERCENTS), count)]
+    disc_active = _active(disc_starts, disc_ends, days)[:, :, 0]
+
+    # Daily metrics
+    day = np.arange(days)
+    weekday = (start.weekday() + day) % 7
+    weekly = np.where(weekday >= 4, 1.3, 0.9)[None, :]
+    demand = base_bookings[:, None] * weekly * (1 + trend[:, None] * (day[None, :] / max(days - 1, 1) - 0.5))
+    demand *= np.where(camp_active, camp_lift[:, None, :], 1.0).max(axis=2)
+    demand *= np.where(disc_active, 1 + disc_percent[:, None] / 100 * rng.uniform(0.8, 1.6, count)[:, None], 1.0)
+
+    bookings = rng.poisson(np.clip(demand, 0.5, None))
+    cancellations = rng.binomial(bookings, cancel_rate[:, None])
+    covers = bookings + rng.poisson(bookings * (party[:, None] - 1))
+    spend_factor = np.where(disc_active, 1 - disc_percent[:, None] / 200, 1.0)
+    avg_spend = np.round(spend[:, None] * spend_factor * rng.normal(1, 0.05, (count, days))).astype(np.int64)
+    revenue = covers * avg_spend
+    daily_rating = np.clip(np.round(rating[:, None] + rng.normal(0, 0.1, (count, days)), 1), 1.0, 5.0)
+
+    dates = np.array([(start + timedelta(days=int(d))).isoformat() for d in day])
+    master = pd.DataFrame({
+        'restaurant_id': ids,
+        'restaurant_name': names,
+        'city': seg['city'],
+        'locality': seg['locality'],
+        'cuisine': seg['cuisine'],
+        'onboarded_date': onboarded,
+    })
+    metrics = pd.DataFrame({
+        'restaurant_id': np.repeat(ids, days),
+        'restaurant_name': np.repeat(names, days),
+        'locality': np.repeat(seg['locality'].to_numpy(), days),
+        'cuisine': np.repeat(seg['cuisine'].to_numpy(), days),
+        'date': np.tile(dates, count),
+        'bookings': bookings.ravel(),
+        'cancellations': cancellations.ravel(),
+        'covers': covers.ravel(),
+        'avg_spend_per_cover': avg_spend.ravel(),
+        'revenue': revenue.ravel(),
+        'avg_rating': daily_rating.ravel(),
+    })
+
+    # Campaign rows, in restaurant then start order
+    rows, slots = np.nonzero(camp_starts >= 0)
+    duration = camp_ends[rows, slots] - camp_starts[rows, slots] + 1
+    daily_ads_spend = seg['monthly_ads_spend'].to_numpy()[rows] / 30 * rng.lognormal(0, 0.25, len(rows))
+    ad_spend = np.round(daily_ads_spend * duration, -2).astype(np.int64)
+    impressions = np.round(ad_spend * rng.uniform(0.8, 1.2, len(rows)), -3).astype(np.int64)
+    clicks = np.round(impressions * rng.uniform(0.05, 0.1, len(rows))).astype(np.int64)
+    conversions = np.round(clicks * seg['conversion_rate'].to_numpy()[rows] / 100 * rng.normal(1, 0.15, len(rows)))
+    conversions = np.clip(conversions, 0, clicks).astype(np.int64)
+    roi = np.clip(seg['ads_roi'].to_numpy()[rows] * rng.normal(1, 0.15, len(rows)), 0.5, None)
+    ads = pd.DataFrame({
+        'restaurant_id': ids[rows],
+        'campaign_id': [f"C{campaign_offset + i + 101}" for i in range(len(rows))],
+        'campaign_start': dates[camp_starts[rows, slots]],
+        'campaign_end': dates[camp_ends[rows, slots]],
+        'impressions': impressions,
+        'clicks': clicks,
+        'conversions': conversions,
+        'spend': ad_spend,
+        'revenue_generated': np.round(ad_spend * roi, -2).astype(np.int64),
+    })
+
+    disc_rows = np.flatnonzero(has_discount)
+    discounts = pd.DataFrame({
+        'restaurant_id': ids[disc_rows],
+        'start_date': dates[disc_starts[disc_rows, 0]],
+        'end_date': dates[disc_ends[disc_rows, 0]],
+        'discount_type': np.array(DISCOUNT_TYPES)[rng.integers(0, len(DISCOUNT_TYPES), len(disc_rows))],
+        'discount_percent': disc_percent[disc_rows],
+        'roi_from_discount': np.round(
+            np.clip(seg['discount_roi'].to_numpy()[disc_rows] + rng.normal(0, 0.4, len(disc_rows)), 0.5, None), 1
+        ),
+    })
+
+    return {'master': master, 'metrics': metrics, 'ads': ads, 'discounts': discounts}
+
+
+def iter_chunks(spec: DatasetSpec, segments: Optional[pd.DataFrame] = None) -> Iterator[Dict[str, pd.DataFrame]]:
+    """
+    Generate the per-restaurant tables chunk by chunk.
+
+    Args:
+        spec: Dataset size and shape
+        segments: Segment parameters (defaults to generate_segments(spec))
+
+    Yields:
+        Dict with master, metrics, ads and discounts frames for up to spec.chunk_size restaurants
+    """
+    segments = generate_segments(spec) if segments is None else segments
+    campaign_offset = 0
+    for index, first in enumerate(range(0, spec.restaurants, spec.chunk_size)):
+        chunk = _chunk(spec, segments, index, first, min(spec.chunk_size, spec.restaurants - first), campaign_offset)
+        campaign_offset += len(chunk['ads'])
+        yield chunk
+
+
+class CSVSink:
+    """Appends generated tables to CSV files named as in data/, replacing them once complete"""
+
+    def __init__(self, out_dir: Path):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._files = {}
+
+    def _tmp_path(self, name: str) -> Path:
+        return self.out_dir / (TABLES[name].file_name + ".tmp")
+
+    def write(self, name: str, df: pd.DataFrame) -> None:
+        handle = self._files.get(name)
+        if handle is None:
+            # Written next to the target and renamed at the end, so a failed run leaves the old files intact
+            handle = open(self._tmp_path(name), "w", encoding="utf-8", newline="")
+            self._files[name] = handle
+            df.to_csv(handle, index=False)
+        else:
+            df.to_csv(handle, index=False, header=False)
+
+    def close(self, complete: bool = True) -> None:
+        for handle in self._files.values():
+            handle.close()
+        for name in self._files:
+            if complete:
+                os.replace(self._tmp_path(name), self.out_dir / TABLES[name].file_name)
+            else:
+                self._tmp_path(name).unlink()
+
+
+class SQLiteSink:
+    """Bulk-loads generated tables into a SQLite database, replacing it once complete"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Built next to the target and renamed at the end, so readers never see a partial database
+        self._tmp_path = self.db_path.with_name(self.db_path.name + ".tmp")
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
+        self._conn = sqlite3.connect(self._tmp_path)
+        # Nothing to recover if loading fails part way, so skip the journal and fsyncs
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+
+    def write(self, name: str, df: pd.DataFrame) -> None:
+        df.to_sql(Path(TABLES[name].file_name).stem, self._conn, if_exists='append', index=False)
+
+    def close(self, complete: bool = True) -> None:
+        if not complete:
+            self._conn.close()
+            self._tmp_path.unlink()
+            return
+        create_indexes(self._conn)
+        self._conn.close()
+        os.replace(self._tmp_path, self.db_path)
+
+
+def generate_dataset(spec: DatasetSpec, csv_dir: Optional[Path] = None,
+                     db_path: Optional[Path] = None) -> Dict[str, int]:
+    """
+    Generate a dataset and stream it to CSV files and/or a SQLite database.
+
+    Args:
+        spec: Dataset size and shape
+        csv_dir: Directory to write the five CSV files to
+        db_path: SQLite database to (re)create
+
+    Returns:
+        Number of rows written per table
+    """
+    if csv_dir is None and db_path is None:
+        raise ValueError("Pass csv_dir and/or db_path")
+
+    sinks = []
+    if csv_dir is not None:
+        sinks.append(CSVSink(csv_dir))
+    if db_path is not None:
+        sinks.append(SQLiteSink(db_path))
+
+    segments = generate_segments(spec)
+    counts = {name: 0 for name in TABLES}
+    complete = False
+    try:
+        # Benchmarks first so every sink has all five tables even for an empty dataset
+        benchmarks = benchmarks_from_segments(segments)
+        for sink in sinks:
+            sink.write('benchmarks', benchmarks)
+        counts['benchmarks'] = len(benchmarks)
+
+        for chunk in iter_chunks(spec, segments):
+            for name, df in chunk.items():
+                for sink in sinks:
+                    sink.write(name, df)
+                counts[name] += len(df)
+            logger.info(f"Generated {counts['master']}/{spec.restaurants} restaurants")
+        complete = True
+    finally:
+        for sink in sinks:
+            sink.close(complete)
+    return counts
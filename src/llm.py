@@ -0,0 +1,88 @@
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
+import os
+
+if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+DEFAULT_MODEL = "gpt-4o"
+
+# Scheduling priorities of LLM calls (src/utils/llm_scheduler.py); lower is served first
+INTERACTIVE = 0
+BATCH = 10
+
+
+def offline_requested() -> bool:
+    """Whether DINEOUT_LLM selects the offline model."""
+    return os.getenv("DINEOUT_LLM", "").lower() == "offline"
+
+
+def create_llm(use_cache: bool = True, offline: Optional[bool] = None,
+               priority: Optional[int] = None) -> "BaseChatModel":
+    """Create the chat model shared by all agents of a report.
+
+    Calls go through the process-wide LLM scheduler (rate limits, concurrency cap,
+    priorities and retries); cache hits are answered before reaching it.
+
+    Args:
+        use_cache: Serve repeated calls from the persistent response cache
+        offline: Use the deterministic offline model instead of OpenAI (defaults to DINEOUT_LLM=offline)
+        priority: Scheduling priority of the model's calls (defaults to interactive)
+
+    Returns:
+        Chat model configured for deterministic (temperature 0) output
+    """
+    from src.utils.llm_cache import get_llm_cache
+    from src.utils.llm_scheduler import ScheduledChatModel
+
+    cache = get_llm_cache() if use_cache else False
+    if offline is None:
+        offline = offline_requested()
+    if offline:
+        from src.offline_llm import OfflineChatModel
+
+        model = OfflineChatModel.from_env(cache=False)
+    else:
+        # Imported here so that code paths which never call an LLM don't pay for loading the client
+        from langchain_openai import ChatOpenAI
+
+        model = ChatOpenAI(
+            model=DEFAULT_MODEL,
+            temperature=0,
+            cache=False,
+            max_retries=0,  # Retried by the scheduler, which backs off across all concurrent calls
+            stream_usage=True,  # Token usage is reported for streamed responses too
+        )
+    return ScheduledChatModel(model=model, cache=cache, priority=INTERACTIVE if priority is None else priority)
+
+
+def stream_invoke(llm: "BaseChatModel", messages: List[Any], on_token: Callable[[str], None], **kwargs: Any) -> str:
+    """Call the model with its token stream passed to `on_token` as it arrives.
+
+    Unlike `llm.stream`, this goes through `invoke`, so the response cache is still
+    checked first and updated afterwards; a cached response reaches `on_token` in one piece.
+
+    Args:
+        llm: Chat model to call
+        messages: Chat messages
+        on_token: Called with each chunk of content as it is generated
+        **kwargs: Passed to the model call (e.g. `response_format`)
+
+    Returns:
+        The full response content
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenHandler(BaseCallbackHandler):
+        def __init__(self):
+            self.streamed = False
+
+        def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+            if token:
+                self.streamed = True
+                on_token(token)
+
+    handler = TokenHandler()
+    content = llm.invoke(messages, config={"callbacks": [handler]}, stream=True, **kwargs).content
+    if not handler.streamed and content:
+        on_token(content)
+    return content
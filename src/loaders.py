@@ -1,24 +1,345 @@
 import pandas as pd
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+import hashlib
 import logging
+import os
+import sqlite3
+import threading
+import weakref
+
+from src.analytics.portfolio import PortfolioMetrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar cache is optional; fall back to parsing CSVs
+    pa = None
+    pq = None
 
 # Configure logging
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
+class TableSpec(NamedTuple):
+    """Source file and typed schema of one data table."""
+    file_name: str
+    date_columns: List[str]
+    key_columns: List[str]
+    categorical_columns: List[str]
+
+
+TABLES: Dict[str, TableSpec] = {
+    'master': TableSpec("restaurant_master.csv", ['onboarded_date'], ['restaurant_id'],
+                        ['restaurant_id', 'city', 'locality', 'cuisine']),
+    'metrics': TableSpec("restaurant_metrics.csv", ['date'], ['restaurant_id'],
+                         ['restaurant_id', 'restaurant_name', 'locality', 'cuisine']),
+    'ads': TableSpec("ads_data.csv", ['campaign_start', 'campaign_end'], ['restaurant_id'],
+                     ['restaurant_id', 'campaign_id']),
+    'discounts': TableSpec("discount_history.csv", ['start_date', 'end_date'], ['restaurant_id'],
+                           ['restaurant_id', 'discount_type']),
+    'benchmarks': TableSpec("peer_benchmarks.csv", [], ['locality', 'cuisine'],
+                            ['locality', 'cuisine']),
+}
+
+DEFAULT_DB_PATH = Path("db") / "dineout.db"
+
+# Relative database paths are resolved against the project root, not the working directory
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def resolve_db_path(db_path: Optional[Path] = None) -> Path:
+    """Absolute database path, with relative paths resolved against the project root."""
+    path = Path(db_path or DEFAULT_DB_PATH)
+    return path if path.is_absolute() else PROJECT_ROOT / path
+
+
+def create_indexes(conn: sqlite3.Connection) -> None:
+    """Create the per-restaurant lookup indexes SQLiteDataLoader relies on, then refresh planner statistics.
+
+    Readers never call this; it runs when a database is built (see data_generator.SQLiteSink)
+    or explicitly through scripts/index_database.py.
+    """
+    with conn:
+        for index_name, (table, columns) in SQLiteDataLoader.INDEXES.items():
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({", ".join(columns)})')
+        conn.execute("ANALYZE")
+
+
+def apply_schema(df: pd.DataFrame, spec: TableSpec) -> pd.DataFrame:
+    """Apply a table's typed schema to a freshly read dataframe.
+
+    Dates are parsed and id/label columns become categoricals. Integer columns stay
+    int64: they hold money and counts that are summed and multiplied (e.g. covers x
+    spend per cover), which int32 could overflow on large datasets.
+    """
+    for column in spec.date_columns:
+        df[column] = pd.to_datetime(df[column])
+    for column in spec.categorical_columns:
+        df[column] = df[column].astype('category')
+    return df
+
+
+def without_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of a frame with its categorical columns back as plain object columns, as read from the CSV.
+
+    The store keeps ids and labels as categoricals with table-wide category lists;
+    handed to callers, those would produce empty groups in any groupby without
+    `observed=True`.
+    """
+    categorical = df.select_dtypes(include='category').columns
+    return df.astype({column: object for column in categorical}) if len(categorical) else df.copy()
+
+
+def read_typed_csv(path: Path, spec: TableSpec) -> pd.DataFrame:
+    """Read a CSV and apply the table's typed schema."""
+    return apply_schema(pd.read_csv(path), spec)
+
+
+class ColumnarCache:
+    """
+    Typed Parquet copies of the data CSVs, keyed by a hash of the source file and the schema version.
+
+    The first read of a CSV converts it once (see `read_typed_csv`) and writes it
+    sorted by the table's key columns, so Parquet row-group statistics let reads
+    filtered on `restaurant_id` skip everything but the matching row groups.
+    """
+
+    ROW_GROUP_SIZE = 65536
+    # Bump whenever apply_schema changes, so cache files with the old column types are rebuilt
+    SCHEMA_VERSION = 2
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self._hashes: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        """Whether pyarrow is installed and the cache can be used."""
+        return pq is not None
+
+    def _source_hash(self, source: Path) -> str:
+        stat = source.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._hashes.get(source)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        source_hash = digest.hexdigest()[:16]
+        self._hashes[source] = (signature, source_hash)
+        return source_hash
+
+    def path_for(self, source: Path) -> Path:
+        """Cache file path for the current contents of a source CSV."""
+        return self.cache_dir / f"{source.stem}-{self._source_hash(source)}-v{self.SCHEMA_VERSION}.parquet"
+
+    def _build(self, source: Path, spec: TableSpec, target: Path) -> None:
+        df = read_typed_csv(source, spec)
+        df = df.sort_values(spec.key_columns, kind='stable').reset_index(drop=True)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path,
+                       row_group_size=self.ROW_GROUP_SIZE)
+        os.replace(tmp_path, target)
+
+        # Remove cache files for older versions of the same source
+        for stale in self.cache_dir.glob(f"{source.stem}-*.parquet"):
+            if stale != target:
+                stale.unlink(missing_ok=True)
+        logger.info(f"Built columnar cache {target} from {source}")
+
+    def read(self, source: Path, spec: TableSpec, columns: Optional[List[str]] = None,
+             restaurant_id: Optional[str] = None) -> pd.DataFrame:
+        """
+        Read a table through the cache, converting the CSV first if needed.
+
+        Args:
+            source: Path to the source CSV
+            spec: Typed schema of the table
+            columns: Optional column projection
+            restaurant_id: Optional restaurant to push down as a row-group filter
+
+        Returns:
+            Typed dataframe
+        """
+        target = self.path_for(source)
+        if not target.exists():
+            with self._lock:
+                if not target.exists():
+                    self._build(source, spec, target)
+
+        filters = [('restaurant_id', '=', restaurant_id)] if restaurant_id is not None else None
+        return pq.read_table(target, columns=columns, filters=filters).to_pandas()
+
+
+class _IndexedTable:
+    """A fully loaded table partitioned by its key columns."""
+
+    def __init__(self, frame: pd.DataFrame, key_columns: List[str], signature: Tuple[int, int]):
+        self.frame = frame
+        self.signature = signature
+        # Zero-row frame with the right columns/dtypes, returned for missing keys
+        self.empty = frame.iloc[0:0]
+        key = key_columns[0] if len(key_columns) == 1 else key_columns
+        self.partitions: Dict[Hashable, pd.DataFrame] = {
+            group_key: group for group_key, group in frame.groupby(key, sort=False, observed=True)
+        }
+
+    def get(self, key: Hashable) -> pd.DataFrame:
+        return self.partitions.get(key, self.empty)
+
+
+class DataStore:
+    """
+    Process-wide, indexed in-memory view over the CSVs in a data directory.
+
+    Each table is parsed once and pre-partitioned by `restaurant_id` (benchmarks by
+    `(locality, cuisine)`), so per-restaurant lookups are dictionary hits instead of
+    a full re-read and boolean filter. A table is reloaded transparently when its
+    file's mtime or size changes.
+    """
+
+    _instances: Dict[Path, "DataStore"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.cache = ColumnarCache(self.data_dir / ".cache") if ColumnarCache.available() else None
+        self._tables: Dict[str, _IndexedTable] = {}
+        self._derived: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_dir(cls, data_dir: Path) -> "DataStore":
+        """Return the shared store for a data directory, creating it on first use."""
+        resolved = Path(data_dir).resolve()
+        with cls._instances_lock:
+            store = cls._instances.get(resolved)
+            if store is None:
+                store = cls(resolved)
+                cls._instances[resolved] = store
+            return store
+
+    def _file_signature(self, path: Path) -> Tuple[int, int]:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def read_table(self, name: str, columns: Optional[List[str]] = None,
+                   restaurant_id: Optional[str] = None) -> pd.DataFrame:
+        """Read a table from disk, through the columnar cache when available."""
+        spec = TABLES[name]
+        source = self.data_dir / spec.file_name
+        if self.cache is not None:
+            try:
+                return self.cache.read(source, spec, columns=columns, restaurant_id=restaurant_id)
+            except Exception as e:
+                logger.warning(f"Columnar cache unavailable for {spec.file_name}, reading CSV: {str(e)}")
+
+        df = read_typed_csv(source, spec)
+        if restaurant_id is not None:
+            df = df[df['restaurant_id'] == restaurant_id].reset_index(drop=True)
+        if columns is not None:
+            df = df[columns]
+        return df
+
+    def _table(self, name: str) -> _IndexedTable:
+        file_name, _, key_columns, _ = TABLES[name]
+        signature = self._file_signature(self.data_dir / file_name)
+        table = self._tables.get(name)
+        if table is not None and table.signature == signature:
+            return table
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            table = self._tables.get(name)
+            if table is None or table.signature != signature:
+                if table is not None:
+                    logger.info(f"{file_name} changed on disk, reloading")
+                table = _IndexedTable(self.read_table(name), key_columns, signature)
+                self._tables[name] = table
+            return table
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """Return the full (shared, read-only) frame for a table."""
+        return self._table(name).frame
+
+    def get(self, name: str, key: Hashable) -> pd.DataFrame:
+        """Return the (shared, read-only) partition of a table for a key."""
+        return self._table(name).get(key)
+
+    def derived(self, key: str, name: str, build: Callable[[pd.DataFrame], Any]) -> Any:
+        """
+        Return `build(frame(name))`, computed once per version of the table.
+
+        Args:
+            key: Name the result is memoized under
+            name: Table the result is derived from
+            build: Function computing the result from the full table frame
+
+        Returns:
+            The memoized result, rebuilt when the table's file changes
+        """
+        table = self._table(name)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == table.signature:
+            return cached[1]
+
+        with self._lock:
+            cached = self._derived.get(key)
+            if cached is None or cached[0] != table.signature:
+                cached = (table.signature, build(table.frame))
+                self._derived[key] = cached
+            return cached[1]
+
+
 class DataLoader:
     def __init__(self, data_dir: Optional[Path] = None):
         """Initialize the data loader with optional data directory path."""
         self.data_dir = data_dir or Path("data")
-    
+        self.store = DataStore.for_dir(self.data_dir)
+
+    def load_table(self, name: str, restaurant_id: Optional[str] = None,
+                   columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Read a single table straight from disk, bypassing the in-memory store.
+
+        With the columnar cache enabled, `columns` is projected at read time and
+        `restaurant_id` is pushed down to skip non-matching row groups.
+        """
+        return self.store.read_table(name, columns=columns, restaurant_id=restaurant_id)
+
+    def list_restaurants(self, city: Optional[str] = None, locality: Optional[str] = None) -> List[str]:
+        """Return restaurant IDs from the master data, optionally filtered by city and/or locality."""
+        master_df = self.load_table('master', columns=['restaurant_id', 'city', 'locality'])
+        mask = pd.Series(True, index=master_df.index)
+        if city is not None:
+            mask &= master_df['city'].astype(str).str.lower() == city.lower()
+        if locality is not None:
+            mask &= master_df['locality'].astype(str).str.lower() == locality.lower()
+        return sorted(master_df.loc[mask, 'restaurant_id'].astype(str).unique())
+
+    def _fetch(self, name: str, key: Hashable) -> pd.DataFrame:
+        """Return one table's (shared, read-only) rows for a key; load_data copies them."""
+        return self.store.get(name, key)
+
+    def portfolio_metrics(self) -> Optional[PortfolioMetrics]:
+        """Totals/Averages for every restaurant, computed once per version of the metrics table."""
+        return PortfolioMetrics.for_store(self.store)
+
     def load_data(self, restaurant_id: str) -> Dict[str, pd.DataFrame]:
         """
         Load all data sources for a restaurant.
-        
+
         Args:
             restaurant_id: The ID of the restaurant to load data for
-            
+
         Returns:
             Dictionary containing all dataframes:
             - master: Restaurant master data
@@ -29,54 +350,135 @@ class DataLoader:
         """
         try:
             # Load master data
-            master_df = pd.read_csv(self.data_dir / "restaurant_master.csv")
-            master_df['onboarded_date'] = pd.to_datetime(master_df['onboarded_date'])
-            master_data = master_df[master_df['restaurant_id'] == restaurant_id].copy()
+            master_data = self._fetch('master', restaurant_id)
             if master_data.empty:
                 raise ValueError(f"Restaurant {restaurant_id} not found in master data")
-        
+
             # Load metrics data
-            metrics_df = pd.read_csv(self.data_dir / "restaurant_metrics.csv")
-            metrics_df['date'] = pd.to_datetime(metrics_df['date'])
-            metrics_data = metrics_df[metrics_df['restaurant_id'] == restaurant_id].copy()
+            metrics_data = self._fetch('metrics', restaurant_id)
             if metrics_data.empty:
                 raise ValueError(f"No metrics data found for restaurant {restaurant_id}")
 
             # Load ads data
-            ads_df = pd.read_csv(self.data_dir / "ads_data.csv")
-            ads_df['campaign_start'] = pd.to_datetime(ads_df['campaign_start'])
-            ads_df['campaign_end'] = pd.to_datetime(ads_df['campaign_end'])
-            ads_data = ads_df[ads_df['restaurant_id'] == restaurant_id].copy()
+            ads_data = self._fetch('ads', restaurant_id)
             if ads_data.empty:
                 logger.warning(f"No ads data found for restaurant {restaurant_id}")
 
             # Load discount data
-            discount_df = pd.read_csv(self.data_dir / "discount_history.csv")
-            discount_df['start_date'] = pd.to_datetime(discount_df['start_date'])
-            discount_df['end_date'] = pd.to_datetime(discount_df['end_date'])
-            discount_data = discount_df[discount_df['restaurant_id'] == restaurant_id].copy()
+            discount_data = self._fetch('discounts', restaurant_id)
             if discount_data.empty:
                 logger.warning(f"No discount history found for restaurant {restaurant_id}")
-            
+
             # Load benchmarks using restaurant's locality and cuisine
             locality = master_data.iloc[0]['locality']
             cuisine = master_data.iloc[0]['cuisine']
-            benchmark_df = pd.read_csv(self.data_dir / "peer_benchmarks.csv")
-            benchmark_data = benchmark_df[
-                (benchmark_df['locality'] == locality) & 
-                (benchmark_df['cuisine'] == cuisine)
-            ].copy()
+            benchmark_data = self._fetch('benchmarks', (locality, cuisine))
             if benchmark_data.empty:
                 logger.warning(f"No peer benchmarks found for {locality} - {cuisine}")
 
+            # Same column types as the CSVs read directly, whatever the store keeps internally
             return {
-                    'master': master_data,
-                    'metrics': metrics_data,
-                    'ads': ads_data,
-                    'discounts': discount_data,
-                    'benchmarks': benchmark_data
+                    'master': without_categoricals(master_data),
+                    'metrics': without_categoricals(metrics_data),
+                    'ads': without_categoricals(ads_data),
+                    'discounts': without_categoricals(discount_data),
+                    'benchmarks': without_categoricals(benchmark_data)
                 }
 
         except Exception as e:
             logger.error(f"Error loading data: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+
+class SQLiteDataLoader(DataLoader):
+    """
+    DataLoader that serves `load_data` from the SQLite database.
+
+    Every lookup is a parameterized query against an index on the table's key
+    (see create_indexes), so the cost of loading one restaurant does not grow with
+    the number of restaurants in the database. The database is only ever opened
+    read-only.
+    """
+
+    # Index name -> (table, columns)
+    INDEXES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+        'idx_restaurant_master_restaurant': ('restaurant_master', ('restaurant_id',)),
+        'idx_restaurant_metrics_restaurant_date': ('restaurant_metrics', ('restaurant_id', 'date')),
+        'idx_ads_data_restaurant_start': ('ads_data', ('restaurant_id', 'campaign_start')),
+        'idx_discount_history_restaurant_start': ('discount_history', ('restaurant_id', 'start_date')),
+        'idx_peer_benchmarks_locality_cuisine': ('peer_benchmarks', ('locality', 'cuisine')),
+    }
+
+    # Table name -> ORDER BY clause, matching the row order of the CSVs
+    ORDER_BY: Dict[str, str] = {
+        'master': 'restaurant_id',
+        'metrics': 'date',
+        'ads': 'campaign_start',
+        'discounts': 'start_date',
+        'benchmarks': 'locality, cuisine',
+    }
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """Initialize the loader.
+
+        Every table is read from the database, so unlike DataLoader there is no CSV-backed
+        DataStore to set up and DataLoader.__init__ is deliberately not called.
+
+        Args:
+            db_path: SQLite database to read (defaults to db/dineout.db; relative paths are resolved
+                against the project root, like the SQL agent's)
+        """
+        self.db_path = resolve_db_path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._close_conn: Optional[weakref.finalize] = None
+        self._conn_lock = threading.Lock()
+
+    def _query(self, query: str, params: Tuple = ()) -> pd.DataFrame:
+        """Run a query on the loader's read-only connection, shared by all threads one query at a time."""
+        with self._conn_lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(f"{self.db_path.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+                # Closed with the loader, or at exit
+                self._close_conn = weakref.finalize(self, self._conn.close)
+            return pd.read_sql_query(query, self._conn, params=params)
+
+    def close(self) -> None:
+        """Close the database connection; the next query opens a new one."""
+        with self._conn_lock:
+            if self._close_conn is not None:
+                self._close_conn()
+            self._conn = None
+            self._close_conn = None
+
+    def load_table(self, name: str, restaurant_id: Optional[str] = None,
+                   columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read a single table from the database, optionally for one restaurant."""
+        spec = TABLES[name]
+        table = Path(spec.file_name).stem
+        select = ", ".join(columns) if columns else "*"
+        query = f"SELECT {select} FROM {table}"
+        params: Tuple = ()
+        if restaurant_id is not None:
+            query += " WHERE restaurant_id = ?"
+            params = (restaurant_id,)
+        query += f" ORDER BY {self.ORDER_BY[name]}"
+        df = self._query(query, params)
+        if columns is not None:
+            spec = spec._replace(
+                date_columns=[c for c in spec.date_columns if c in columns],
+                categorical_columns=[c for c in spec.categorical_columns if c in columns],
+            )
+        return apply_schema(df, spec)
+
+    def _fetch(self, name: str, key: Hashable) -> pd.DataFrame:
+        spec = TABLES[name]
+        table = Path(spec.file_name).stem
+        keys = key if isinstance(key, tuple) else (key,)
+        where = " AND ".join(f"{column} = ?" for column in spec.key_columns)
+        query = f"SELECT * FROM {table} WHERE {where} ORDER BY {self.ORDER_BY[name]}"
+        df = self._query(query, keys)
+        return apply_schema(df, spec)
+
+    def portfolio_metrics(self) -> Optional[PortfolioMetrics]:
+        """Not precomputed for SQLite; each report computes its own restaurant's metrics."""
+        return None
@@ -0,0 +1,495 @@
+"""
+Offline, deterministic stand-in for the OpenAI chat model.
+
+`OfflineChatModel` answers every prompt the agents send (peer benchmark
+summary, recommendation bullets, the report narrative, each report section or
+the whole report, and the SQL ReAct agent's tool calls) from the data in the prompt itself, so reports can be generated,
+benchmarked and evaluated without network access. Responses depend only on the
+messages, and simulated latency and token usage are derived from them too, so
+repeated runs are reproducible. Select it with DINEOUT_LLM=offline or --offline.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import ast
+import hashlib
+import json
+import os
+import random
+import re
+import time
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+from src.prompts import (BENCHMARK_SYSTEM_PROMPT, RECOMMENDATION_SYSTEM_PROMPT, REPORT_FORMATTER_SYSTEM_PROMPT,
+                         REPORT_NARRATIVE_SYSTEM_PROMPT, REPORT_SECTION_SYSTEM_PROMPTS, REPORT_SECTIONS)
+from src.utils.prompt_builder import count_tokens
+
+OFFLINE_MODEL = "offline-template"
+
+# Environment variables configuring the offline model
+ENV_BACKEND = "DINEOUT_LLM"  # "offline" selects OfflineChatModel in create_llm
+ENV_LATENCY_MS = "DINEOUT_OFFLINE_LATENCY_MS"
+ENV_LATENCY_SIGMA = "DINEOUT_OFFLINE_LATENCY_SIGMA"
+ENV_MS_PER_TOKEN = "DINEOUT_OFFLINE_MS_PER_TOKEN"
+ENV_RESPONSES = "DINEOUT_OFFLINE_RESPONSES"
+ENV_ERROR_RATE = "DINEOUT_OFFLINE_ERROR_RATE"
+
+_JSON_BLOCK = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+_STREAM_PIECE = re.compile(r"\s*\S+|\s+")  # Words with their leading whitespace
+_RESTAURANT_ID = re.compile(r"restaurant_id\s+'?(\w+)'?")
+
+# Report section by its system prompt
+_REPORT_SECTIONS = {prompt: name for name, prompt in REPORT_SECTION_SYSTEM_PROMPTS.items()}
+
+# Period comparisons the SQL agent is asked for: (interval table, start column, end column, label, metrics)
+_PERIOD_QUERIES = {
+    "ads": ("ads_data", "campaign_start", "campaign_end", "Campaign",
+            [("bookings", "Average Daily Bookings"), ("revenue", "Average Daily Revenue")]),
+    "discounts": ("discount_history", "start_date", "end_date", "Discount",
+                  [("covers", "Average Daily Covers"), ("avg_spend_per_cover", "Average Spend per Cover"),
+                   ("bookings", "Average Daily Bookings"), ("revenue", "Average Daily Revenue")]),
+}
+
+
+def _text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else json.dumps(message.content)
+
+
+def _json_blocks(text: str) -> List[Any]:
+    return [json.loads(block) for block in _JSON_BLOCK.findall(text)]
+
+
+def _money(value: float) -> str:
+    return f"₹{value:,.0f}"
+
+
+def _position(gap: float) -> str:
+    """Significance wording from BENCHMARK_SYSTEM_PROMPT for a % gap vs peers"""
+    if gap > 25:
+        return "Substantial lead"
+    if gap >= 15:
+        return "Notable advantage"
+    if gap >= -5:
+        return "Broadly aligned"
+    if gap >= -15:
+        return "Slightly behind"
+    if gap >= -25:
+        return "Material gap"
+    return "Significant shortfall"
+
+
+def _table(header: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    lines = ["| " + " | ".join(header) + " |", "|" + "|".join("--------" for _ in header) + "|"]
+    lines.extend("| " + " | ".join(str(cell) for cell in row) + " |" for row in rows)
+    return "\n".join(lines)
+
+
+def _benchmark_rows(benchmark: Dict[str, Any]) -> Dict[str, List[Tuple[str, str, str, float]]]:
+    """(metric, restaurant, peers, gap) rows per benchmark section"""
+    b, r, ra = benchmark["bookings_comparison"], benchmark["revenue_comparison"], benchmark["rating_comparison"]
+    a, d = benchmark["ads_comparison"], benchmark["discount_comparison"]
+    return {
+        "Core Metrics": [
+            ("Bookings", f"{b['total_bookings']:,}", f"{b['total_peer_bookings']:,}", b["gap"]),
+            ("Revenue", _money(r["total_revenue"]), _money(r["total_peer_revenue"]), r["gap"]),
+            ("Rating", f"{ra['rating']:.1f}", f"{ra['peer_rating']:.1f}", ra["gap"]),
+        ],
+        "Advertising Performance": [
+            ("Daily Ad Spend", _money(a["avg_ad_spend"]), _money(a["avg_ad_spend_peer"]), a["gap_ad_spend"]),
+            ("Ads ROI", f"{a['ads_roi']:.2f}x", f"{a['ads_roi_peer']:.2f}x", a["gap_ads_roi"]),
+        ],
+        "Discount Performance": [
+            ("Discount %", f"{d['avg_discount_percentage']:.1f}%", f"{d['avg_discount_percentage_peer']:.1f}%",
+             d["gap_discount_percentage"]),
+            ("Discount ROI", f"{d['discount_roi']:.2f}x", f"{d['discount_roi_peer']:.2f}x", d["gap_discount_roi"]),
+        ],
+    }
+
+
+def _benchmark_table(rows: Sequence[Tuple[str, str, str, float]]) -> str:
+    return _table(["Metric", "Restaurant", "Peers", "Gap"],
+                  [(name, own, peer, f"{gap:+.1f}%") for name, own, peer, gap in rows])
+
+
+def _benchmark_summary(blocks: List[Any]) -> str:
+    benchmark = {key: value for block in blocks for key, value in block.items()}
+    sections = []
+    for title, rows in _benchmark_rows(benchmark).items():
+        table = _benchmark_table(rows)
+        best = max(rows, key=lambda row: row[3])
+        worst = min(rows, key=lambda row: row[3])
+        insights = [f"- {_position(best[3])} on {best[0].lower()} ({best[3]:+.1f}%)"]
+        if worst is not best:
+            insights.append(f"- {_position(worst[3])} on {worst[0].lower()} ({worst[3]:+.1f}%)")
+        if all(own.strip("₹x%") in ("0", "0.0", "0.00") for _, own, _, _ in rows):
+            insights.append(f"- Untapped opportunity - peers average {rows[0][2]}")
+        sections.append(f"### {title}\n{table}\n\n" + "\n".join(insights))
+    return "\n\n".join(sections)
+
+
+def _recommendation_bullets(recommendations: List[Dict[str, Any]]) -> str:
+    ordered = sorted(recommendations, key=lambda rec: rec["priority"])[:4]
+    return "\n".join(
+        f"- **{rec['action']}**: {rec['current_value']:,.1f} now vs {rec['target_value']:,.1f} target. "
+        f"{rec['expected_impact']}"
+        for rec in ordered
+    )
+
+
+def _status(benchmark: Dict[str, Any]) -> Tuple[str, str]:
+    """(status, key alert) from the core peer gaps, as the narrative prompt's status rules describe"""
+    gaps = {
+        "Bookings": benchmark["bookings_comparison"]["gap"],
+        "Revenue": benchmark["revenue_comparison"]["gap"],
+        "Rating": benchmark["rating_comparison"]["gap"],
+    }
+    critical = [name for name, gap in gaps.items() if gap < -30]
+    lagging = [name for name, gap in gaps.items() if gap < -15]
+    status = "URGENT" if len(critical) >= 2 else "ATTENTION" if lagging else "HEALTHY"
+    metric, gap = min(gaps.items(), key=lambda item: item[1])
+    if gap < 0:
+        alert = f"{metric} {abs(gap):.1f}% below peers"
+    else:
+        alert = f"{metric} {gap:.1f}% above peers; keep momentum"
+    return status, alert
+
+
+def _top_priority(bullets: List[str]) -> str:
+    return bullets[0].lstrip("- ").strip() if bullets else "Maintain current performance"
+
+
+def _summary_section(benchmark: Dict[str, Any], bullets: List[str]) -> List[str]:
+    status, alert = _status(benchmark)
+    return [f"- **Status**: {status}", f"- **Key Alert**: {alert}", f"- **Top Priority**: {_top_priority(bullets)}"]
+
+
+def _performance_section(trends: Dict[str, Any]) -> List[str]:
+    totals, averages = trends["totals"], trends["averages"]
+    lines = [
+        _table(["Metric", "Value"], [
+            ("Total Bookings", f"{totals['total_bookings']:,}"),
+            ("Total Cancellations", f"{totals['total_cancellations']:,}"),
+            ("Total Covers", f"{totals['total_covers']:,}"),
+            ("Total Revenue", _money(totals["total_revenue"])),
+        ]),
+        "",
+        "**KEY SALES METRICS**",
+        "",
+        _table(["Metric", "Value"], [
+            ("**OPD (Orders Per Day)**", f"{averages['avg_daily_bookings']:.1f}"),
+            ("**Spend Per Cover**", _money(averages["avg_spend_per_cover"])),
+            ("**Revenue per Booking**", _money(averages["avg_revenue_per_booking"])),
+            ("**Cancellation Rate**", f"{averages['overall_cancellation_rate']:.1f}%"),
+            ("**Average Rating**", f"{averages['avg_rating']:.1f}"),
+        ]),
+        "",
+        f"![Bookings Rolling 7-Day]({trends['charts']['bookings_rolling_7day_path']})",
+        "",
+    ]
+    for anomaly in trends.get("anomalies", []):
+        window = f"{anomaly['date']} to {anomaly['end_date']}" if anomaly.get("end_date") else anomaly["date"]
+        lines.append(f"- {anomaly['kind'].replace('_', ' ').capitalize()} in {anomaly['metric']} on {window} "
+                     f"({anomaly['change_pct']:+.1f}%)")
+    return lines
+
+
+def _ads_section(ads: Dict[str, Any]) -> List[str]:
+    if "summary" in ads:
+        return [ads["summary"]]
+    return [
+        _table(["Metric", "Value"], [
+            ("Ad Campaign Duration", f"{ads['total_ad_days']} days"),
+            ("Total Ad Spend", _money(ads["total_spend"])),
+            ("Impressions", f"{ads['total_impressions']:,}"),
+            ("Clicks", f"{ads['total_clicks']:,}"),
+            ("Conversions", f"{ads['total_conversions']:,}"),
+            ("**Conversion Rate (%)**", f"{ads['conversion_rate']:.1f}%"),
+            ("Revenue Generated", _money(ads["total_revenue_generated"])),
+            ("ROI", f"{ads['roi']:.2f}x"),
+        ]),
+        "",
+        ads["campaign_analysis"].strip(),
+    ]
+
+
+def _discount_section(discounts: Dict[str, Any]) -> List[str]:
+    if "summary" in discounts:
+        return [discounts["summary"]]
+    return [
+        _table(["Metric", "Value"], [
+            ("Discount Campaign Duration", f"{discounts['total_discount_days']} days"),
+            ("Average Discount", f"{discounts['avg_discount_percent']:.1f}%"),
+            ("ROI", f"{discounts['roi']:.2f}x"),
+        ]),
+        "",
+        discounts["discount_analysis"].strip(),
+    ]
+
+
+def _benchmark_section(benchmark: Dict[str, Any]) -> List[str]:
+    rows = [row for section in _benchmark_rows(benchmark).values() for row in section]
+    return [_benchmark_table(rows), "", benchmark.get("llm_summary", "")]
+
+
+def _report_section(name: str, data: Any) -> str:
+    """Body of one report section (REPORT_SECTIONS) from its slice of the data"""
+    if name == "executive_summary":
+        lines = _summary_section(data["peer_benchmarks"], data.get("recommendations", []))
+    elif name == "performance":
+        lines = _performance_section(data)
+    elif name == "ads":
+        lines = _ads_section(data)
+    elif name == "discounts":
+        lines = _discount_section(data)
+    elif name == "benchmarks":
+        lines = _benchmark_section(data)
+    else:
+        lines = [line for line in data.get("bullets", []) if line.strip()]
+    return "\n".join(lines).strip()
+
+
+def _report(blocks: List[Any]) -> str:
+    """Whole report (REPORT_FORMATTER_SYSTEM_PROMPT): the header, then every section as in sections mode"""
+    info, trends, ads, discounts, benchmark, recommendations = blocks
+    header = "\n".join([
+        f"# {info['name']} - Performance Summary (Last 30 Days)",
+        "",
+        "### Cuisine and Locality",
+        f"{info['cuisine']} | {info['locality']}, {info['city']}",
+        "",
+    ]) + "\n"
+    data = {
+        "executive_summary": {"peer_benchmarks": benchmark, "recommendations": recommendations.get("bullets", [])},
+        "performance": trends,
+        "ads": ads,
+        "discounts": discounts,
+        "benchmarks": benchmark,
+        "recommendations": recommendations,
+    }
+    sections = [f"{heading}\n{_report_section(name, data[name])}" for name, (heading, _) in REPORT_SECTIONS.items()]
+    return header + "\n\n".join(sections) + "\n"
+
+
+def _narrative(blocks: List[Any]) -> Dict[str, str]:
+    """Executive summary and narrative paragraphs (REPORT_NARRATIVE_SYSTEM_PROMPT's JSON object)"""
+    _, trends, ads, discounts, benchmark, recommendations = blocks
+    averages = trends["averages"]
+    bullets = [line for line in recommendations.get("bullets", []) if line.strip()]
+    status, alert = _status(benchmark)
+
+    performance = (f"The restaurant averaged {averages['avg_daily_bookings']:.1f} bookings a day at "
+                   f"{_money(averages['avg_spend_per_cover'])} per cover.")
+    anomalies = trends.get("anomalies", [])
+    if anomalies:
+        performance += f" Daily bookings show {len(anomalies)} anomal{'y' if len(anomalies) == 1 else 'ies'}, listed above."
+    if "summary" in ads:
+        peer_spend = benchmark["ads_comparison"]["avg_ad_spend_peer"]
+        ads_summary = f"Peers spend {_money(peer_spend)} a day on ads, an untapped opportunity."
+    else:
+        ads_summary = (f"Campaigns ran for {ads['total_ad_days']} days at a {ads['roi']:.2f}x ROI, converting "
+                       f"{ads['conversion_rate']:.1f}% of clicks into bookings.")
+    if "summary" in discounts:
+        peer_discount = benchmark["discount_comparison"]["avg_discount_percentage_peer"]
+        discount_summary = f"Peers offer {peer_discount:.1f}% discounts on average, an untapped opportunity."
+    else:
+        discount_summary = (f"Discounts averaging {discounts['avg_discount_percent']:.1f}% ran for "
+                            f"{discounts['total_discount_days']} days at a {discounts['roi']:.2f}x ROI.")
+    return {
+        "status": status,
+        "key_alert": alert,
+        "top_priority": _top_priority(bullets),
+        "performance_summary": performance,
+        "ads_summary": ads_summary,
+        "discount_summary": discount_summary,
+    }
+
+
+def _period_sql(kind: str, restaurant_id: str) -> str:
+    table, start, end, label, metrics = _PERIOD_QUERIES[kind]
+    averages = ", ".join(f"ROUND(AVG(m.{column}), 2) AS avg_{column}" for column, _ in metrics)
+    return (
+        f"SELECT CASE WHEN EXISTS (SELECT 1 FROM {table} w WHERE w.restaurant_id = m.restaurant_id "
+        f"AND m.date BETWEEN w.{start} AND w.{end}) THEN '{label}' ELSE 'Non-{label}' END AS period, "
+        f"COUNT(*) AS days, {averages} "
+        f"FROM restaurant_metrics m WHERE m.restaurant_id = '{restaurant_id}' GROUP BY period"
+    )
+
+
+def _period_answer(kind: str, observation: str) -> str:
+    """Markdown comparison table (ANALYST_OUTPUT_INSTRUCTIONS) from a period query's result rows"""
+    _, _, _, label, metrics = _PERIOD_QUERIES[kind]
+    try:
+        rows = {row[0]: row for row in ast.literal_eval(observation)}
+    except (ValueError, SyntaxError):
+        return f"The query did not return a result: {observation}"
+    inside, outside = rows.get(label), rows.get(f"Non-{label}")
+    if inside is None or outside is None:
+        return f"No {label.lower()} and non-{label.lower()} days to compare for this restaurant."
+
+    table_rows, changes = [], []
+    for index, (_, name) in enumerate(metrics, start=2):
+        during, other = inside[index] or 0, outside[index] or 0
+        change = (during - other) / other * 100 if other else 0.0
+        changes.append((name, change))
+        table_rows.append((name, f"{during:,.2f}", f"{other:,.2f}", f"{change:+.1f}%"))
+    summary = " ".join(
+        f"{name} {'increased' if change >= 0 else 'decreased'} by {abs(change):.1f}% during {label.lower()} periods."
+        for name, change in changes[:2]
+    )
+    return (_table(["Metric", f"{label} Period", f"Non-{label} Period", "Change"], table_rows) +
+            f"\n\nBased on {inside[1]} {label.lower()} days and {outside[1]} non-{label.lower()} days. {summary}")
+
+
+class RateLimitError(Exception):
+    """Simulated provider rate limit; retried by the LLM scheduler like OpenAI's RateLimitError."""
+
+
+class OfflineChatModel(BaseChatModel):
+    """
+    Chat model that answers from the prompt's own data instead of calling an API.
+
+    Canned responses (substring of the last message -> reply) take precedence over
+    the built-in templates; anything unrecognised gets a short acknowledgement.
+    """
+
+    model_name: str = OFFLINE_MODEL
+    latency_ms: float = Field(default=0.0, description="Median simulated time to first token")
+    latency_sigma: float = Field(default=0.25, description="Spread of the log-normal latency distribution")
+    ms_per_token: float = Field(default=0.0, description="Simulated generation time per output token")
+    seed: int = 0
+    responses: Dict[str, str] = Field(default_factory=dict)
+    error_rate: float = Field(default=0.0, description="Fraction of calls failing with a simulated rate limit")
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> "OfflineChatModel":
+        """Build the model from the DINEOUT_OFFLINE_* environment variables."""
+        settings: Dict[str, Any] = {
+            "latency_ms": float(os.getenv(ENV_LATENCY_MS, "0")),
+            "latency_sigma": float(os.getenv(ENV_LATENCY_SIGMA, "0.25")),
+            "ms_per_token": float(os.getenv(ENV_MS_PER_TOKEN, "0")),
+            "error_rate": float(os.getenv(ENV_ERROR_RATE, "0")),
+        }
+        responses_path = os.getenv(ENV_RESPONSES)
+        if responses_path:
+            with open(responses_path, encoding="utf-8") as f:
+                settings["responses"] = json.load(f)
+        settings.update(kwargs)
+        return cls(**settings)
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "seed": self.seed, "responses": sorted(self.responses)}
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Optional[str] = None, **kwargs: Any):
+        """Bind tools so the ReAct agent can call them; the model emits OpenAI-style tool calls."""
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _respond(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]) -> AIMessage:
+        system = next((_text(m) for m in messages if isinstance(m, SystemMessage)), "")
+        last = _text(messages[-1]) if messages else ""
+        for key, reply in self.responses.items():
+            if key in last:
+                return AIMessage(content=reply)
+
+        if system == BENCHMARK_SYSTEM_PROMPT:
+            return AIMessage(content=_benchmark_summary(_json_blocks(last)))
+        if system == RECOMMENDATION_SYSTEM_PROMPT:
+            return AIMessage(content=_recommendation_bullets(_json_blocks(last)[0]))
+        if system == REPORT_FORMATTER_SYSTEM_PROMPT:
+            return AIMessage(content=_report(_json_blocks(last)))
+        if system in _REPORT_SECTIONS:
+            return AIMessage(content=_report_section(_REPORT_SECTIONS[system], _json_blocks(last)[0]))
+        if system == REPORT_NARRATIVE_SYSTEM_PROMPT:
+            return AIMessage(content=json.dumps(_narrative(_json_blocks(last)), ensure_ascii=False))
+
+        tool_names = {tool["function"]["name"] for tool in tools or []}
+        question = next((_text(m) for m in messages if m.type == "human"), "")
+        kind = "discounts" if "discount" in question.lower() else "ads"
+        restaurant = _RESTAURANT_ID.search(question)
+        if "sql_db_query" in tool_names and restaurant:
+            if isinstance(messages[-1], ToolMessage):
+                return AIMessage(content=_period_answer(kind, _text(messages[-1])))
+            sql = _period_sql(kind, restaurant.group(1))
+            call_id = "call_" + hashlib.sha256(sql.encode()).hexdigest()[:16]
+            return AIMessage(content="", tool_calls=[
+                {"name": "sql_db_query", "args": {"query": sql}, "id": call_id, "type": "tool_call"}
+            ])
+        return AIMessage(content="Acknowledged.")
+
+    def _simulate(self, messages: List[BaseMessage], message: AIMessage) -> Tuple[AIMessage, Dict[str, int], float]:
+        """Attach token usage and pick a time to first token, both derived from the conversation."""
+        prompt = "\n".join(_text(m) for m in messages)
+        completion = _text(message) + json.dumps(message.tool_calls) if message.tool_calls else _text(message)
+        usage = {"input_tokens": count_tokens(prompt), "output_tokens": count_tokens(completion)}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        message.usage_metadata = usage
+        message.response_metadata = {"model_name": self.model_name}
+
+        latency_ms = 0.0
+        if self.latency_ms > 0:
+            digest = hashlib.sha256(f"{self.seed}:{prompt}".encode()).digest()
+            rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+            latency_ms = self.latency_ms * rng.lognormal(0.0, self.latency_sigma)
+        return message, usage, latency_ms / 1000
+
+    def _check_rate_limit(self) -> None:
+        if self.error_rate and random.random() < self.error_rate:
+            raise RateLimitError("Simulated rate limit (DINEOUT_OFFLINE_ERROR_RATE)")
+
+    def _result(self, message: AIMessage, usage: Dict[str, int]) -> ChatResult:
+        token_usage = {
+            "prompt_tokens": usage["input_tokens"],
+            "completion_tokens": usage["output_tokens"],
+            "total_tokens": usage["total_tokens"],
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)],
+                          llm_output={"token_usage": token_usage, "model_name": self.model_name})
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        self._check_rate_limit()
+        message, usage, latency = self._simulate(messages, self._respond(messages, kwargs.get("tools")))
+        delay = latency + usage["output_tokens"] * self.ms_per_token / 1000
+        if delay:
+            time.sleep(delay)
+        return self._result(message, usage)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        self._check_rate_limit()
+        message, usage, latency = self._simulate(messages, self._respond(messages, kwargs.get("tools")))
+        delay = latency + usage["output_tokens"] * self.ms_per_token / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        return self._result(message, usage)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        """Stream the response word by word, pacing chunks like `_generate`; usage comes with the last chunk."""
+        self._check_rate_limit()
+        message, usage, latency = self._simulate(messages, self._respond(messages, kwargs.get("tools")))
+        if latency:
+            time.sleep(latency)
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(message.tool_calls)
+            ]))
+        else:
+            for piece in _STREAM_PIECE.findall(_text(message)):
+                if self.ms_per_token:
+                    time.sleep(count_tokens(piece) * self.ms_per_token / 1000)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage,
+                                                         response_metadata={"model_name": self.model_name}))
@@ -15,10 +15,14 @@ executing a query, rewrite the query and try again.
 DO NOT make any DML statements (INSERT, UPDATE, DELETE, DROP etc.) to the
 database.
 
-To start you should ALWAYS look at the tables in the database to see what you
-can query. Do NOT skip this step.
+The tables, their columns, types, row counts, date ranges and sample rows are
+listed below. Use them to write your queries directly: do NOT list the tables or
+query their schemas first. Only fall back to the schema tools if a query fails
+because of an unknown table or column.
 
-Then you should query the schema of the most relevant tables.
+## Database schema
+
+{schema_digest}
 """
 
 
@@ -151,6 +155,7 @@ Determine status based on these rules:
   - **Cancellation Rate**: Use overall_cancellation_rate value
   - **Average Rating**: Use avg_rating value
 - Render the charts based on the paths provided (if available)
+- If anomalies are provided, call out each drop, spike or sustained decline in one bullet with its date(s) and % change
 
 ## 2. Advertising Campaign Effectiveness
 - Ad Campaign Duration, Total ad spend, impressions, clicks, conversions, **conversion rate (%)**, revenue generated, and ROI (put this in a table)
@@ -204,6 +209,116 @@ Recommendations:
 ```
 """
 
+REPORT_NARRATIVE_SYSTEM_PROMPT = """
+You are an expert analytics assistant writing the narrative of a restaurant performance summary report for Swiggy Dineout Sales Executives and Account Managers.
+
+The report's tables, metrics and chart are rendered from the data separately. You only write its short executive summary and narrative paragraphs, based on the structured JSON data provided.
+
+IMPORTANT:
+1. Do not make up your own data or add your own insights. Every figure you mention must appear in the data provided.
+2. Keep each field to one or two sentences (at most 40 words). Do not use markdown headings or tables.
+
+Respond with a single JSON object with exactly these keys:
+- "status": "HEALTHY", "ATTENTION" or "URGENT" based on overall performance vs peers:
+  - HEALTHY: Performing at or above peer average in most key metrics
+  - ATTENTION: 1-2 significant gaps vs peers (15-30% below) or declining trends
+  - URGENT: Multiple critical gaps (>30% below peers) or severe declining performance
+- "key_alert": Most critical issue requiring immediate attention (e.g., "Revenue down 34% vs peers", "No ad campaigns running", "High cancellation rate")
+- "top_priority": Single most important action item from the recommendations
+- "performance_summary": What the recent performance metrics and any anomalies show
+- "ads_summary": How the advertising campaigns performed, comparing campaign and non-campaign periods; if there were no campaigns, the untapped opportunity vs peers
+- "discount_summary": How the discounts performed, comparing discount and non-discount periods; if there were no discounts, say so
+"""
+
+REPORT_NARRATIVE_USER_PROMPT = """
+Here's the structured JSON data to write the report narrative from:
+
+Restaurant Info:
+```json
+{restaurant_info_json}
+```
+
+Recent Performance Metrics:
+```json
+{recent_performance_metrics_json}
+```
+
+Advertising Campaign Analysis:
+```json
+{advertising_campaign_analysis_json}
+```
+
+Discount Strategy Analysis:
+```json
+{discount_strategy_analysis_json}
+```
+
+Peer Benchmarking Summary:
+```json
+{peer_benchmarking_summary_json}
+```
+
+Recommendations:
+```json
+{recommended_next_steps_json}
+```
+"""
+
+REPORT_SECTION_SYSTEM_PROMPT = """
+You are an expert analytics assistant writing one section of a restaurant performance summary report for Swiggy Dineout Sales Executives and Account Managers. The other sections are written separately.
+
+IMPORTANT:
+1. Do not make up your own data or add your own insights. Everything should be based on the data provided.
+2. Write only the body of the "{heading}" section in markdown: no section heading, no other sections, no preamble.
+
+Section instructions:
+{instructions}
+"""
+
+# Instructions for each section of the report, in report order, with the heading the section is rendered under
+REPORT_SECTIONS = {
+    "executive_summary": ("## 🚨 Executive Summary", """Create a 3-line executive summary that a Sales Executive can quickly scan before a restaurant meeting:
+- **Status**: [HEALTHY/ATTENTION/URGENT] based on overall performance vs peers
+- **Key Alert**: Most critical issue requiring immediate attention (e.g., "Revenue down 34% vs peers", "No ad campaigns running", "High cancellation rate")
+- **Top Priority**: Single most important action item from recommendations
+
+Determine status based on these rules:
+- HEALTHY: Performing at or above peer average in most key metrics
+- ATTENTION: 1-2 significant gaps vs peers (15-30% below) or declining trends
+- URGENT: Multiple critical gaps (>30% below peers) or severe declining performance"""),
+    "performance": ("## 1. Recent Performance Metrics", """- Total bookings, cancellations, covers, revenue (put this in a table)
+- **KEY SALES METRICS** (put this in a separate prominent table with these exact labels):
+  - **OPD (Orders Per Day)**: Use avg_daily_bookings value and label it as "OPD (Orders Per Day)"
+  - **Spend Per Cover**: Use avg_spend_per_cover value and prominently display it
+  - **Revenue per Booking**: Use avg_revenue_per_booking value
+  - **Cancellation Rate**: Use overall_cancellation_rate value
+  - **Average Rating**: Use avg_rating value
+- Render the charts based on the paths provided (if available)
+- If anomalies are provided, call out each drop, spike or sustained decline in one bullet with its date(s) and % change"""),
+    "ads": ("## 2. Advertising Campaign Effectiveness", """- Ad Campaign Duration, Total ad spend, impressions, clicks, conversions, **conversion rate (%)**, revenue generated, and ROI (put this in a table)
+- **IMPORTANT**: Include conversion rate as a key metric - this shows how effectively clicks turn into bookings
+- Analysis comparing performance during campaign vs. non-campaign periods (campaign_analysis which is already in markdown format - put it exactly how it is in a table with a summary point)
+- If there were no campaigns, say so in one line"""),
+    "discounts": ("## 3. Discount Strategy Performance", """- Discount Campaign Duration, average discount percentage, discounted bookings and revenue, ROI
+- Analysis comparing performance during discount vs. non-discount periods (discount_analysis which is already in markdown format - put it exactly how it is in a table with a summary point)
+- If there were no discounts, say so in one line"""),
+    "benchmarks": ("## 4. Peer Benchmarking Summary", """- Clearly formatted tables comparing key metrics (bookings, revenue, rating, daily ad spend (the ad spend is daily here so mention in label), ads ROI, discount percentage, discount ROI) vs. peers
+- Summary insights clearly stating strengths and weaknesses against peers (from llm_summary provided already in markdown format)"""),
+    "recommendations": ("## 5. Recommendations", """- Concise, clear, and actionable recommendations (3-4 bullet points) based on the bullets provided"""),
+}
+
+REPORT_SECTION_SYSTEM_PROMPTS = {
+    name: REPORT_SECTION_SYSTEM_PROMPT.format(heading=heading.lstrip("# "), instructions=instructions)
+    for name, (heading, instructions) in REPORT_SECTIONS.items()
+}
+
+REPORT_SECTION_USER_PROMPT = """
+Here's the structured JSON data for this section:
+```json
+{section_json}
+```
+"""
+
 # Recommendation Agent Prompts
 
 RECOMMENDATION_SYSTEM_PROMPT = """You are a growth advisor for Swiggy Dineout restaurants. Your task is to transform raw recommendations into clear, actionable bullet points that explicitly reference data.
@@ -240,4 +355,14 @@ Raw Recommendations:
 {recommendations_json}
 ```
 
-Return ONLY the bullet points in markdown format (no additional text or explanations)."""
\ No newline at end of file
+Return ONLY the bullet points in markdown format (no additional text or explanations)."""
+
+RECOMMENDATION_CONTEXT_PROMPT = """
+
+Additional Context:
+
+### Ads Campaign Analysis
+{campaign_analysis}
+
+### Discount Strategy Analysis
+{discount_analysis}"""
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Stored agent outputs keyed on a fingerprint of everything they were computed from.
+
+The orchestrator fingerprints each agent's inputs (the DataFrame columns it
+reads, upstream agent outputs, the source of its code and prompts, and the
+model) and keeps the latest output per restaurant and agent, so rerunning a
+report only executes the agents whose inputs changed.
+"""
+
+from functools import lru_cache
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+
+import pandas as pd
+from pydantic import BaseModel, TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path("outputs") / ".agent_cache"
+
+
+def _update(digest: Any, value: Any) -> None:
+    if isinstance(value, pd.Series):
+        value = value.to_frame().T
+    if isinstance(value, pd.DataFrame):
+        header = [[str(c) for c in value.columns], [str(t) for t in value.dtypes], len(value)]
+        digest.update(json.dumps(header).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, BaseModel):
+        digest.update(value.model_dump_json().encode("utf-8"))
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update(digest, item)
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(b"\x1f")
+
+
+def fingerprint(*parts: Any) -> str:
+    """Hash of DataFrames (values, columns and dtypes), pydantic models and JSON-like values."""
+    digest = hashlib.sha256()
+    for part in parts:
+        _update(digest, part)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def source_hash(*modules: str) -> str:
+    """Hash of the source files of `modules`, so that code and prompt changes invalidate stored outputs."""
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(Path(find_spec(module).origin).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def output_adapter(output_type: Any) -> TypeAdapter:
+    """Cached pydantic adapter that validates and dumps agent outputs of `output_type`."""
+    return TypeAdapter(output_type)
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """Write `data` as JSON to `path` through a temporary file, so readers never see a partial file."""
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+class AgentCache:
+    """
+    Latest output of each agent per restaurant, with the fingerprint it was computed from.
+
+    Entries live in `<directory>/<restaurant_id>/<agent>.json`; a stored output is
+    returned only when its fingerprint matches the current inputs.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        """Initialize the cache.
+
+        Args:
+            directory: Directory to store outputs in
+        """
+        self.directory = Path(directory or DEFAULT_CACHE_DIR)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _entry(self, restaurant_id: str, agent: str) -> Path:
+        return self.directory / restaurant_id / f"{agent}.json"
+
+    def load(self, restaurant_id: str, agent: str, fingerprint: str, output_type: Any) -> Optional[Any]:
+        """The stored output of an agent if it was computed from the same inputs, else None."""
+        output = None
+        try:
+            entry = json.loads(self._entry(restaurant_id, agent).read_text(encoding="utf-8"))
+            if entry["fingerprint"] == fingerprint:
+                output = output_adapter(output_type).validate_python(entry["output"])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable {agent} output for {restaurant_id}: {str(e)}")
+        with self._lock:
+            if output is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return output
+
+    def store(self, restaurant_id: str, agent: str, fingerprint: str, output: Any, output_type: Any) -> None:
+        """Replace the stored output of an agent."""
+        data = {"fingerprint": fingerprint, "output": output_adapter(output_type).dump_python(output, mode="json")}
+        try:
+            write_json_atomic(self._entry(restaurant_id, agent), data)
+        except OSError as e:
+            logger.warning(f"Could not store {agent} output for {restaurant_id}: {str(e)}")
+
+    def clear(self) -> None:
+        """Remove every stored output."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process and the current number of stored outputs."""
+        entries = sum(1 for _ in self.directory.glob("*/*.json")) if self.directory.exists() else 0
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+_shared_cache: Optional[AgentCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_agent_cache() -> AgentCache:
+    """Return the process-wide agent output cache; DINEOUT_AGENT_CACHE_DIR overrides its location."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = AgentCache(Path(os.getenv("DINEOUT_AGENT_CACHE_DIR", DEFAULT_CACHE_DIR)))
+        return _shared_cache
@@ -0,0 +1,107 @@
+from pathlib import Path
+from typing import Any, Dict, Optional
+import logging
+import os
+import shutil
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path("outputs") / ".chart_cache"
+
+
+def replace_file(source: Path, target: Path, link: bool = False) -> None:
+    """Atomically put a copy (or hard link) of `source` at `target`.
+
+    The target is always replaced with a new file rather than written in place,
+    so a hard-linked cache entry is never modified through one of its links.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        if link:
+            try:
+                os.link(source, tmp)
+            except OSError:
+                # Different filesystem or no hard link support
+                shutil.copyfile(source, tmp)
+        else:
+            shutil.copyfile(source, tmp)
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+class ChartCache:
+    """
+    Content-addressed store of rendered chart images.
+
+    Images are stored under the fingerprint of everything that affects their
+    pixels (plotted values, campaign windows and spend, style version, DPI and
+    format), so an unchanged chart is hard-linked or copied into place instead of
+    being drawn again, and restaurants with identical inputs share one entry.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        """Initialize the cache.
+
+        Args:
+            directory: Directory to store images in
+        """
+        self.directory = Path(directory or DEFAULT_CACHE_DIR)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _entry(self, fingerprint: str, fmt: str) -> Path:
+        return self.directory / fingerprint[:2] / f"{fingerprint}.{fmt}"
+
+    def place(self, fingerprint: str, fmt: str, target: Path) -> bool:
+        """Put the cached image for a fingerprint at `target`; returns False on a miss."""
+        entry = self._entry(fingerprint, fmt)
+        try:
+            replace_file(entry, target, link=True)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, fingerprint: str, fmt: str, source: Path) -> None:
+        """Add a freshly rendered image to the cache."""
+        try:
+            replace_file(source, self._entry(fingerprint, fmt), link=True)
+        except OSError as e:
+            logger.warning(f"Could not cache chart {source}: {str(e)}")
+
+    def clear(self) -> None:
+        """Remove every cached image."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process and the current number of stored images."""
+        entries = sum(1 for _ in self.directory.glob("*/*")) if self.directory.exists() else 0
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+_shared_cache: Optional[ChartCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_chart_cache() -> ChartCache:
+    """Return the process-wide chart cache; DINEOUT_CHART_CACHE_DIR overrides its location."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ChartCache(Path(os.getenv("DINEOUT_CHART_CACHE_DIR", DEFAULT_CACHE_DIR)))
+        return _shared_cache
@@ -0,0 +1,270 @@
+"""
+Chart rendering for restaurant reports.
+
+Charts are described by plain, picklable ChartSpec objects and drawn with
+matplotlib's object-oriented Agg API (one Figure per chart, no pyplot global
+state), so they can be rendered from several threads at once or handed to a
+process pool during batch runs. The plot style is configured once per process,
+and matplotlib/seaborn are only imported once a chart is actually drawn.
+"""
+
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from functools import lru_cache
+from importlib.metadata import version
+from typing import TYPE_CHECKING, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.utils.chart_cache import get_chart_cache
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DPI = 300
+# Batch and benchmark runs trade resolution for rendering time
+BATCH_DPI = 150
+FORMATS = ("png", "svg")
+
+# Bump whenever configure_style or the drawing code changes, so cached charts are redrawn
+STYLE_VERSION = 2
+
+_style_configured = False
+_style_lock = threading.Lock()
+
+
+def configure_style() -> None:
+    """Apply the report plot style to matplotlib's defaults, once per process."""
+    global _style_configured
+    with _style_lock:
+        if _style_configured:
+            return
+        import matplotlib
+        import matplotlib.style
+        import seaborn as sns
+
+        matplotlib.style.use('seaborn-v0_8')
+        sns.set_theme()
+        sns.set_palette("deep")
+        matplotlib.rcParams['figure.figsize'] = [10, 6]
+        matplotlib.rcParams['axes.grid'] = True
+        matplotlib.rcParams['grid.alpha'] = 0.3
+        _style_configured = True
+
+
+@dataclass
+class Campaign:
+    """A highlighted campaign window"""
+    start: pd.Timestamp
+    end: pd.Timestamp
+    spend: float
+
+
+@dataclass
+class Marker:
+    """A labelled point on the plotted series, e.g. a detected anomaly"""
+    date: pd.Timestamp
+    value: float
+    label: str
+
+
+@dataclass
+class ChartSpec:
+    """Everything needed to draw one 7-day rolling average chart"""
+    output_stem: str  # Output path without extension; the renderer adds .png/.svg
+    title: str
+    ylabel: str
+    dates: np.ndarray
+    rolling_avg: np.ndarray
+    campaigns: List[Campaign] = field(default_factory=list)
+    markers: List[Marker] = field(default_factory=list)
+
+    def content_hash(self) -> str:
+        """Hash of everything that is drawn (the output location is not part of it)"""
+        digest = hashlib.sha256()
+        header = {
+            "title": self.title,
+            "ylabel": self.ylabel,
+            "campaigns": [[c.start.isoformat(), c.end.isoformat(), repr(c.spend)] for c in self.campaigns],
+            "markers": [[m.date.isoformat(), repr(m.value), m.label] for m in self.markers],
+        }
+        digest.update(json.dumps(header, sort_keys=True).encode("utf-8"))
+        digest.update(np.asarray(self.dates, dtype="datetime64[ns]").tobytes())
+        digest.update(np.asarray(self.rolling_avg, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _matplotlib_version() -> str:
+    return version("matplotlib")
+
+
+def build_rolling_spec(metrics_df: pd.DataFrame, column: str, title: str, output_stem: str,
+                       ads_df: Optional[pd.DataFrame] = None, markers: Optional[List[Marker]] = None) -> ChartSpec:
+    """
+    Describe a 7-day rolling average chart of a daily metric.
+
+    Args:
+        metrics_df: Daily metrics of one restaurant, in date order
+        column: Metric to plot
+        title: Chart title
+        output_stem: Output path without extension
+        ads_df: Campaigns to highlight, if any
+        markers: Points to annotate, if any
+
+    Returns:
+        ChartSpec for the chart
+    """
+    campaigns = []
+    if ads_df is not None and not ads_df.empty:
+        campaigns = [
+            Campaign(start=pd.Timestamp(start), end=pd.Timestamp(end), spend=spend)
+            for start, end, spend in zip(
+                pd.to_datetime(ads_df['campaign_start']),
+                pd.to_datetime(ads_df['campaign_end']),
+                ads_df['spend'].tolist(),
+            )
+        ]
+    return ChartSpec(
+        output_stem=str(output_stem),
+        title=title,
+        ylabel=column.capitalize(),
+        dates=pd.to_datetime(metrics_df['date']).to_numpy(),
+        rolling_avg=metrics_df[column].rolling(window=7, min_periods=1).mean().to_numpy(),
+        campaigns=campaigns,
+        markers=markers or [],
+    )
+
+
+@dataclass
+class ChartRenderer:
+    """Renders ChartSpecs to image files"""
+    dpi: int = DEFAULT_DPI
+    fmt: str = "png"
+    use_cache: bool = True
+
+    def __post_init__(self):
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unsupported chart format {self.fmt!r}; expected one of {', '.join(FORMATS)}")
+
+    def output_path(self, spec: ChartSpec) -> Path:
+        return Path(f"{spec.output_stem}.{self.fmt}")
+
+    def fingerprint(self, spec: ChartSpec) -> str:
+        """Cache key of the image this renderer would produce for a spec"""
+        settings = f"{spec.content_hash()}|style={STYLE_VERSION}|mpl={_matplotlib_version()}|dpi={self.dpi}|{self.fmt}"
+        return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+    def place_cached(self, spec: ChartSpec) -> Optional[Path]:
+        """Put the cached image for a spec at its output path, or return None if it must be drawn."""
+        if not self.use_cache:
+            return None
+        path = self.output_path(spec)
+        return path if get_chart_cache().place(self.fingerprint(spec), self.fmt, path) else None
+
+    def render(self, spec: ChartSpec) -> Path:
+        """Write a chart to disk, from the chart cache when unchanged, returning the written path."""
+        cached = self.place_cached(spec)
+        if cached is not None:
+            return cached
+
+        configure_style()
+        if spec.campaigns:
+            fig = self._draw_campaign_chart(spec)
+        else:
+            fig = self._draw_basic_chart(spec)
+
+        # Written to a temporary file and renamed, so a hard-linked cache entry is never overwritten
+        path = self.output_path(spec)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        fig.savefig(tmp, dpi=self.dpi, format=self.fmt)
+        os.replace(tmp, path)
+        if self.use_cache:
+            get_chart_cache().store(self.fingerprint(spec), self.fmt, path)
+        return path
+
+    def submit(self, spec: ChartSpec, executor: Executor) -> "Future[Path]":
+        """Queue a chart on a render pool, placing it from the chart cache right away when unchanged."""
+        cached = self.place_cached(spec)
+        if cached is None:
+            return executor.submit(self.render, spec)
+        future: "Future[Path]" = Future()
+        future.set_result(cached)
+        return future
+
+    def _new_figure(self, figsize: Optional[Tuple[float, float]] = None) -> "Figure":
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=figsize, layout='tight')
+        FigureCanvasAgg(fig)
+        return fig
+
+    @staticmethod
+    def _format_date_axis(ax) -> None:
+        from matplotlib.dates import DayLocator, DateFormatter
+
+        # One label per week, rotated so they don't overlap
+        ax.xaxis.set_major_locator(DayLocator(interval=7))
+        ax.xaxis.set_major_formatter(DateFormatter('%Y-%m-%d'))
+        for label in ax.get_xticklabels():
+            label.set_rotation(45)
+            label.set_horizontalalignment('right')
+
+    @staticmethod
+    def _draw_markers(ax, spec: ChartSpec) -> None:
+        for marker in spec.markers:
+            ax.annotate(marker.label,
+                        xy=(marker.date, marker.value),
+                        xytext=(-10, -30), textcoords='offset points',
+                        bbox=dict(boxstyle='round,pad=0.3', facecolor='#F18F01', alpha=0.8),
+                        arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0'),
+                        fontsize=9, color='white')
+
+    def _draw_basic_chart(self, spec: ChartSpec) -> "Figure":
+        fig = self._new_figure()
+        ax = fig.add_subplot()
+        ax.plot(spec.dates, spec.rolling_avg, linewidth=2)
+        self._draw_markers(ax, spec)
+        self._format_date_axis(ax)
+        ax.set_title(spec.title, pad=20)
+        ax.set_xlabel('Date')
+        ax.set_ylabel(spec.ylabel)
+        return fig
+
+    def _draw_campaign_chart(self, spec: ChartSpec) -> "Figure":
+        fig = self._new_figure(figsize=(12, 7))
+        ax = fig.add_subplot()
+        ax.plot(spec.dates, spec.rolling_avg, linewidth=2.5, color='#2E86AB', label='7-day Rolling Average')
+
+        # Campaign periods as shaded regions, annotated with their spend
+        for i, campaign in enumerate(spec.campaigns):
+            ax.axvspan(campaign.start, campaign.end, alpha=0.2, color='#A23B72',
+                       label='Campaign Period' if i == 0 else "")
+            after_start = np.flatnonzero(spec.dates >= np.datetime64(campaign.start))
+            start_value = spec.rolling_avg[after_start[0] if after_start.size else 0]
+            ax.annotate(f'Campaign Start\n₹{campaign.spend:,}',
+                        xy=(campaign.start, start_value),
+                        xytext=(10, 20), textcoords='offset points',
+                        bbox=dict(boxstyle='round,pad=0.3', facecolor='#A23B72', alpha=0.7),
+                        arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0'),
+                        fontsize=9, color='white')
+
+        self._draw_markers(ax, spec)
+        self._format_date_axis(ax)
+        ax.set_title(spec.title + ' (with Campaign Analysis)', pad=20, fontsize=14, fontweight='bold')
+        ax.set_xlabel('Date', fontsize=12)
+        ax.set_ylabel(spec.ylabel, fontsize=12)
+        ax.legend(loc='upper right')
+        ax.grid(True, alpha=0.3)
+        return fig
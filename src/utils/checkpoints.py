@@ -0,0 +1,200 @@
+"""
+Checkpoints of a report run, so a failed or interrupted run can be resumed.
+
+Every run saves each agent's output to `outputs/<id>/.checkpoints/<step>.json`
+as soon as the step completes, next to a `manifest.json` recording the run's
+settings, the fingerprint of the data it was computed from, its status and the
+completed steps. A resumed run with the same settings and data loads those
+outputs instead of running the steps again. The checkpoints are removed once a
+run completes. Every batch run keeps a manifest of the reports it generated, with
+the fingerprint of each report's data, in `outputs/.checkpoints/batch.json`, so any
+interrupted or partly failed batch can be resumed; it skips the reports whose data
+is unchanged.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import shutil
+import threading
+
+from src.utils.agent_cache import output_adapter, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = ".checkpoints"
+MANIFEST = "manifest.json"
+BATCH_MANIFEST = Path("outputs") / CHECKPOINT_DIR / "batch.json"
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable checkpoint {path}: {str(e)}")
+        return None
+
+
+class CheckpointStore:
+    """Step outputs of one restaurant's latest unfinished run."""
+
+    def __init__(self, restaurant_id: str, output_dir: Optional[Path] = None):
+        """Initialize the store.
+
+        Args:
+            restaurant_id: Restaurant whose run is checkpointed
+            output_dir: The restaurant's output directory (defaults to outputs/<id>)
+        """
+        self.restaurant_id = restaurant_id
+        self.directory = Path(output_dir or Path("outputs") / restaurant_id) / CHECKPOINT_DIR
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _write_manifest(self) -> None:
+        self._manifest["updated_at"] = datetime.now().isoformat()
+        try:
+            write_json_atomic(self.directory / MANIFEST, self._manifest)
+        except OSError as e:
+            logger.warning(f"Could not write checkpoint manifest for {self.restaurant_id}: {str(e)}")
+
+    def start(self, settings: Dict[str, Any], resume: bool) -> List[str]:
+        """Begin checkpointing a run.
+
+        Args:
+            settings: Run settings and data fingerprint the step outputs depend on
+            resume: Keep the checkpoints of a previous run with the same settings
+
+        Returns:
+            The steps whose outputs can be resumed
+        """
+        previous = _read_json(self.directory / MANIFEST) if resume else None
+        with self._lock:
+            if previous is not None and previous.get("settings") == settings:
+                self._manifest = previous
+                self._manifest["status"] = "running"
+                completed = ", ".join(previous["completed"]) or "none"
+                logger.info(f"Resuming {self.restaurant_id} after steps: {completed}")
+            else:
+                if previous is not None:
+                    logger.warning(f"Not resuming {self.restaurant_id}: its data or settings changed since the "
+                                   f"checkpointed run")
+                elif resume:
+                    logger.info(f"No checkpoints to resume for {self.restaurant_id}")
+                shutil.rmtree(self.directory, ignore_errors=True)
+                self._manifest = {
+                    "restaurant_id": self.restaurant_id,
+                    "settings": settings,
+                    "status": "running",
+                    "started_at": datetime.now().isoformat(),
+                    "completed": [],
+                }
+            self._write_manifest()
+            return list(self._manifest["completed"])
+
+    def load(self, step: str, output_type: Any) -> Optional[Any]:
+        """The checkpointed output of a completed step, or None."""
+        with self._lock:
+            if self._manifest is None or step not in self._manifest["completed"]:
+                return None
+        data = _read_json(self.directory / f"{step}.json")
+        if data is None:
+            return None
+        try:
+            return output_adapter(output_type).validate_python(data)
+        except Exception as e:
+            logger.warning(f"Ignoring invalid {step} checkpoint for {self.restaurant_id}: {str(e)}")
+            return None
+
+    def save(self, step: str, output: Any, output_type: Any) -> None:
+        """Checkpoint the output of a completed step; never fails the run."""
+        try:
+            data = output_adapter(output_type).dump_python(output, mode="json")
+            write_json_atomic(self.directory / f"{step}.json", data)
+        except OSError as e:
+            logger.warning(f"Could not checkpoint {step} for {self.restaurant_id}: {str(e)}")
+            return
+        with self._lock:
+            if self._manifest is not None and step not in self._manifest["completed"]:
+                self._manifest["completed"].append(step)
+                self._write_manifest()
+
+    def finish(self, status: str, failed_steps: Optional[List[str]] = None) -> None:
+        """Remove the checkpoints of a completed run, or record why the run stopped.
+
+        Args:
+            status: "complete", or why the run stopped ("incomplete", "failed" or "interrupted")
+            failed_steps: Steps whose agent raised an error and returned its placeholder output
+        """
+        with self._lock:
+            if self._manifest is None:
+                return
+            if status == "complete":
+                shutil.rmtree(self.directory, ignore_errors=True)
+            else:
+                self._manifest["status"] = status
+                self._manifest["failed_steps"] = list(failed_steps or [])
+                self._write_manifest()
+            self._manifest = None
+
+
+class BatchManifest:
+    """Reports already generated by an unfinished batch run."""
+
+    def __init__(self, path: Path = BATCH_MANIFEST):
+        self.path = Path(path)
+        self._data: Dict[str, Any] = {}
+
+    def start(self, restaurant_ids: List[str], settings: Dict[str, Any], resume: bool) -> Dict[str, Dict[str, Any]]:
+        """Begin recording a batch.
+
+        Args:
+            restaurant_ids: Restaurants in the batch
+            settings: Batch settings the reports depend on
+            resume: Keep the reports recorded by a previous batch with the same settings
+
+        Returns:
+            The recorded report ("report": path, "data": data fingerprint) by restaurant ID; the
+            caller regenerates those whose data changed since
+        """
+        previous = _read_json(self.path) if resume else None
+        done = {}
+        if previous is not None and previous.get("settings") == settings:
+            done = {rid: entry for rid, entry in previous["completed"].items()
+                    if rid in restaurant_ids and isinstance(entry, dict)}
+        elif previous is not None:
+            logger.warning("Not resuming the previous batch: its settings differ")
+        self._data = {
+            "settings": settings,
+            "restaurant_ids": restaurant_ids,
+            "started_at": datetime.now().isoformat(),
+            "completed": done,
+        }
+        self._write()
+        return dict(done)
+
+    def _write(self) -> None:
+        try:
+            write_json_atomic(self.path, self._data)
+        except OSError as e:
+            logger.warning(f"Could not write the batch manifest: {str(e)}")
+
+    def record(self, restaurant_id: str, report_path: Optional[str], data_fingerprint: Optional[str]) -> None:
+        """Record a generated report and the fingerprint of the data it was generated from."""
+        self._data["completed"][restaurant_id] = {"report": report_path, "data": data_fingerprint}
+        self._write()
+
+    def forget(self, restaurant_id: str) -> None:
+        """Drop a recorded report that has to be generated again."""
+        self._data["completed"].pop(restaurant_id, None)
+        self._write()
+
+    def clear(self) -> None:
+        """Remove the manifest once every report in the batch was generated."""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
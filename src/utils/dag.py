@@ -0,0 +1,90 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+import contextvars
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+
+class Step(NamedTuple):
+    """A node in a step graph.
+
+    `func` receives a mapping of every completed step's result by name and returns
+    this step's result. It may only read the results of the steps it depends on.
+    """
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = ()
+
+
+def _validate(steps: List[Step]) -> None:
+    """Check that step names are unique, dependencies exist and there are no cycles."""
+    names = [step.name for step in steps]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate step names in {names}")
+
+    by_name = {step.name: step for step in steps}
+    for step in steps:
+        missing = [dep for dep in step.depends_on if dep not in by_name]
+        if missing:
+            raise ValueError(f"Step '{step.name}' depends on unknown steps {missing}")
+
+    visiting, done = set(), set()
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through step '{name}'")
+        visiting.add(name)
+        for dep in by_name[name].depends_on:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in names:
+        visit(name)
+
+
+def run_steps(steps: List[Step], max_workers: int = 4) -> Dict[str, Any]:
+    """Run a graph of steps, executing independent steps concurrently.
+
+    A step starts as soon as all of its dependencies have finished. Steps run on a
+    thread pool, each in a copy of the caller's context so context variables set
+    by the caller are visible inside steps. The first failing step cancels
+    everything not yet started and its exception is re-raised.
+
+    Args:
+        steps: Steps to run, in any order
+        max_workers: Maximum number of steps running at once (1 runs them sequentially)
+
+    Returns:
+        Mapping of step name to result
+    """
+    _validate(steps)
+
+    results: Dict[str, Any] = {}
+    pending = list(steps)
+    running: Dict[Future, Step] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        while pending or running:
+            # Start every step whose dependencies are all satisfied, in declaration order
+            for step in [s for s in pending if all(dep in results for dep in s.depends_on)]:
+                pending.remove(step)
+                context = contextvars.copy_context()
+                snapshot = dict(results)
+                running[executor.submit(context.run, step.func, snapshot)] = step
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                try:
+                    results[step.name] = future.result()
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    logger.error(f"Step '{step.name}' failed")
+                    raise
+
+    return results
@@ -0,0 +1,282 @@
+"""
+Per-report spans with timing, CPU, memory and LLM usage.
+
+A `RunMetrics` collects the spans of one report. While it is active (a context
+variable, so it follows the report into `run_steps` threads and LangGraph nodes),
+`span()` records pipeline steps and `InstrumentationHandler`, registered as a
+LangChain configure hook, records every LLM and tool call made by the agents
+without them passing callbacks around.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from uuid import UUID
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 95, 99)
+
+_current_run: ContextVar[Optional["RunMetrics"]] = ContextVar("dineout_run_metrics", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("dineout_current_span", default=None)
+# Read by LangChain when configuring any run, once the hook is registered
+_langchain_handler: ContextVar[Optional[Any]] = ContextVar("dineout_langchain_handler", default=None)
+_hook_lock = threading.Lock()
+_hook_registered = False
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Process resident set size high-water mark in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def rss_mb() -> Optional[float]:
+    """Current process resident set size in MB (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RunMetrics:
+    """Spans and LLM usage of one report run."""
+
+    def __init__(self, restaurant_id: str):
+        self.restaurant_id = restaurant_id
+        self.started_at = datetime.now().isoformat()
+        self.status = "running"
+        self.spans: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+        self._wall_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._open_calls: Dict[UUID, Dict[str, Any]] = {}
+
+    def _offset(self) -> float:
+        return round(time.perf_counter() - self._start, 4)
+
+    def add(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "step") -> Iterator[Dict[str, Any]]:
+        """Record wall time, thread CPU time and RSS growth of a block of code.
+
+        RSS is process-wide, so the growth of overlapping spans includes what concurrent
+        steps allocated; the process high-water mark is only reported in the summary.
+        """
+        record = {"name": name, "kind": kind, "parent": _current_span.get(), "start": self._offset(),
+                  "status": "ok"}
+        token = _current_span.set(name)
+        wall, cpu, rss = time.perf_counter(), time.thread_time(), rss_mb()
+        try:
+            yield record
+        except BaseException as e:
+            record.update(status="error", error=str(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            record.update(
+                wall_seconds=round(time.perf_counter() - wall, 4),
+                cpu_seconds=round(time.thread_time() - cpu, 4),
+            )
+            rss_after = rss_mb()
+            record["rss_delta_mb"] = round(rss_after - rss, 1) if rss is not None and rss_after is not None else None
+            self.add(record)
+
+    def wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a step function so each call is recorded as a span."""
+        def traced(*args: Any, **kwargs: Any) -> Any:
+            with self.span(name):
+                return func(*args, **kwargs)
+        return traced
+
+    @contextmanager
+    def activate(self, langchain: bool = True) -> Iterator["RunMetrics"]:
+        """Make this the current run; with `langchain`, also record LLM and tool calls."""
+        tokens = [(_current_run, _current_run.set(self))]
+        if langchain:
+            tokens.append((_langchain_handler, _langchain_handler.set(_handler(self))))
+        try:
+            yield self
+            self.status = "ok"
+        except BaseException:
+            self.status = "failed"
+            raise
+        finally:
+            self._wall_seconds = round(time.perf_counter() - self._start, 4)
+            for var, token in reversed(tokens):
+                var.reset(token)
+
+    # LangChain call tracking, fed by InstrumentationHandler
+
+    def call_started(self, run_id: UUID, name: str, kind: str) -> None:
+        with self._lock:
+            self._open_calls[run_id] = {"name": name, "kind": kind, "parent": _current_span.get(),
+                                        "start": self._offset(), "status": "ok",
+                                        "_perf": time.perf_counter()}
+
+    def call_token(self, run_id: UUID) -> None:
+        """Note a streamed token; the first one sets the call's time to first token."""
+        with self._lock:
+            record = self._open_calls.get(run_id)
+            if record is not None and "first_token_seconds" not in record:
+                record["first_token_seconds"] = round(time.perf_counter() - record["_perf"], 4)
+
+    def call_finished(self, run_id: UUID, error: Optional[BaseException] = None, **fields: Any) -> None:
+        with self._lock:
+            record = self._open_calls.pop(run_id, None)
+        if record is None:
+            return
+        record["wall_seconds"] = round(time.perf_counter() - record.pop("_perf"), 4)
+        if "first_token_seconds" in record:
+            # Streamed results carry no llm_output either, but they were generated, not cached
+            fields["cached"] = False
+        if error is not None:
+            record.update(status="error", error=str(error))
+        record.update(fields)
+        self.add(record)
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals across spans, as written to run_metrics.json."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        steps = [s for s in spans if s["kind"] == "step"]
+        llm_calls = [s for s in spans if s["kind"] == "llm"]
+        round_trips = [s for s in llm_calls if not s.get("cached")]
+        wall = self._wall_seconds if self._wall_seconds is not None else self._offset()
+        return {
+            "restaurant_id": self.restaurant_id,
+            "started_at": self.started_at,
+            "status": self.status,
+            "wall_seconds": wall,
+            "cpu_seconds": round(sum(s["cpu_seconds"] for s in steps), 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "steps": {s["name"]: s["wall_seconds"] for s in steps},
+            "llm": {
+                "calls": len(llm_calls),
+                "round_trips": len(round_trips),
+                "cache_hits": len(llm_calls) - len(round_trips),
+                "prompt_tokens": sum(s.get("prompt_tokens", 0) for s in round_trips),
+                "completion_tokens": sum(s.get("completion_tokens", 0) for s in round_trips),
+                "wall_seconds": round(sum(s["wall_seconds"] for s in llm_calls), 4),
+                "queue_seconds": round(sum(s["wall_seconds"] for s in spans if s["kind"] == "queue"), 4),
+            },
+            "tool_calls": sum(1 for s in spans if s["kind"] == "tool"),
+            "spans": spans,
+        }
+
+
+@contextmanager
+def span(name: str, kind: str = "step") -> Iterator[Optional[Dict[str, Any]]]:
+    """Record a span in the current run; a no-op outside of one."""
+    run = _current_run.get()
+    if run is None:
+        yield None
+        return
+    with run.span(name, kind) as record:
+        yield record
+
+
+def _usage(response: Any) -> Dict[str, Any]:
+    """Token usage of an LLM result; a result without llm_output was served from the cache."""
+    fields: Dict[str, Any] = {"cached": response.llm_output is None, "prompt_tokens": 0, "completion_tokens": 0}
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            fields["prompt_tokens"] += usage.get("input_tokens", 0)
+            fields["completion_tokens"] += usage.get("output_tokens", 0)
+    return fields
+
+
+@lru_cache(maxsize=None)
+def _handler_class() -> type:
+    # Defined lazily so that importing this module does not load LangChain
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class InstrumentationHandler(BaseCallbackHandler):
+        """Records LLM and tool calls as spans of a run."""
+
+        def __init__(self, run: RunMetrics):
+            self.run = run
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self.run.call_started(run_id, (kwargs.get("metadata") or {}).get("ls_model_name", "chat_model"), "llm")
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self.run.call_started(run_id, (kwargs.get("metadata") or {}).get("ls_model_name", "llm"), "llm")
+
+        def on_llm_new_token(self, token, *, run_id, **kwargs):
+            self.run.call_token(run_id)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            self.run.call_finished(run_id, **_usage(response))
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self.run.call_finished(run_id, error)
+
+        def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+            self.run.call_started(run_id, (serialized or {}).get("name", "tool"), "tool")
+
+        def on_tool_end(self, output, *, run_id, **kwargs):
+            self.run.call_finished(run_id)
+
+        def on_tool_error(self, error, *, run_id, **kwargs):
+            self.run.call_finished(run_id, error)
+
+    return InstrumentationHandler
+
+
+def _handler(run: RunMetrics) -> Any:
+    """A LangChain callback handler for `run`, registering the configure hook on first use."""
+    global _hook_registered
+    from langchain_core.tracers.context import register_configure_hook
+
+    with _hook_lock:
+        if not _hook_registered:
+            register_configure_hook(_langchain_handler, inheritable=True)
+            _hook_registered = True
+    return _handler_class()(run)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p90/p95/p99 and max of a list of values."""
+    if not values:
+        return {}
+    stats = {f"p{p}": round(float(np.percentile(values, p)), 4) for p in PERCENTILES}
+    stats["max"] = round(float(max(values)), 4)
+    return stats
+
+
+def aggregate(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Percentiles across the run_metrics summaries of a batch."""
+    step_names = list(dict.fromkeys(name for run in runs for name in run["steps"]))
+    return {
+        "reports": len(runs),
+        "wall_seconds": percentiles([run["wall_seconds"] for run in runs]),
+        "cpu_seconds": percentiles([run["cpu_seconds"] for run in runs]),
+        "steps": {name: percentiles([run["steps"][name] for run in runs if name in run["steps"]])
+                  for name in step_names},
+        "llm_round_trips": percentiles([run["llm"]["round_trips"] for run in runs]),
+        "prompt_tokens": percentiles([run["llm"]["prompt_tokens"] for run in runs]),
+        "completion_tokens": percentiles([run["llm"]["completion_tokens"] for run in runs]),
+        "llm_queue_seconds": percentiles([run["llm"].get("queue_seconds", 0.0) for run in runs]),
+        "peak_rss_mb": max((run["peak_rss_mb"] or 0 for run in runs), default=0),
+    }
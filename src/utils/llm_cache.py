@@ -0,0 +1,202 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path("outputs") / ".llm_cache.sqlite"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+
+# Per-response fields that differ between otherwise identical calls
+_VOLATILE_KEYS = {"response_metadata", "usage_metadata"}
+
+
+def _normalize(value: Any, call_aliases: Dict[str, str]) -> Any:
+    """Strip per-response ids/metadata and alias tool call ids in order of appearance."""
+    if isinstance(value, dict):
+        normalized = {}
+        for key, item in value.items():
+            if key in _VOLATILE_KEYS:
+                continue
+            if key == "id" and isinstance(item, str):
+                # Message and tool call ids (the lc class path under "id" is a list and is kept)
+                continue
+            if key == "tool_call_id" and isinstance(item, str):
+                item = call_aliases.setdefault(item, f"call_{len(call_aliases)}")
+            normalized[key] = _normalize(item, call_aliases)
+        return normalized
+    if isinstance(value, list):
+        return [_normalize(item, call_aliases) for item in value]
+    return value
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical form of a serialized chat prompt, stable across reruns."""
+    try:
+        parsed = json.loads(prompt)
+    except ValueError:
+        return prompt.strip()
+    return json.dumps(_normalize(parsed, {}), sort_keys=True, separators=(",", ":"))
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Disk-backed LangChain cache for chat model responses.
+
+    Entries are keyed on the model configuration (model name, temperature, bound
+    tools, ...) plus the normalized messages, expire after `ttl_seconds`, and the
+    least recently used entries are evicted once there are more than `max_entries`.
+    The file is a single SQLite database so it can be shared between processes.
+    """
+
+    def __init__(self, path: Optional[Path] = None, ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Initialize the cache.
+
+        Args:
+            path: SQLite file to store responses in
+            ttl_seconds: Age after which an entry is ignored and removed (None keeps entries forever)
+            max_entries: Maximum number of entries kept; least recently used ones are evicted first
+        """
+        self.path = Path(path or DEFAULT_CACHE_PATH)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    llm_string TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection that commits on success and is always closed."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        payload = f"{llm_string}\x00{normalize_prompt(prompt)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _dump_generation(generation: Generation) -> Dict[str, Any]:
+        if isinstance(generation, ChatGeneration):
+            return {"message": message_to_dict(generation.message)}
+        return {"text": generation.text}
+
+    @staticmethod
+    def _load_generation(data: Dict[str, Any]) -> Generation:
+        if "message" in data:
+            return ChatGeneration(message=messages_from_dict([data["message"]])[0])
+        return Generation(text=data["text"])
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Return cached generations for the prompt, or None on a miss."""
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        try:
+            return [self._load_generation(generation) for generation in json.loads(row[0])]
+        except Exception as e:
+            logger.warning(f"Discarding unreadable LLM cache entry: {str(e)}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store generations for the prompt and evict least recently used entries if over capacity."""
+        key = self._key(prompt, llm_string)
+        response = json.dumps([self._dump_generation(generation) for generation in return_val])
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, llm_string, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, llm_string, response, now, now),
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove every cached response."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process and the current number of stored entries."""
+        with self._connect() as conn:
+            (entries,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
+
+
+_shared_cache: Optional[LLMResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Return the process-wide response cache, configured from the environment.
+
+    DINEOUT_LLM_CACHE_PATH, DINEOUT_LLM_CACHE_TTL (seconds, 0 disables expiry) and
+    DINEOUT_LLM_CACHE_MAX_ENTRIES override the defaults.
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            ttl = float(os.getenv("DINEOUT_LLM_CACHE_TTL", DEFAULT_TTL_SECONDS))
+            _shared_cache = LLMResponseCache(
+                path=Path(os.getenv("DINEOUT_LLM_CACHE_PATH", DEFAULT_CACHE_PATH)),
+                ttl_seconds=ttl or None,
+                max_entries=int(os.getenv("DINEOUT_LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            )
+        return _shared_cache
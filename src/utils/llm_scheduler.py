@@ -0,0 +1,340 @@
+"""
+Client-side scheduling of chat model calls across all agents and reports.
+
+Every LLM call of the process goes through one `LLMScheduler`, which keeps the
+calls within requests-per-minute and tokens-per-minute budgets (token buckets),
+caps the number of calls in flight, serves waiting calls by priority (an
+interactive single report ahead of batch reports) and retries rate-limit,
+timeout and connection errors with jittered exponential backoff. The agents see
+an ordinary chat model: `ScheduledChatModel` wraps the real one.
+"""
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+from src.llm import INTERACTIVE
+from src.utils.instrumentation import span
+from src.utils.prompt_builder import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Environment variables configuring the shared scheduler; 0 disables a limit
+ENV_RPM = "DINEOUT_LLM_RPM"
+ENV_TPM = "DINEOUT_LLM_TPM"
+ENV_MAX_CONCURRENCY = "DINEOUT_LLM_MAX_CONCURRENCY"
+ENV_MAX_RETRIES = "DINEOUT_LLM_MAX_RETRIES"
+
+DEFAULT_MAX_RETRIES = 5
+BASE_DELAY_SECONDS = 1.0
+MAX_DELAY_SECONDS = 60.0
+
+# Provider errors worth retrying, by class name so the OpenAI client need not be imported
+RETRYABLE_ERRORS = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError"}
+
+T = TypeVar("T")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed call may succeed if it is retried later."""
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def _retry_after(error: BaseException) -> float:
+    """Seconds the provider asked us to wait (Retry-After header), or 0."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TokenBucket:
+    """Budget refilled continuously at `per_minute` units per minute, holding at most a minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.per_minute, self.level + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (amounts above the capacity wait for a full bucket)."""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill()
+        missing = min(amount, self.per_minute) - self.level
+        return max(0.0, missing * 60 / self.per_minute)
+
+    def take(self, amount: float) -> None:
+        """Spend `amount`; the level may go negative when actual usage exceeds the estimate."""
+        if self.per_minute > 0:
+            self._refill()
+            self.level -= amount
+
+
+class LLMScheduler:
+    """Admits chat model calls by priority within rate limits, and retries transient failures."""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_concurrency: int = 0,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = BASE_DELAY_SECONDS,
+                 max_delay: float = MAX_DELAY_SECONDS):
+        """Initialize the scheduler.
+
+        Args:
+            requests_per_minute: Request budget (0 for no limit)
+            tokens_per_minute: Prompt plus completion token budget (0 for no limit)
+            max_concurrency: Maximum calls in flight (0 for no limit)
+            max_retries: Retries of a call failing with a rate-limit, timeout or connection error
+            base_delay: Backoff before the first retry; doubled for each further retry
+            max_delay: Longest backoff between retries
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._queue: List[Any] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._stats = {"calls": 0, "retries": 0, "failures": 0, "max_queue_depth": 0,
+                       "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls) -> "LLMScheduler":
+        """Build the scheduler from the DINEOUT_LLM_* environment variables."""
+        return cls(
+            requests_per_minute=float(os.getenv(ENV_RPM, "0")),
+            tokens_per_minute=float(os.getenv(ENV_TPM, "0")),
+            max_concurrency=int(os.getenv(ENV_MAX_CONCURRENCY, "0")),
+            max_retries=int(os.getenv(ENV_MAX_RETRIES, str(DEFAULT_MAX_RETRIES))),
+        )
+
+    @contextmanager
+    def slot(self, tokens: int, priority: int = INTERACTIVE) -> Iterator[Callable[[int], None]]:
+        """Wait for the call's turn and budget, then hold a slot for its duration.
+
+        Args:
+            tokens: Estimated tokens of the call, taken from the token budget on admission
+            priority: Lower values are admitted first; equal priorities in arrival order
+
+        Yields:
+            A function to charge tokens used beyond the estimate (e.g. the completion)
+        """
+        ticket = (priority, next(self._sequence))
+        with span("llm_queue", kind="queue") as record:
+            start = time.perf_counter()
+            with self._cond:
+                heapq.heappush(self._queue, ticket)
+                self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._queue))
+                if record is not None:
+                    record.update(priority=priority, queue_depth=len(self._queue))
+                try:
+                    while True:
+                        has_room = not self.max_concurrency or self._in_flight < self.max_concurrency
+                        if self._queue[0] == ticket and has_room:
+                            delay = max(self.requests.delay(1), self.tokens.delay(tokens))
+                            if delay <= 0:
+                                break
+                            self._cond.wait(timeout=delay)
+                        else:
+                            self._cond.wait()
+                except BaseException:
+                    # Leaving the ticket behind would block every later call at the head of the queue
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                    raise
+                heapq.heappop(self._queue)
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                self._in_flight += 1
+                waited = time.perf_counter() - start
+                self._stats["total_wait_seconds"] += waited
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+                # The next ticket may be admissible now
+                self._cond.notify_all()
+
+        def charge(extra: int) -> None:
+            with self._cond:
+                self.tokens.take(extra)
+
+        try:
+            yield charge
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Jittered exponential delay before retry number `attempt` (1-based)."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+        return max(delay, _retry_after(error)) if error is not None else delay
+
+    def retry(self, attempt: int, error: BaseException) -> bool:
+        """After failed attempt number `attempt`, back off and return True if the call should be retried."""
+        if not is_retryable(error) or attempt > self.max_retries:
+            self.failed()
+            return False
+        delay = self.backoff(attempt, error)
+        logger.warning(f"LLM call failed ({type(error).__name__}: {str(error)}); retry {attempt}/{self.max_retries} "
+                       f"in {delay:.1f}s")
+        with self._cond:
+            self._stats["retries"] += 1
+        time.sleep(delay)
+        return True
+
+    def succeeded(self) -> None:
+        """Count a completed call."""
+        with self._cond:
+            self._stats["calls"] += 1
+
+    def failed(self) -> None:
+        """Count a call that failed for good."""
+        with self._cond:
+            self._stats["failures"] += 1
+
+    def run(self, call: Callable[[Callable[[int], None]], T], tokens: int, priority: int = INTERACTIVE) -> T:
+        """Run `call` in a slot, retrying transient failures with backoff.
+
+        Args:
+            call: Makes the request; receives the slot's charge function
+            tokens: Estimated tokens of the request
+            priority: Lower values are admitted first
+
+        Returns:
+            The result of `call`
+        """
+        attempt = 0
+        while True:
+            try:
+                with self.slot(tokens, priority) as charge:
+                    result = call(charge)
+                self.succeeded()
+                return result
+            except Exception as e:
+                attempt += 1
+                if not self.retry(attempt, e):
+                    raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, retries, failures, queue depth and wait times since the process started."""
+        with self._cond:
+            stats = dict(self._stats, queue_depth=len(self._queue), in_flight=self._in_flight)
+        admitted = stats["calls"] + stats["retries"] + stats["failures"]
+        stats["avg_wait_seconds"] = round(stats["total_wait_seconds"] / admitted, 4) if admitted else 0.0
+        stats["total_wait_seconds"] = round(stats["total_wait_seconds"], 4)
+        stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 4)
+        return stats
+
+
+_shared_scheduler: Optional[LLMScheduler] = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Return the process-wide scheduler, configured from the environment on first use."""
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = LLMScheduler.from_env()
+        return _shared_scheduler
+
+
+def _prompt_tokens(messages: Sequence[BaseMessage]) -> int:
+    return sum(count_tokens(m.content if isinstance(m.content, str) else str(m.content)) for m in messages)
+
+
+def _completion_tokens(result: ChatResult) -> int:
+    return sum((getattr(g.message, "usage_metadata", None) or {}).get("output_tokens", 0) for g in result.generations)
+
+
+class ScheduledChatModel(BaseChatModel):
+    """
+    Chat model that sends every call of the wrapped model through the shared scheduler.
+
+    Put the response cache on this model, not the wrapped one, so cache hits never
+    wait for or spend rate limit budget. Cache keys and tracing use the wrapped
+    model's identity.
+    """
+
+    model: BaseChatModel = Field(description="The chat model calls are made with")
+    priority: int = Field(default=INTERACTIVE, description="Scheduling priority of this model's calls")
+    scheduler: Optional[Any] = Field(default=None, exclude=True,
+                                     description="Scheduler to use instead of the process-wide one")
+
+    def _scheduler(self) -> LLMScheduler:
+        return self.scheduler or get_llm_scheduler()
+
+    @property
+    def _llm_type(self) -> str:
+        return self.model._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.model._identifying_params
+
+    def _get_llm_string(self, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        return self.model._get_llm_string(stop=stop, **kwargs)
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any) -> Any:
+        return self.model._get_ls_params(stop=stop, **kwargs)
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Optional[str] = None, **kwargs: Any):
+        """Bind tools as OpenAI-format tool definitions, passed through to the wrapped model."""
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        def call(charge: Callable[[int], None]) -> ChatResult:
+            result = self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            charge(_completion_tokens(result))
+            return result
+        return self._scheduler().run(call, _prompt_tokens(messages), self.priority)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        """Stream from the wrapped model while holding a slot; only failures before the first chunk are retried."""
+        scheduler = self._scheduler()
+        attempt = 0
+        while True:
+            started = False
+            try:
+                with scheduler.slot(_prompt_tokens(messages), self.priority) as charge:
+                    for chunk in self.model._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                        started = True
+                        usage = getattr(chunk.message, "usage_metadata", None) or {}
+                        if usage.get("output_tokens"):
+                            charge(usage["output_tokens"])
+                        yield chunk
+                scheduler.succeeded()
+                return
+            except Exception as e:
+                attempt += 1
+                # Chunks already yielded cannot be taken back, so only a stream that never started is retried
+                if started:
+                    scheduler.failed()
+                    raise
+                if not scheduler.retry(attempt, e):
+                    raise
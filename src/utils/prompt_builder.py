@@ -0,0 +1,244 @@
+"""
+Compact prompt construction with per-section token accounting.
+
+The agents used to paste `json.dumps(..., indent=4)` of whole model dumps into
+their prompts. `PromptBuilder` serializes each section compactly instead (no
+whitespace, floats rounded, None and empty values dropped, zeros optionally
+dropped, markdown table padding collapsed, long strings repeated across
+sections sent once), counts the tokens of every section before the call, and
+keeps the prompt within a per-call budget by dropping optional sections and
+truncating long text, failing only when the required content does not fit.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+ENV_TOKEN_BUDGET = "DINEOUT_PROMPT_TOKEN_BUDGET"
+DEFAULT_TOKEN_BUDGET = 6000  # Per call, system prompt included; 0 disables the budget
+FLOAT_DIGITS = 2
+DEDUPE_MIN_CHARS = 200  # Strings at least this long are sent once per prompt
+
+OMITTED = "(omitted to fit the prompt token budget)"
+TRUNCATED = "\n... (truncated to fit the prompt token budget)"
+
+_TABLE_SEPARATOR = re.compile(r"^\|?(\s*:?-+:?\s*\|)+\s*:?-*:?\s*$")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+_totals = {"prompts": 0, "tokens_sent": 0, "tokens_saved": 0, "sections_dropped": 0, "sections_truncated": 0}
+_totals_lock = threading.Lock()
+
+
+class PromptBudgetError(ValueError):
+    """Raised when the required sections of a prompt exceed its token budget."""
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Any:
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model("gpt-4o")
+    except Exception as e:  # Not installed, or the encoding files cannot be downloaded
+        logger.info(f"tiktoken unavailable ({type(e).__name__}); estimating tokens from characters")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in `text` with the gpt-4o tokenizer, or ~4 characters per token without tiktoken."""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, (len(text) + 3) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def default_budget() -> int:
+    """Per-call token budget from DINEOUT_PROMPT_TOKEN_BUDGET (DEFAULT_TOKEN_BUDGET if unset)."""
+    value = os.environ.get(ENV_TOKEN_BUDGET, "").strip()
+    return int(value) if value else DEFAULT_TOKEN_BUDGET
+
+
+def compact_text(text: str) -> str:
+    """Strip trailing whitespace, extra blank lines and markdown table padding."""
+    lines = []
+    for line in text.strip().splitlines():
+        line = line.rstrip()
+        if line.lstrip().startswith("|"):
+            cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+            if _TABLE_SEPARATOR.match(line.strip()):
+                cells = [re.sub(r"-+", "---", cell) for cell in cells]
+            line = "| " + " | ".join(cells) + " |"
+        lines.append(line)
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines))
+
+
+def _is_empty(value: Any, drop_zeros: bool) -> bool:
+    if value is None or value == "" or value == [] or value == {}:
+        return True
+    return drop_zeros and not isinstance(value, bool) and isinstance(value, (int, float)) and value == 0
+
+
+def compact(value: Any, digits: int = FLOAT_DIGITS, drop_zeros: bool = False) -> Any:
+    """
+    Copy of a JSON-like value with floats rounded and empty values removed.
+
+    Args:
+        value: Dicts, lists and scalars, e.g. a `model_dump()`
+        digits: Decimal places kept for floats (whole results become ints)
+        drop_zeros: Also drop numeric zeros; only for payloads where a missing field reads as zero
+
+    Returns:
+        The compacted value
+    """
+    if isinstance(value, dict):
+        items = ((key, compact(item, digits, drop_zeros)) for key, item in value.items())
+        return {key: item for key, item in items if not _is_empty(item, drop_zeros)}
+    if isinstance(value, (list, tuple)):
+        items = (compact(item, digits, drop_zeros) for item in value)
+        return [item for item in items if not _is_empty(item, drop_zeros)]
+    if isinstance(value, float) and value == value and abs(value) != float("inf"):
+        value = round(value, digits)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str):
+        return compact_text(value)
+    return value
+
+
+def get_prompt_stats() -> Dict[str, int]:
+    """Token totals across all prompts built in this process."""
+    with _totals_lock:
+        return dict(_totals)
+
+
+@dataclass
+class Section:
+    """One placeholder of a prompt template"""
+    name: str
+    text: str
+    baseline_tokens: int  # Tokens of the indented, unrounded serialization the agents used to send
+    optional: bool = False  # May be omitted when the prompt is over budget
+    truncatable: bool = False  # May be cut line by line when the prompt is over budget
+
+    def __post_init__(self):
+        self.tokens = count_tokens(self.text)
+
+    def replace_text(self, text: str) -> None:
+        self.text = text
+        self.tokens = count_tokens(text)
+
+
+class PromptBuilder:
+    """Builds the messages of one LLM call from named template sections."""
+
+    def __init__(self, name: str, budget: Optional[int] = None, digits: int = FLOAT_DIGITS):
+        """
+        Args:
+            name: Call name used in logs and errors (e.g. "benchmark")
+            budget: Token budget of the call, system prompt included (defaults to default_budget(); 0 disables it)
+            digits: Decimal places kept for floats
+        """
+        self.name = name
+        self.budget = default_budget() if budget is None else budget
+        self.digits = digits
+        self.sections: Dict[str, Section] = {}
+        self._seen: Dict[str, str] = {}  # Long string -> section it was first sent in
+
+    def _dedupe(self, value: Any, section: str, keep: bool) -> Any:
+        """Replace long strings already sent in another section; only sections that are never cut (`keep`) are referenced."""
+        if isinstance(value, dict):
+            return {key: self._dedupe(item, section, keep) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._dedupe(item, section, keep) for item in value]
+        if isinstance(value, str) and len(value) >= DEDUPE_MIN_CHARS:
+            first = self._seen.setdefault(value, section) if keep else self._seen.get(value, section)
+            if first != section:
+                return f"(same as in {first})"
+        return value
+
+    def add_json(self, name: str, value: Any, drop_zeros: bool = False, optional: bool = False,
+                 baseline_indent: int = 4) -> "PromptBuilder":
+        """Add a JSON section (a dict or list of plain values); `baseline_indent` is what the agent used to send."""
+        baseline = json.dumps(value, indent=baseline_indent, default=str)
+        payload = self._dedupe(compact(value, self.digits, drop_zeros), name, keep=not optional)
+        text = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str)
+        self.sections[name] = Section(name, text, count_tokens(baseline), optional=optional)
+        return self
+
+    def add_text(self, name: str, text: str, optional: bool = False, truncatable: bool = False) -> "PromptBuilder":
+        """Add a free-text (markdown) section."""
+        compacted = self._dedupe(compact_text(text or ""), name, keep=not (optional or truncatable))
+        self.sections[name] = Section(name, compacted, count_tokens(text or ""), optional=optional,
+                                      truncatable=truncatable)
+        return self
+
+    def _truncate(self, section: Section, allowed: int) -> None:
+        kept, used = [], count_tokens(TRUNCATED)
+        for line in section.text.splitlines():
+            used += count_tokens(line + "\n")
+            if used > allowed:
+                break
+            kept.append(line)
+        section.replace_text("\n".join(kept) + TRUNCATED if kept else OMITTED)
+
+    def _fit(self, overhead: int) -> Dict[str, int]:
+        """Drop optional sections, then truncate long ones, until the prompt is within budget."""
+        changes = {"sections_dropped": 0, "sections_truncated": 0}
+
+        def total() -> int:
+            return overhead + sum(section.tokens for section in self.sections.values())
+
+        if self.budget <= 0 or total() <= self.budget:
+            return changes
+        for section in reversed(list(self.sections.values())):
+            if section.optional and section.text != OMITTED:
+                section.replace_text(OMITTED)
+                changes["sections_dropped"] += 1
+                if total() <= self.budget:
+                    return changes
+        for section in sorted(self.sections.values(), key=lambda s: s.tokens, reverse=True):
+            if section.truncatable and section.text != OMITTED:
+                self._truncate(section, section.tokens - (total() - self.budget))
+                changes["sections_truncated"] += 1
+                if total() <= self.budget:
+                    return changes
+        raise PromptBudgetError(f"{self.name} prompt needs {total()} tokens, over its budget of {self.budget}")
+
+    def build(self, system_prompt: str, user_template: str) -> List[Dict[str, str]]:
+        """
+        Fill the user template with the sections and return the chat messages.
+
+        Args:
+            system_prompt: System message content
+            user_template: User message template with a placeholder per section
+
+        Returns:
+            [system message, user message] dicts for `llm.invoke`
+
+        Raises:
+            PromptBudgetError: If the required sections alone exceed the budget
+        """
+        overhead = count_tokens(system_prompt) + count_tokens(user_template.format(**{name: "" for name in self.sections}))
+        # Savings from compact serialization only; budget cuts are counted separately
+        saved = max(0, sum(s.baseline_tokens - s.tokens for s in self.sections.values()))
+        changes = self._fit(overhead)
+        sent = overhead + sum(section.tokens for section in self.sections.values())
+        logger.info(f"{self.name} prompt: {sent} tokens (budget {self.budget or 'none'}), {saved} saved; "
+                    + ", ".join(f"{s.name}={s.tokens}" for s in self.sections.values()))
+        with _totals_lock:
+            _totals["prompts"] += 1
+            _totals["tokens_sent"] += sent
+            _totals["tokens_saved"] += saved
+            for key, value in changes.items():
+                _totals[key] += value
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_template.format(**{name: s.text for name, s in self.sections.items()})},
+        ]
@@ -1,12 +1,36 @@
 from pathlib import Path
+import json
 import logging
-from typing import Dict
-from markdown_pdf import MarkdownPdf, Section
+import os
+import time
+from typing import Any, Callable, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+class ReportStream:
+    """Appends report chunks to a partial file as they are generated, echoing each one."""
+
+    def __init__(self, path: Path, echo: Optional[Callable[[str], None]] = None):
+        self.path = path
+        self.echo = echo
+        self.first_chunk_seconds: Optional[float] = None
+        self._start = time.perf_counter()
+        self._file = path.open("w", encoding="utf-8")
+
+    def write(self, chunk: str) -> None:
+        if self.first_chunk_seconds is None:
+            self.first_chunk_seconds = round(time.perf_counter() - self._start, 4)
+        self._file.write(chunk)
+        self._file.flush()
+        if self.echo is not None:
+            self.echo(chunk)
+
+    def close(self) -> None:
+        self._file.close()
+
+
 class ReportSaver:
-    """Handles saving reports to disk in both markdown and PDF formats."""
+    """Handles saving reports to disk in markdown format."""
     
     def __init__(self, restaurant_id: str):
 
@@ -44,4 +68,58 @@ class ReportSaver:
             
         except Exception as e:
             logger.error(f"Error saving report: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+    def start_stream(self, echo: Optional[Callable[[str], None]] = None) -> ReportStream:
+        """Open report.md.partial for a report that is written while it is generated.
+        """
+        self._ensure_output_dir()
+        return ReportStream(self.output_dir / "report.md.partial", echo)
+
+    def finish_stream(self, markdown_content: str) -> Dict[str, str]:
+        """Atomically replace report.md with the streamed report.
+
+        The partial file is rewritten first if it does not hold exactly `markdown_content`
+        (e.g. the stream failed part way and an error report is saved instead).
+        """
+        try:
+            self._ensure_output_dir()
+            partial_path = self.output_dir / "report.md.partial"
+            if not partial_path.exists() or partial_path.read_text(encoding="utf-8") != markdown_content:
+                partial_path.write_text(markdown_content, encoding="utf-8")
+            md_path = self.output_dir / "report.md"
+            os.replace(partial_path, md_path)
+            logger.info(f"Saved markdown report to {md_path}")
+            return {"markdown_path": str(md_path.resolve())}
+
+        except Exception as e:
+            logger.error(f"Error saving report: {str(e)}")
+            raise
+
+    def save_json(self, data: Dict[str, Any]) -> Dict[str, str]:
+        """Save structured report data as JSON.
+        """
+        try:
+            self._ensure_output_dir()
+            json_path = self.output_dir / "report.json"
+            json_path.write_text(json.dumps(data, indent=2, default=str), encoding="utf-8")
+            logger.info(f"Saved structured report to {json_path}")
+            return {"json_path": str(json_path.resolve())}
+
+        except Exception as e:
+            logger.error(f"Error saving structured report: {str(e)}")
+            raise
+
+    def save_metrics(self, data: Dict[str, Any]) -> Dict[str, str]:
+        """Save the run's timing, memory and LLM usage metrics as JSON.
+        """
+        try:
+            self._ensure_output_dir()
+            metrics_path = self.output_dir / "run_metrics.json"
+            metrics_path.write_text(json.dumps(data, indent=2, default=str), encoding="utf-8")
+            logger.info(f"Saved run metrics to {metrics_path}")
+            return {"metrics_path": str(metrics_path.resolve())}
+
+        except Exception as e:
+            logger.error(f"Error saving run metrics: {str(e)}")
+            raise
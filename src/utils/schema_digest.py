@@ -0,0 +1,99 @@
+"""
+Precomputed schema and table summaries for the SQL analyst agent.
+
+The digest lists every table's columns as declared (PRAGMA table_info), a short
+note on what one row is, row count, date ranges and a couple of sample rows, so
+the agent can write queries straight away instead of spending tool round trips
+on listing tables and fetching schemas. It is built once per database version
+(file mtime and size) and reused for the process.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# What one row of each table represents, and what its columns can't say; everything else comes from the schema
+TABLE_NOTES: Dict[str, str] = {
+    "restaurant_master": "1 row per restaurant.",
+    "restaurant_metrics": "1 row per restaurant per day.",
+    "ads_data": "1 row per campaign; campaign_start/campaign_end are inclusive.",
+    "discount_history": "1 row per discount period; start_date/end_date are inclusive.",
+    "peer_benchmarks": "1 row per locality and cuisine; join on both.",
+}
+
+SAMPLE_ROWS = 2
+
+_digests: Dict[Tuple[Path, int, int], str] = {}
+_digests_lock = threading.Lock()
+
+
+def _is_date_column(name: str) -> bool:
+    return name == "date" or name.endswith(("_date", "_start", "_end"))
+
+
+def _describe_table(conn: sqlite3.Connection, table: str) -> List[str]:
+    columns = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+    column_names = [column[1] for column in columns]
+    (row_count,) = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()
+
+    lines = [f"### {table}"]
+    if table in TABLE_NOTES:
+        lines.append(TABLE_NOTES[table])
+    lines.append(f"Rows: {row_count}")
+    if "restaurant_id" in column_names:
+        (restaurants,) = conn.execute(f'SELECT COUNT(DISTINCT restaurant_id) FROM "{table}"').fetchone()
+        lines.append(f"Distinct restaurant_id: {restaurants}")
+
+    lines.append("Columns:")
+    for _, name, column_type, not_null, default, primary_key in columns:
+        detail = f"- {name} {column_type or 'TEXT'}"
+        if primary_key:
+            detail += " PRIMARY KEY"
+        if not_null:
+            detail += " NOT NULL"
+        if default is not None:
+            detail += f" DEFAULT {default}"
+        if _is_date_column(name):
+            low, high = conn.execute(f'SELECT MIN("{name}"), MAX("{name}") FROM "{table}"').fetchone()
+            detail += f" (ISO date text, {low} to {high})"
+        lines.append(detail)
+
+    samples = conn.execute(f'SELECT * FROM "{table}" LIMIT {SAMPLE_ROWS}').fetchall()
+    if samples:
+        lines.append("Sample rows:")
+        lines.append("| " + " | ".join(column_names) + " |")
+        lines.append("|" + "|".join("---" for _ in column_names) + "|")
+        lines.extend("| " + " | ".join(str(value) for value in row) + " |" for row in samples)
+    return lines
+
+
+def build_schema_digest(db_path: Path) -> str:
+    """Build the markdown digest of every table in a SQLite database."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        tables = [
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )
+        ]
+        sections = ["\n".join(_describe_table(conn, table)) for table in tables]
+    finally:
+        conn.close()
+    return "\n\n".join(sections)
+
+
+def get_schema_digest(db_path: Path) -> str:
+    """Return the digest for the current version of a database, building it at most once."""
+    stat = Path(db_path).stat()
+    key = (Path(db_path), stat.st_mtime_ns, stat.st_size)
+    with _digests_lock:
+        digest = _digests.get(key)
+        if digest is None:
+            digest = build_schema_digest(db_path)
+            _digests[key] = digest
+            logger.info(f"Built schema digest for {db_path} ({len(digest)} chars)")
+        return digest
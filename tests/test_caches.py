@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+from pydantic import BaseModel
+
+from src.utils.agent_cache import AgentCache, fingerprint
+from src.utils.checkpoints import CHECKPOINT_DIR, BatchManifest, CheckpointStore
+
+
+class Output(BaseModel):
+    value: int
+
+
+@pytest.fixture
+def metrics():
+    return pd.DataFrame({'date': pd.date_range('2024-05-01', periods=3), 'bookings': [1, 2, 3]})
+
+
+def test_fingerprint_tracks_values_and_dtypes(metrics):
+    assert fingerprint(metrics, 'png') == fingerprint(metrics.copy(), 'png')
+    changed = metrics.copy()
+    changed.loc[1, 'bookings'] = 5
+    assert fingerprint(changed, 'png') != fingerprint(metrics, 'png')
+    assert fingerprint(metrics.astype({'bookings': 'float64'}), 'png') != fingerprint(metrics, 'png')
+    assert fingerprint(metrics, 'svg') != fingerprint(metrics, 'png')
+
+
+def test_agent_cache_serves_output_only_for_same_fingerprint(tmp_path, metrics):
+    cache = AgentCache(tmp_path)
+    digest = fingerprint(metrics)
+    cache.store('R001', 'trends', digest, Output(value=1), Output)
+
+    assert cache.load('R001', 'trends', digest, Output) == Output(value=1)
+    changed = metrics.assign(bookings=[1, 2, 4])
+    assert cache.load('R001', 'trends', fingerprint(changed), Output) is None
+    assert cache.load('R002', 'trends', digest, Output) is None
+    # A new output replaces the old one for good
+    cache.store('R001', 'trends', fingerprint(changed), Output(value=2), Output)
+    assert cache.load('R001', 'trends', digest, Output) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_checkpoints_resume_only_with_same_settings(tmp_path):
+    settings = {'report_mode': 'template', 'data': 'abc'}
+    store = CheckpointStore('R001', tmp_path)
+    assert store.start(settings, resume=False) == []
+    store.save('ads', Output(value=1), Output)
+    store.finish('incomplete', ['benchmarks'])
+
+    resumed = CheckpointStore('R001', tmp_path)
+    assert resumed.start(settings, resume=True) == ['ads']
+    assert resumed.load('ads', Output) == Output(value=1)
+    assert resumed.load('trends', Output) is None
+    resumed.finish('interrupted')
+
+    changed = CheckpointStore('R001', tmp_path)
+    assert changed.start({**settings, 'data': 'def'}, resume=True) == []
+    assert changed.load('ads', Output) is None
+    assert not (tmp_path / CHECKPOINT_DIR / 'ads.json').exists()
+
+
+def test_checkpoints_are_removed_once_complete(tmp_path):
+    store = CheckpointStore('R001', tmp_path)
+    store.start({}, resume=False)
+    store.save('ads', Output(value=1), Output)
+    store.finish('complete')
+
+    assert not (tmp_path / CHECKPOINT_DIR).exists()
+    assert CheckpointStore('R001', tmp_path).start({}, resume=True) == []
+
+
+def test_batch_manifest_keeps_reports_of_same_settings(tmp_path):
+    settings = {'report_mode': 'template'}
+
+    def recorded():
+        path = tmp_path / 'batch.json'
+        manifest = BatchManifest(path)
+        assert manifest.start(['R001', 'R002'], settings, resume=False) == {}
+        manifest.record('R001', 'outputs/R001/report.md', 'abc')
+        return BatchManifest(path)
+
+    expected = {'R001': {'report': 'outputs/R001/report.md', 'data': 'abc'}}
+    assert recorded().start(['R001', 'R002'], settings, resume=True) == expected
+    assert recorded().start(['R002'], settings, resume=True) == {}
+    assert recorded().start(['R001', 'R002'], {'report_mode': 'llm'}, resume=True) == {}
+    assert recorded().start(['R001', 'R002'], settings, resume=False) == {}
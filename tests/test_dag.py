@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from src.utils.dag import Step, run_steps
+
+
+def constant(value):
+    return lambda results: value
+
+
+def test_cycle_is_rejected_before_any_step_runs():
+    ran = []
+    steps = [
+        Step('load', lambda results: ran.append('load')),
+        Step('a', constant(1), ('load', 'c')),
+        Step('b', constant(2), ('a',)),
+        Step('c', constant(3), ('b',)),
+    ]
+    with pytest.raises(ValueError, match="cycle"):
+        run_steps(steps)
+    assert ran == []
+
+
+def test_self_dependency_is_a_cycle():
+    with pytest.raises(ValueError, match="cycle"):
+        run_steps([Step('a', constant(1), ('a',))])
+
+
+def test_unknown_and_duplicate_steps_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        run_steps([Step('a', constant(1), ('missing',))])
+    with pytest.raises(ValueError, match="Duplicate"):
+        run_steps([Step('a', constant(1)), Step('a', constant(2))])
+
+
+def test_steps_see_their_dependencies_and_independent_steps_overlap():
+    both_started = threading.Barrier(2, timeout=5)
+
+    def branch(value):
+        def run(results):
+            both_started.wait()  # Deadlocks (and times out) unless the two branches run concurrently
+            return results['load'] + value
+        return run
+
+    steps = [
+        Step('report', lambda results: (results['left'], results['right']), ('left', 'right')),
+        Step('left', branch(1), ('load',)),
+        Step('right', branch(2), ('load',)),
+        Step('load', constant(10)),
+    ]
+    assert run_steps(steps, max_workers=2)['report'] == (11, 12)
+
+
+def test_first_failure_is_raised():
+    def fail(results):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        run_steps([Step('a', fail), Step('b', constant(1), ('a',))])
@@ -0,0 +1,63 @@
+import math
+
+import pandas as pd
+import pytest
+
+from src.analytics.lift import DISCOUNT_METRICS, compute_lift
+
+
+@pytest.fixture
+def restaurant():
+    """Six days of metrics and three discount windows, small enough to compute by hand."""
+    metrics = pd.DataFrame({
+        'date': pd.date_range('2024-05-01', periods=6),
+        'bookings': [10, 20, 30, 40, 50, 60],
+        'revenue': [100, 300, 300, 500, 500, 600],
+        'covers': [20, 40, 60, 80, 100, 120],
+    })
+    windows = pd.DataFrame({
+        'config': ['A', 'B', 'C'],
+        # A and B overlap on May 3rd; C lies outside the metrics
+        'start_date': pd.to_datetime(['2024-05-02', '2024-05-03', '2024-06-01']),
+        'end_date': pd.to_datetime(['2024-05-03', '2024-05-04', '2024-06-02']),
+    })
+    return metrics, windows
+
+
+def test_union_of_windows_vs_rest(restaurant):
+    metrics, windows = restaurant
+    result = compute_lift(metrics, windows, 'start_date', 'end_date', DISCOUNT_METRICS, label_col='config')
+
+    # In a window: May 2-4; outside: May 1, 5 and 6 (the overlap day is counted once)
+    assert (result.in_days, result.out_days) == (3, 3)
+    assert result.in_window['Average Daily Bookings'] == pytest.approx((20 + 30 + 40) / 3)
+    assert result.out_window['Average Daily Bookings'] == pytest.approx((10 + 50 + 60) / 3)
+    assert result.in_window['Average Daily Revenue'] == pytest.approx((300 + 300 + 500) / 3)
+    assert result.out_window['Average Daily Covers'] == pytest.approx((20 + 100 + 120) / 3)
+    # A ratio of sums, not a mean of daily ratios
+    assert result.in_window['Average Spend per Cover'] == pytest.approx(1100 / 180)
+    assert result.out_window['Average Spend per Cover'] == pytest.approx(1200 / 240)
+    assert result.change_pct('Average Daily Bookings') == pytest.approx(-25.0)
+
+
+def test_each_window_on_its_own(restaurant):
+    metrics, windows = restaurant
+    result = compute_lift(metrics, windows, 'start_date', 'end_date', DISCOUNT_METRICS, label_col='config')
+
+    a, b, c = result.windows
+    assert [w.label for w in result.windows] == ['A', 'B', 'C']
+    assert (a.days, b.days, c.days) == (2, 2, 0)
+    assert a.values['Average Daily Bookings'] == pytest.approx(25.0)
+    assert b.values['Average Daily Bookings'] == pytest.approx(35.0)
+    assert b.values['Average Spend per Cover'] == pytest.approx(800 / 140)
+    assert all(math.isnan(value) for value in c.values.values())
+
+
+def test_no_windows_puts_every_day_outside(restaurant):
+    metrics, windows = restaurant
+    result = compute_lift(metrics, windows.iloc[0:0], 'start_date', 'end_date', DISCOUNT_METRICS)
+
+    assert (result.in_days, result.out_days) == (0, 6)
+    assert math.isnan(result.in_window['Average Daily Bookings'])
+    assert math.isnan(result.change_pct('Average Daily Bookings'))
+    assert "Not enough" in result.to_markdown("Discount")
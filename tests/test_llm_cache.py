@@ -0,0 +1,71 @@
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from src.utils import llm_cache
+from src.utils.llm_cache import LLMResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+
+def reply(text):
+    return [ChatGeneration(message=AIMessage(content=text))]
+
+
+def test_hit_requires_same_prompt_and_model(tmp_path, clock):
+    cache = LLMResponseCache(tmp_path / "cache.sqlite")
+    cache.update("prompt", "model", reply("hello"))
+
+    assert cache.lookup("prompt", "model")[0].message.content == "hello"
+    assert cache.lookup("prompt", "other model") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = LLMResponseCache(tmp_path / "cache.sqlite", ttl_seconds=60)
+    cache.update("prompt", "model", reply("hello"))
+
+    clock.now += 59
+    assert cache.lookup("prompt", "model") is not None
+    # Reading an entry does not extend its lifetime
+    clock.now += 2
+    assert cache.lookup("prompt", "model") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_no_ttl_keeps_entries(tmp_path, clock):
+    cache = LLMResponseCache(tmp_path / "cache.sqlite", ttl_seconds=None)
+    cache.update("prompt", "model", reply("hello"))
+
+    clock.now += 365 * 24 * 3600
+    assert cache.lookup("prompt", "model") is not None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = LLMResponseCache(tmp_path / "cache.sqlite", max_entries=2)
+    cache.update("first", "model", reply("1"))
+    clock.now += 1
+    cache.update("second", "model", reply("2"))
+    clock.now += 1
+    # Touching "first" makes "second" the least recently used
+    assert cache.lookup("first", "model") is not None
+    clock.now += 1
+    cache.update("third", "model", reply("3"))
+
+    assert cache.lookup("second", "model") is None
+    assert cache.lookup("first", "model") is not None
+    assert cache.lookup("third", "model") is not None
+    assert cache.evictions == 1
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from src.llm import BATCH, INTERACTIVE
+from src.utils import llm_scheduler
+from src.utils.llm_scheduler import LLMScheduler, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", clock)
+    return clock
+
+
+def test_token_bucket_refills_at_its_rate(clock):
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.delay(60) == 0
+    bucket.take(60)
+    assert bucket.delay(1) == pytest.approx(1.0)
+    clock.now += 30
+    assert bucket.delay(30) == 0
+    assert bucket.delay(45) == pytest.approx(15.0)
+    # Never holds more than a minute's worth, and oversized amounts wait for a full bucket
+    clock.now += 600
+    assert bucket.delay(60) == 0
+    assert bucket.level == 60
+    assert bucket.delay(1000) == 0
+
+
+def test_token_bucket_can_go_into_debt(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(90)
+    assert bucket.delay(1) == pytest.approx(31.0)
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(per_minute=0)
+    bucket.take(10 ** 9)
+    assert bucket.delay(10 ** 9) == 0
+
+
+def wait_for_queue(scheduler, depth):
+    deadline = time.monotonic() + 5
+    while scheduler.stats()["queue_depth"] < depth:
+        assert time.monotonic() < deadline, "calls never queued"
+        time.sleep(0.001)
+
+
+def test_slot_admits_by_priority_then_arrival():
+    scheduler = LLMScheduler(max_concurrency=1)
+    admitted = []
+
+    def call(name, priority):
+        with scheduler.slot(tokens=1, priority=priority):
+            admitted.append(name)
+
+    threads = []
+    with scheduler.slot(tokens=1):
+        for depth, (name, priority) in enumerate([("batch 1", BATCH), ("batch 2", BATCH),
+                                                  ("interactive", INTERACTIVE)], start=1):
+            threads.append(threading.Thread(target=call, args=(name, priority)))
+            threads[-1].start()
+            wait_for_queue(scheduler, depth)
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert admitted == ["interactive", "batch 1", "batch 2"]
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_failed_wait_leaves_no_ticket_behind(monkeypatch):
+    scheduler = LLMScheduler(max_concurrency=1)
+    holder = scheduler.slot(tokens=1)
+    holder.__enter__()
+
+    def interrupted(timeout=None):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(scheduler._cond, "wait", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        with scheduler.slot(tokens=1):
+            pass
+    monkeypatch.undo()
+    holder.__exit__(None, None, None)
+
+    assert scheduler.stats()["queue_depth"] == 0
+    with scheduler.slot(tokens=1):
+        assert scheduler.stats()["in_flight"] == 1
+
+
+def test_run_retries_transient_errors_only(monkeypatch):
+    monkeypatch.setattr(llm_scheduler.time, "sleep", lambda seconds: None)
+    scheduler = LLMScheduler(max_retries=2)
+    attempts = []
+
+    def flaky(charge):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise TimeoutError("slow")
+        return "ok"
+
+    def invalid(charge):
+        raise ValueError("bad request")
+
+    assert scheduler.run(flaky, tokens=1) == "ok"
+    with pytest.raises(ValueError):
+        scheduler.run(invalid, tokens=1)
+
+    stats = scheduler.stats()
+    assert (stats["calls"], stats["retries"], stats["failures"]) == (1, 2, 1)